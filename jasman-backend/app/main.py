@@ -1,5 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routes import auth, users, admin
 from app.routes.odoo import inventory, deniedtires
 from app.routes.Existencias import ExistenciaPlanta
@@ -8,17 +10,31 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from datetime import datetime
 import pytz
 import os
+import re
 import asyncio
 import atexit
 import logging
 from app.routes import cotizaciones
+from app.services import data_generation
+from app.services.telemetry_writer import telemetry_writer
+from app.supabase import open_clients, close_clients
+from app.services import postgres_bulk
+from app.services.token_revocations import token_revocations, STATELESS_AUTH, REFRESH_SECONDS
 
 # Configuración de logger
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-# Inicializa la app FastAPI
-app = FastAPI(title="Mayoreo AFT", version="1.0.0")
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # sin brotli instalado se comprime solo con gzip
+    BrotliMiddleware = None
+
+# Inicializa la app FastAPI (orjson como serializador por defecto)
+app = FastAPI(title="Mayoreo AFT", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Tamaño mínimo (bytes) a partir del cual se comprimen las respuestas
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
 
 # Zona horaria de México
 mexico_tz = pytz.timezone('America/Mexico_City')
@@ -55,6 +71,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Rutas de streaming (SSE) fuera de la compresión: el compresor acumula el cuerpo y retrasaría los eventos
+UNCOMPRESSED_PATHS = [r"^/inventory/eventos"]
+
+
+class StreamingAwareGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and any(re.match(p, scope["path"]) for p in UNCOMPRESSED_PATHS):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Compresión negociada por Accept-Encoding: br si el cliente lo soporta, si no gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        BrotliMiddleware, quality=4, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True,
+        excluded_handlers=UNCOMPRESSED_PATHS
+    )
+else:
+    app.add_middleware(StreamingAwareGZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
 # Incluir rutas
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -84,6 +121,13 @@ def log_scheduler_events():
 # Evento de arranque de la app
 @app.on_event("startup")
 async def startup_event():
+    await open_clients()
+    if postgres_bulk.enabled():
+        try:
+            await postgres_bulk.open_pool()
+        except Exception as e:  # el sync reintenta al usarlo y si no, va por PostgREST
+            logger.error(f"❌ No se pudo abrir el pool directo a Postgres: {e}")
+    telemetry_writer.start()
     if not scheduler.running:
         scheduler.add_job(
             run_auto_sync_inventory,  # función async
@@ -93,6 +137,23 @@ async def startup_event():
             name="daily_inventory_sync",
             misfire_grace_time=3600
         )
+        # Generación de datos compartida entre workers (ETags / caches)
+        scheduler.add_job(
+            data_generation.refresh,
+            trigger='interval',
+            seconds=60,
+            name="data_generation_refresh",
+            next_run_time=datetime.now(mexico_tz)
+        )
+        # Lista de revocación de los tokens sin estado
+        if STATELESS_AUTH:
+            scheduler.add_job(
+                token_revocations.refresh,
+                trigger='interval',
+                seconds=REFRESH_SECONDS,
+                name="token_revocations_refresh",
+                next_run_time=datetime.now(mexico_tz)
+            )
         scheduler.start()
         log_scheduler_events()
 
@@ -103,6 +164,10 @@ async def shutdown_event():
     if scheduler.running:
         scheduler.shutdown()
         print("\n🛑 Scheduler detenido correctamente\n")
+    # Escribe los logs que sigan en cola
+    telemetry_writer.stop()
+    await close_clients()
+    await postgres_bulk.close_pool()
 
 
 # También garantiza cierre si se apaga abruptamente
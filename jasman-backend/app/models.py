@@ -103,6 +103,9 @@ class InventorySearch(BaseModel):
     serie: Optional[str] = None  # Perfil (ej: 65)
     rin: Optional[str] = None    # Diámetro (ej: R15)
 
+class InventoryBatchSearch(BaseModel):
+    medidas: List[InventorySearch] = Field(..., min_items=1, max_items=100)
+
 class LogBusqueda(Base):
     __tablename__ = "log_busquedas"
 
@@ -1,25 +1,81 @@
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response, UploadFile, File, Form, Depends, status
+from fastapi.concurrency import run_in_threadpool
 from app.supabase import supabase
+from app.models import UserInDB
+from app.services.auth import get_current_user
+from app.services import ExistenciaPlantaService
+from app.utils.tire_size import parse_size_filters
+from app.utils.http_cache import build_etag, not_modified, cache_headers
+from app.services import inventory_snapshot
 
 existencia_router = APIRouter(prefix="/existencia", tags=["existencia"])
 
 @existencia_router.get("/search")
 async def search_llantas_por_size(
+    request: Request,
+    response: Response,
     width: str = Query(..., example="165"),
     ratio: str = Query(..., example="70"),
     diameter: str = Query(..., example="13")
 ):
+    etag = build_etag(request, "existencia")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
+
     try:
-        size_str = f"{width}/{ratio}R{diameter}"
+        width_num, ratio_num, rim_num = parse_size_filters(width, ratio, diameter)
+
+        snapshot = inventory_snapshot.get_snapshot()
+        if snapshot is not None and None not in (width_num, ratio_num, rim_num):
+            # Máscara sobre las columnas de medida del snapshot en memoria
+            return snapshot.existencia_rows(width_num, ratio_num, rim_num)
 
-        response = supabase.table("ExistenciaPlanta")\
-            .select("*")\
-            .eq("size", size_str)\
-            .execute()
+        query = supabase.table("ExistenciaPlanta").select("*")
+        if None not in (width_num, ratio_num, rim_num):
+            # Igualdad sobre el índice (width_num, ratio_num, rim_num)
+            query = query.eq("width_num", width_num)\
+                .eq("ratio_num", ratio_num)\
+                .eq("rim_num", rim_num)
+        else:
+            size_str = f"{width}/{ratio}R{diameter}"
+            query = query.eq("size", size_str)
 
-        return response.data
+        return query.execute().data
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al buscar existencia por medida: {str(e)}"
         )
+
+
+@existencia_router.post("/upload")
+async def upload_existencia_planta(
+    file: UploadFile = File(...),
+    manufacturer: str = Form(..., description="Proveedor al que pertenece el archivo"),
+    replace: bool = Form(True, description="Borrar las filas del proveedor que no vienen en el archivo"),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Carga existencias de planta desde CSV o XLSX.
+    Columnas: sku, existencia y medida (o piso, serie, rin); opcionales descripcion, marca, almacen.
+    """
+    if current_user.role != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Se requieren privilegios de administrador"
+        )
+
+    try:
+        # Lectura y carga por bloques fuera del event loop
+        return await run_in_threadpool(
+            ExistenciaPlantaService.load_file, file.file, file.filename, manufacturer, replace
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error cargando existencia de planta: {str(e)}"
+        )
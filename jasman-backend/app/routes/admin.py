@@ -1,5 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
+from postgrest import AsyncPostgrestClient
 from datetime import datetime
 from uuid import UUID
 from app.models import (
@@ -11,7 +13,11 @@ from app.models import (
     UserBase
 )
 from app.services.auth import get_current_user
+from app.supabase import get_async_postgrest
 from app.services.supabase_db import supabase_db_service
+from app.services.user_cache import user_cache
+from app.services.password_hasher import password_executor
+from app.services.telemetry_writer import telemetry_writer
 import logging
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -25,7 +31,9 @@ async def get_all_users(
     role: Optional[UserRole] = None,
     company: Optional[str] = None,
     search: Optional[str] = None,
-    validated: Optional[bool] = None
+    validated: Optional[bool] = None,
+    count: str = Query("exact", regex="^(exact|planned|estimated)$"),
+    db: AsyncPostgrestClient = Depends(get_async_postgrest)
 ):
     # Verificar permisos
     if current_user.role not in [UserRole.ADMIN, UserRole.SYSTEMS, UserRole.PRICES, UserRole.VENDEDOR]:
@@ -35,41 +43,21 @@ async def get_all_users(
         )
 
     try:
-        # Lógica diferente para vendedores
-        if current_user.role == UserRole.VENDEDOR:
-            users = supabase_db_service.get_users_by_partner(current_user.id)
-            
-            # Aplicar filtros locales (ya que Supabase no los aplicó)
-            filtered_users = []
-            for user in users:
-                # Filtro por rol
-                if role and user.get("rol") != (role.value if isinstance(role, UserRole) else role):
-                    continue
-                # Filtro por compañía
-                if company and company.lower() not in user.get("empresa", "").lower():
-                    continue
-                # Filtro por búsqueda
-                if search and (search.lower() not in user.get("nombre", "").lower() and 
-                              search.lower() not in user.get("correo", "").lower()):
-                    continue
-                # Filtro por validación
-                if validated is not None and user.get("validado") != validated:
-                    continue
-                
-                filtered_users.append(user)
-            
-            users = filtered_users
-        else:
-            # Para otros roles, obtener todos los usuarios con filtros
-            users = supabase_db_service.get_all_users(
-                role=role,
-                company=company,
-                search=search,
-                validated=validated
-            )
+        # Filtros, orden y paginación van en la consulta; los vendedores solo ven a sus usuarios
+        users, total_users = await supabase_db_service.get_all_users(
+            db,
+            role=role,
+            company=company,
+            search=search,
+            validated=validated,
+            parent_partner_id=current_user.id if current_user.role == UserRole.VENDEDOR else None,
+            page=page,
+            per_page=per_page,
+            count=count
+        )
 
         # Procesar usuarios para la respuesta
-        processed_users = []
+        paginated_users = []
         for user in users:
             user_data = {
                 "id": user["id"],
@@ -78,16 +66,13 @@ async def get_all_users(
                 "empresa": user["empresa"],
                 "rol": user["rol"],
                 "codigo_usuario": user["codigo_usuario"],
-                "codigo_partner": user.get("parent_partner", {}).get("codigo_usuario") if user.get("parent_partner") else None,
+                "codigo_partner": user["codigo_partner"],
                 "validado": user["validado"],
                 "creado_en": user["creado_en"]
             }
-            processed_users.append(user_data)
+            paginated_users.append(user_data)
 
-        # Paginación
-        total_users = len(processed_users)
         total_pages = (total_users + per_page - 1) // per_page
-        paginated_users = processed_users[(page-1)*per_page : page*per_page]
 
         return {
             "data": paginated_users,
@@ -157,6 +142,20 @@ async def get_my_team(
 
 
 
+@router.get("/metrics")
+async def get_metrics(current_user: UserInDB = Depends(get_current_user)):
+    """Contadores internos del proceso (cache de usuarios, pool de bcrypt, escritor de logs)"""
+    if current_user.role not in [UserRole.ADMIN, UserRole.SYSTEMS]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Requiere privilegios de administrador o sistemas"
+        )
+    return {
+        "user_cache": user_cache.stats(),
+        "password_hashing": password_executor.stats(),
+        "telemetry_writer": telemetry_writer.stats()
+    }
+
 @router.put("/{user_id}", response_model=UserPublic)
 async def update_user(
     user_id: UUID,
@@ -218,7 +217,7 @@ async def update_user(
         update_fields[db_field] = value
 
     try:
-        success = supabase_db_service.update_user(user_id, update_fields)
+        success = await run_in_threadpool(supabase_db_service.update_user, user_id, update_fields)
         if not success:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
 
@@ -250,7 +249,7 @@ async def delete_user(
         )
 
     try:
-        success = supabase_db_service.delete_user(user_id)
+        success = await run_in_threadpool(supabase_db_service.delete_user, user_id)
         if not success:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         return {"message": "Usuario eliminado correctamente"}
@@ -273,7 +272,7 @@ async def validate_user(
         )
 
     try:
-        success = supabase_db_service.update_user(user_id, {"validado": True})
+        success = await run_in_threadpool(supabase_db_service.update_user, user_id, {"validado": True})
         if not success:
             raise HTTPException(status_code=404, detail="Usuario no encontrado")
         return {"message": "Usuario validado correctamente"}
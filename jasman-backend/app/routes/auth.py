@@ -7,8 +7,9 @@ import logging
 
 from app.models import UserCreate, Token
 from app.services.auth import (
-    get_password_hash,
+    get_password_hash_async,
     create_access_token,
+    user_token_claims,
     authenticate_user,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
@@ -42,7 +43,7 @@ async def register_user(user_data: UserCreate = Body(...)):
 
         user_data_for_db = {
             "correo": user_data.email,
-            "contraseña": get_password_hash(user_data.password),
+            "contraseña": await get_password_hash_async(user_data.password),
             "nombre": user_data.name,
             "empresa": user_data.company,
             "rol": user_data.role,
@@ -77,13 +78,13 @@ async def login_for_access_token(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect credentials")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     token = create_access_token(
-        data={"sub": str(user.id), "rol": user.role.value},
+        data=user_token_claims(user),
         expires_delta=access_token_expires
     )
 
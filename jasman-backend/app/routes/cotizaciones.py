@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
@@ -15,6 +16,7 @@ from app.models import (
     PaginatedResponse
 )
 from app.services.supabase_db import supabase_db_service
+from app.services import product_search
 from app.services.auth import get_current_user
 
 router = APIRouter(prefix="/cotizaciones", tags=["cotizaciones"])
@@ -72,6 +74,20 @@ async def buscar_productos(
         start = (page - 1) * per_page
         end = start + per_page - 1
 
+        # Índice en memoria (prefijo + trigramas, con precios): sin consultas por tecla
+        index = product_search.get_index()
+        if index is not None:
+            products_with_prices, total = index.search(search, offset=start, limit=per_page)
+            return ORJSONResponse({
+                "data": products_with_prices,
+                "pagination": {
+                    "total_items": total,
+                    "current_page": page,
+                    "per_page": per_page,
+                    "total_pages": (total + per_page - 1) // per_page
+                }
+            })
+
         # Primero obtenemos los productos
         query = supabase.table("products").select("*", count="exact")
         if search:
@@ -111,7 +127,7 @@ async def buscar_productos(
             product_with_price["price"] = prices_dict.get(product["sku"])
             products_with_prices.append(product_with_price)
 
-        return {
+        return ORJSONResponse({
             "data": products_with_prices,
             "pagination": {
                 "total_items": response.count,
@@ -119,7 +135,7 @@ async def buscar_productos(
                 "per_page": per_page,
                 "total_pages": (response.count + per_page - 1) // per_page
             }
-        }
+        })
 
     except Exception as e:
         # Manejo de errores
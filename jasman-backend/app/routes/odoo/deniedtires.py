@@ -6,6 +6,8 @@ from uuid import UUID
 from app.models import LlantaNegadaCreate, LlantaNegadaInDB, UserInDB, UserRole
 from app.services.supabase_db import supabase_db_service
 from app.services.auth import get_current_user
+from app.supabase import get_async_postgrest
+from postgrest import AsyncPostgrestClient
 
 router = APIRouter(prefix="/deniedtires", tags=["deniedtires"])
 
@@ -60,14 +62,15 @@ async def obtener_llantas_negadas(
     current_user: UserInDB = Depends(get_current_user),
     fecha_inicio: Optional[str] = None,
     fecha_fin: Optional[str] = None,
-    limit: int = 100
+    limit: int = 100,
+    db: AsyncPostgrestClient = Depends(get_async_postgrest)
 ):
     """
     Obtiene el historial de llantas negadas.
     Puede filtrar por rango de fechas (formato YYYY-MM-DD).
     """
     try:
-        query = supabase_db_service.client.table("llantas_negadas") \
+        query = db.table("llantas_negadas") \
             .select("*") \
             .order("fecha", desc=True) \
             .limit(limit)
@@ -83,7 +86,7 @@ async def obtener_llantas_negadas(
         if fecha_fin:
             query = query.lte("fecha", fecha_fin + "T23:59:59")
             
-        response = query.execute()
+        response = await query.execute()
         
         # Convertir fechas a zona horaria de México
         tz_mexico = pytz.timezone('America/Mexico_City')
@@ -1,16 +1,28 @@
 from fastapi import APIRouter, Request, HTTPException, Query, Depends
 from typing import List, Dict, Optional
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.responses import StreamingResponse
-from app.models import InventorySearch
-from app.supabase import supabase
+from app.models import InventorySearch, InventoryBatchSearch
+from app.supabase import supabase, get_async_postgrest
+from postgrest import AsyncPostgrestClient
 from app.services.InventoryService import InventoryPriceService
-from app.services.auth import get_current_user  # Importa la función de autenticación
+from app.services.auth import get_current_user, get_current_user_for_stream  # Importa la función de autenticación
 from app.models import UserInDB  # Add this import
 from app.services.supabase_db import supabase_db_service  # Import the service
+from app.utils.tire_size import parse_width, parse_ratio, parse_rim, parse_size_filters
+from app.utils.http_cache import build_etag, not_modified, cache_headers
+from app.services import data_generation
+from app.services import inventory_snapshot
+from app.services import inventory_events
+from app.services import inventory_history
+from app.services import postgres_bulk
 import logging
+import asyncio
+import orjson
 import io
 import csv
+import json
+import base64
 from datetime import datetime
 import re
 import pytz
@@ -75,17 +87,8 @@ async def sync_inventory(request: Request):
 async def _sync_inventory_to_supabase(inventory_data: List[Dict]) -> Dict:
     """Función que sincroniza inventario ELIMINANDO TODOS los productos previos"""
     try:
-        # 1. ✅ ELIMINAR TODOS los productos existentes primero
-        try:
-            logger.info("🗑️ Eliminando TODOS los productos existentes...")
-            # Primero eliminar inventario (por restricciones de foreign key)
-            supabase.table('inventory').delete().neq('product_id', 0).execute()
-            # Luego eliminar todos los productos
-            supabase.table('products').delete().neq('id', 0).execute()
-            logger.info("✅ Todos los productos anteriores eliminados")
-        except Exception as e:
-            logger.error(f"Error eliminando productos existentes: {str(e)}")
-            raise
+        # 1. Productos e inventario se reemplazan completos en el paso 5 (COPY directo a
+        #    Postgres o, si no está disponible, borrado + upsert por PostgREST)
 
         # 2. ✅ OBTENER WAREHOUSES PRIMERO (¡esto va ANTES del loop!)
         existing_warehouses = {}
@@ -149,6 +152,9 @@ async def _sync_inventory_to_supabase(inventory_data: List[Dict]) -> Dict:
                     'piso': str(attributes.get('piso', ''))[:50],
                     'serie': str(attributes.get('serie', ''))[:50],
                     'rin': str(attributes.get('rin', ''))[:50],
+                    'width': parse_width(attributes.get('piso')),
+                    'ratio': parse_ratio(attributes.get('serie')),
+                    'rim': parse_rim(attributes.get('rin')),
                     'carga_velocidad': str(attributes.get('carga / velocidad', ''))[:100],
                     'marca': str(attributes.get('marca', ''))[:100],
                     'modelo': str(attributes.get('modelo', ''))[:100],
@@ -192,12 +198,32 @@ async def _sync_inventory_to_supabase(inventory_data: List[Dict]) -> Dict:
                 except Exception as e:
                     logger.error(f"Error actualizando/insertando warehouse {wh_id}: {str(e)}")
 
-        # 5. UPSERT productos e inventario
-        if product_inserts:
-            supabase.table('products').upsert(product_inserts, on_conflict=["id"]).execute()
+        # 5. Reemplazar productos e inventario
+        write_path = "rest"
+        if postgres_bulk.enabled():
+            try:
+                await postgres_bulk.replace_inventory(product_inserts, inventory_inserts)
+                write_path = "copy"
+            except Exception as e:
+                logger.error(f"⚠️ Falló la carga directa a Postgres, se usa PostgREST: {str(e)}", exc_info=True)
+        if write_path == "rest":
+            _replace_inventory_via_rest(product_inserts, inventory_inserts)
+
+        # Totales por zona / tipo / medida / marca para /inventory/estadisticas
+        try:
+            supabase.rpc('refresh_inventory_rollups', {}).execute()
+        except Exception as e:
+            logger.error(f"Error refrescando inventory_rollups: {str(e)}", exc_info=True)
+
+        # Nueva generación de inventario (después del refresh: un ETag nuevo nunca
+        # queda asociado a los totales anteriores)
+        data_generation.mark_changed("inventory")
 
-        if inventory_inserts:
-            supabase.table('inventory').upsert(inventory_inserts, on_conflict="product_id,warehouse_id").execute()
+        # Historial: delta contra la corrida anterior (o checkpoint); no detiene el sync si falla
+        try:
+            inventory_history.record_run(inventory_inserts, generation=data_generation.current("inventory"))
+        except Exception as e:
+            logger.error(f"Error registrando historial de inventario: {str(e)}", exc_info=True)
 
         return {
             "products_updated": len(product_inserts),
@@ -205,6 +231,7 @@ async def _sync_inventory_to_supabase(inventory_data: List[Dict]) -> Dict:
             "consigna_excluded": consigna_products,
             "warehouses": len(warehouses_to_update),
             "inventory_records": len(inventory_inserts),
+            "write_path": write_path,
             "message": "Inventario completamente reemplazado (productos consigna excluidos)"
         }
 
@@ -215,6 +242,26 @@ async def _sync_inventory_to_supabase(inventory_data: List[Dict]) -> Dict:
             detail=f"Error interno: {str(e)}"
         )
 
+def _replace_inventory_via_rest(product_inserts: List[Dict], inventory_inserts: List[Dict]) -> None:
+    """Borra TODOS los productos e inventario y los vuelve a insertar por PostgREST"""
+    try:
+        logger.info("🗑️ Eliminando TODOS los productos existentes...")
+        # Primero eliminar inventario (por restricciones de foreign key)
+        supabase.table('inventory').delete().neq('product_id', 0).execute()
+        # Luego eliminar todos los productos
+        supabase.table('products').delete().neq('id', 0).execute()
+        logger.info("✅ Todos los productos anteriores eliminados")
+    except Exception as e:
+        logger.error(f"Error eliminando productos existentes: {str(e)}")
+        raise
+
+    if product_inserts:
+        supabase.table('products').upsert(product_inserts, on_conflict=["id"]).execute()
+
+    if inventory_inserts:
+        supabase.table('inventory').upsert(inventory_inserts, on_conflict="product_id,warehouse_id").execute()
+
+
 def _parse_price(price_str: str) -> Optional[float]:
     if not price_str or not isinstance(price_str, str) or price_str == 'N/A':
         return None
@@ -233,6 +280,63 @@ def _determine_warehouse_type(warehouse_name: str) -> str:
         return 'Amazon'
     return 'Sucursal'
 
+def _apply_size_filters(query, piso, serie, rin, numeric_columns, text_columns):
+    """
+    Aplica los filtros de medida. Si el valor es numérico usa igualdad sobre las
+    columnas indexadas; si no (ej. 'LT'), conserva el ilike sobre la columna de texto.
+    """
+    parsers = (parse_width, parse_ratio, parse_rim)
+    for value, parser, num_col, text_col in zip((piso, serie, rin), parsers, numeric_columns, text_columns):
+        if not value:
+            continue
+        parsed = parser(value)
+        if parsed is not None:
+            query = query.eq(num_col, parsed)
+        else:
+            query = query.ilike(text_col, f'%{value}%')
+    return query
+
+def _encode_cursor(sku, product_id) -> str:
+    raw = json.dumps([sku, product_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _decode_cursor(cursor: str):
+    """Devuelve (sku, id) del último producto entregado, o None para la primera página"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sku, product_id = json.loads(raw)
+        return sku, int(product_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+
+def _keyset_filter(sku, product_id) -> str:
+    """Filtro PostgREST equivalente a (sku, id) > (:sku, :id) con sku NULLS LAST"""
+    if sku is None:
+        return f'and(sku.is.null,id.gt.{product_id})'
+    quoted = '"' + str(sku).replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return f'sku.gt.{quoted},sku.is.null,and(sku.eq.{quoted},id.gt.{product_id})'
+
+def _build_pagination(page_keys, total, page, per_page, cursor, filters) -> Dict:
+    pagination = {
+        "total_items": total,
+        "per_page": per_page,
+        "filters": filters
+    }
+    if cursor is None:
+        pagination.update({
+            "current_page": page,
+            "total_pages": (total + per_page - 1) // per_page if total is not None else None
+        })
+    else:
+        has_next = len(page_keys) == per_page
+        pagination.update({
+            "has_next": has_next,
+            "next_cursor": _encode_cursor(*page_keys[-1]) if has_next else None
+        })
+    return pagination
+
 def _batch_insert(client, table: str, data: list, batch_size: int = 100):
     for i in range(0, len(data), batch_size):
         batch = data[i:i + batch_size]
@@ -247,10 +351,32 @@ async def get_reporte_zonas_detallado(
     rin: Optional[str] = None,
     page: int = Query(1, ge=1),
     per_page: int = Query(500, ge=1, le=500),
-    current_user: UserInDB = Depends(get_current_user)
+    cursor: Optional[str] = Query(
+        None,
+        description="Paginación por cursor (sku, id): vacío para la primera página, "
+                    "después el next_cursor de la respuesta anterior"
+    ),
+    count: str = Query("exact", regex="^(exact|planned|estimated|none)$"),
+    format_: str = Query(
+        "default", alias="format", regex="^(default|columnar)$",
+        description="columnar: almacenes una sola vez + arreglos paralelos por producto"
+    ),
+    source: str = Query(
+        "auto", regex="^(auto|rest|rpc|snapshot)$",
+        description="auto: snapshot en memoria si está cargado, si no PostgREST; "
+                    "rpc: el reporte se arma en Postgres en una sola llamada"
+    ),
+    current_user: UserInDB = Depends(get_current_user),
+    db: AsyncPostgrestClient = Depends(get_async_postgrest)
 ):
+    # Respuesta condicional: si el cliente ya tiene esta página no se consulta Supabase
+    etag = build_etag(request, "inventory", "prices", "existencia")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     try:
-        logger.info(f"📊 Generando reporte (página {page}, {per_page} items)")
+        logger.info(f"📊 Generando reporte (página {page if cursor is None else 'cursor'}, {per_page} items)")
 
         # --- Registrar búsqueda ---
         try:
@@ -265,155 +391,257 @@ async def get_reporte_zonas_detallado(
         except Exception as e:
             logger.error(f"Error registrando búsqueda: {str(e)}", exc_info=True)
 
-        start = (page - 1) * per_page
-        end = start + per_page - 1
-
-        # --- Obtener productos de products ---
-        query = supabase.table('products').select('*', count='exact')
-        if piso:
-            query = query.ilike('piso', f'%{piso}%')
-        if serie:
-            query = query.ilike('serie', f'%{serie}%')
-        if rin:
-            query = query.ilike('rin', f'%{rin}%')
-        query = query.range(start, end)
-        products_response = query.execute()
-        products_data = products_response.data
-        product_ids = [p['id'] for p in products_data]
-
-        # --- Inventario normal ---
-        inventory_data = []
-        if product_ids:
-            inventory_response = supabase.table('inventory').select(
-                "quantity, product_id, warehouse_id!inner(id, name, type, zone)"
-            ).in_('product_id', product_ids).execute()
-            inventory_data = inventory_response.data
-
-        # --- Precios para products ---
-        skus_products = [str(p['sku']) for p in products_data if p.get('sku')]
-        prices_response = supabase.table('product_prices_aft').select('*').in_('sku', skus_products).execute()
-        prices_dict = {str(p['sku']): p['price'] for p in prices_response.data}
-
-        # --- ExistenciaPlanta ---
-        existencia_query = supabase.table('ExistenciaPlanta').select('*')
-        if piso:
-            existencia_query = existencia_query.ilike('width', f'%{piso}%')
-        if serie:
-            existencia_query = existencia_query.eq('ratio', int(serie))
-        if rin:
-            existencia_query = existencia_query.ilike('diameter', f'%{rin}%')
-        existencia_data = existencia_query.execute().data
-
-        # --- Precios para ExistenciaPlanta ---
-        skus_existencia = [str(e['sku']) for e in existencia_data if e.get('sku')]
-        all_skus = list(set(skus_products + skus_existencia))
-        precios_extra = supabase.table('product_prices_aft').select('*').in_('sku', all_skus).execute()
-        prices_dict.update({str(p['sku']): p['price'] for p in precios_extra.data})
-
-        # --- Armar reporte ---
-        reporte = {}
-        proveedores_info = {}  # Nuevo diccionario para info de proveedores
-
-        # Procesar ExistenciaPlanta primero para obtener info de proveedores
-        for e in existencia_data:
-            manufacturer = e.get('manufacturer')
-            if manufacturer and manufacturer not in proveedores_info:
-                proveedores_info[manufacturer] = {
-                    'update': e.get('update'),
-                    'created_at': e.get('created_at')
-                }
+        snapshot = inventory_snapshot.get_snapshot() if source in ("auto", "snapshot") else None
+        if snapshot is not None and _numeric_size_filters(piso, serie, rin):
+            # Sin consultas: máscara sobre los arreglos del snapshot en memoria
+            reporte, proveedores_info, total, page_keys = _reporte_via_snapshot(
+                snapshot, piso, serie, rin, page, per_page, cursor, count
+            )
+        elif source == "rpc" and _numeric_size_filters(piso, serie, rin):
+            # Un solo round-trip: Postgres arma las filas con precios y ExistenciaPlanta
+            reporte, proveedores_info, total, page_keys = await _reporte_via_rpc(
+                db, piso, serie, rin, page, per_page, cursor, count
+            )
+        else:
+            reporte, proveedores_info, total, page_keys = await _reporte_via_rest(
+                db, piso, serie, rin, page, per_page, cursor, count
+            )
 
-        # productos de products
-        for p in products_data:
-            sku = str(p.get('sku'))
-            if not sku:
-                continue
-            reporte[sku] = {
-                "sku": sku,
-                "nombre": p['name'],
-                "piso": p.get('piso'),
-                "serie": p.get('serie'),
-                "marca": p.get('marca'),
-                "rin": p.get('rin'),
-                "precio": prices_dict.get(sku),
-                "zonas": {str(z): {
-                    "CEDIS": [], "Sucursales": [],
-                    "total_cedis": 0, "total_sucursales": 0, "total_general": 0
-                } for z in range(1, 5)}
-            }
+        body = _to_columnar(reporte) if format_ == "columnar" else {"data": reporte}
 
-        # inventario normal
-        for item in inventory_data:
-            product = next((p for p in products_data if p['id'] == item['product_id']), None)
-            if not product:
-                continue
-            sku = str(product['sku'])
-            if sku not in reporte:
-                continue
+        # Respuesta directa con orjson: evita jsonable_encoder sobre miles de dicts anidados
+        return ORJSONResponse({
+            **body,
+            "proveedores": proveedores_info,  # Agregamos la info de proveedores aquí
+            "pagination": _build_pagination(
+                page_keys, total, page, per_page, cursor,
+                filters={k: v for k, v in {'piso': piso, 'serie': serie, 'rin': rin}.items() if v is not None}
+            )
+        }, headers=cache_headers(etag))
 
-            wh = item['warehouse_id']
-            zone = str(wh.get('zone', '1'))
-            almacen = {"almacen_id": wh['id'], "nombre": wh['name'], "cantidad": item['quantity']}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"💥 Error al generar reporte: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Error al generar reporte: {str(e)}")
 
-            if wh['type'].upper() == 'CEDIS':
-                reporte[sku]['zonas'][zone]['CEDIS'].append(almacen)
-            else:
-                reporte[sku]['zonas'][zone]['Sucursales'].append(almacen)
 
-        # inventario de ExistenciaPlanta
-        for e in existencia_data:
-            sku = str(e['sku'])
-            if not sku:
-                continue
 
-            if sku not in reporte:
-                reporte[sku] = {
-                    "sku": sku,
-                    "nombre": e.get('description', f'SKU-{sku}'),
-                    "marca": e.get('brand'),  
-                    "piso": e.get('width'),
-                    "serie": e.get('ratio'),
-                    "rin": e.get('diameter'),
-                    "precio": prices_dict.get(sku),
-                    "zonas": {}
-                }
+async def _reporte_via_rest(db, piso, serie, rin, page, per_page, cursor, count):
+    """
+    Reporte por PostgREST asíncrono (4 consultas en 2 rondas). Devuelve (filas, proveedores,
+    total, llaves) donde llaves son los (sku, id) de la página en orden, para el cursor.
+    """
+    # --- Obtener productos de products ---
+    query = db.table('products').select('*', count=None if count == 'none' else count)
+    # Medidas numéricas: igualdad sobre el índice (width, ratio, rim)
+    query = _apply_size_filters(query, piso, serie, rin, ('width', 'ratio', 'rim'), ('piso', 'serie', 'rin'))
+    # Orden estable (sku, id): la misma que usa el cursor y el índice products_sku_id_idx
+    # (sku es collate "C": mismo orden que el snapshot y la función RPC)
+    query = query.order('sku').order('id')
+    if cursor is not None:
+        after = _decode_cursor(cursor)
+        if after:
+            query = query.or_(_keyset_filter(*after))
+        query = query.limit(per_page)
+    else:
+        start = (page - 1) * per_page
+        query = query.range(start, start + per_page - 1)
+
+    # --- ExistenciaPlanta (no depende de la página de productos: va en paralelo) ---
+    existencia_query = db.table('ExistenciaPlanta').select('*')
+    existencia_query = _apply_size_filters(
+        existencia_query, piso, serie, rin,
+        ('width_num', 'ratio_num', 'rim_num'), ('width', 'ratio', 'diameter')
+    )
+    products_response, existencia_response = await asyncio.gather(query.execute(), existencia_query.execute())
+    products_data = products_response.data
+    existencia_data = existencia_response.data
+    product_ids = [p['id'] for p in products_data]
+
+    # --- Inventario normal y precios de products + ExistenciaPlanta, en paralelo ---
+    skus_products = [str(p['sku']) for p in products_data if p.get('sku')]
+    skus_existencia = [str(e['sku']) for e in existencia_data if e.get('sku')]
+    all_skus = list(set(skus_products + skus_existencia))
+
+    async def fetch_inventory():
+        if not product_ids:
+            return []
+        response = await db.table('inventory').select(
+            "quantity, product_id, warehouse_id!inner(id, name, type, zone)"
+        ).in_('product_id', product_ids).execute()
+        return response.data
+
+    inventory_data, prices_response = await asyncio.gather(
+        fetch_inventory(),
+        db.table('product_prices_aft').select('*').in_('sku', all_skus).execute()
+    )
+    prices_dict = {str(p['sku']): p['price'] for p in prices_response.data}
+
+    reporte, proveedores_info = _build_reporte(products_data, inventory_data, existencia_data, prices_dict)
+    page_keys = [(p.get('sku'), p['id']) for p in products_data]
+    return reporte, proveedores_info, products_response.count, page_keys
+
+
+def _numeric_size_filters(piso, serie, rin) -> bool:
+    """La función RPC y el snapshot solo filtran por las columnas numéricas"""
+    parsed = parse_size_filters(piso, serie, rin)
+    return all(value is None or num is not None for value, num in zip((piso, serie, rin), parsed))
+
+
+async def _reporte_via_rpc(db, piso, serie, rin, page, per_page, cursor, count):
+    """Reporte armado en Postgres por public.reporte_zonas_detallado (ver supabase/migrations)"""
+    width, ratio, rim = parse_size_filters(piso, serie, rin)
+    params = {
+        "p_width": width,
+        "p_ratio": ratio,
+        "p_rim": rim,
+        "p_limit": per_page,
+        "p_offset": 0 if cursor is not None else (page - 1) * per_page,
+        "p_count": count != 'none'
+    }
+    after = _decode_cursor(cursor) if cursor else None
+    if after:
+        params.update({"p_after_sku": after[0], "p_after_id": after[1]})
+
+    result = (await db.rpc('reporte_zonas_detallado', params).execute()).data or {}
+    page_keys = [tuple(key) for key in result.get('page_keys') or []]
+    return result.get('data') or [], result.get('proveedores') or {}, result.get('total_items'), page_keys
+
+
+def _reporte_via_snapshot(snapshot, piso, serie, rin, page, per_page, cursor, count):
+    """Reporte desde el snapshot en memoria (ver app/services/inventory_snapshot.py)"""
+    width, ratio, rim = parse_size_filters(piso, serie, rin)
+    after = _decode_cursor(cursor) if cursor else None
+    reporte, proveedores_info, total, page_keys = snapshot.reporte(
+        width, ratio, rim, page, per_page, after=after, cursor_mode=cursor is not None
+    )
+    return reporte, proveedores_info, None if count == 'none' else total, page_keys
+
+
+def _build_reporte(products_data, inventory_data, existencia_data, prices_dict):
+    """Arma las filas del reporte de zonas (ordenadas por SKU) y la info de proveedores"""
+    reporte = {}
+    proveedores_info = {}  # Nuevo diccionario para info de proveedores
+
+    # Procesar ExistenciaPlanta primero para obtener info de proveedores
+    for e in existencia_data:
+        manufacturer = e.get('manufacturer')
+        if manufacturer and manufacturer not in proveedores_info:
+            proveedores_info[manufacturer] = {
+                'update': e.get('update'),
+                'created_at': e.get('created_at')
+            }
 
-            zone_name = e.get('warehouse', 'Planta')
-            if zone_name not in reporte[sku]['zonas']:
-                reporte[sku]['zonas'][zone_name] = {
-                    "CEDIS": [], "Sucursales": [],
-                    "total_cedis": 0, "total_sucursales": 0, "total_general": 0
-                }
+    # productos de products (sin SKU no hay fila, igual que en la función RPC y el snapshot)
+    for p in products_data:
+        sku = str(p.get('sku') or '')
+        if not sku:
+            continue
+        reporte[sku] = {
+            "sku": sku,
+            "nombre": p['name'],
+            "piso": p.get('piso'),
+            "serie": p.get('serie'),
+            "marca": p.get('marca'),
+            "rin": p.get('rin'),
+            "precio": prices_dict.get(sku),
+            "zonas": {str(z): {
+                "CEDIS": [], "Sucursales": [],
+                "total_cedis": 0, "total_sucursales": 0, "total_general": 0
+            } for z in range(1, 5)}
+        }
 
-            reporte[sku]['zonas'][zone_name]['CEDIS'].append({
-                "almacen_id": None,
-                "nombre": f"Planta ({zone_name})",
-                "cantidad": e.get('on_hand', 0)
-            })
+    # inventario normal
+    products_by_id = {p['id']: p for p in products_data}
+    for item in inventory_data:
+        product = products_by_id.get(item['product_id'])
+        if not product:
+            continue
+        sku = str(product.get('sku') or '')
+        if sku not in reporte:
+            continue
 
-        # Totales
-        for p in reporte.values():
-            for z in p['zonas'].values():
-                z['total_cedis'] = sum(i['cantidad'] for i in z['CEDIS'])
-                z['total_sucursales'] = sum(i['cantidad'] for i in z['Sucursales'])
-                z['total_general'] = z['total_cedis'] + z['total_sucursales']
+        wh = item['warehouse_id']
+        zone = str(wh.get('zone', '1'))
+        almacen = {"almacen_id": wh['id'], "nombre": wh['name'], "cantidad": item['quantity']}
 
-        return {
-            "data": sorted(reporte.values(), key=lambda x: x['sku']),
-            "proveedores": proveedores_info,  # Agregamos la info de proveedores aquí
-            "pagination": {
-                "total_items": products_response.count,
-                "current_page": page,
-                "per_page": per_page,
-                "total_pages": (products_response.count + per_page - 1) // per_page,
-                "filters": {k: v for k, v in {'piso': piso, 'serie': serie, 'rin': rin}.items() if v is not None}
+        if wh['type'].upper() == 'CEDIS':
+            reporte[sku]['zonas'][zone]['CEDIS'].append(almacen)
+        else:
+            reporte[sku]['zonas'][zone]['Sucursales'].append(almacen)
+
+    # inventario de ExistenciaPlanta
+    for e in existencia_data:
+        sku = str(e.get('sku') or '')
+        if not sku:
+            continue
+
+        if sku not in reporte:
+            reporte[sku] = {
+                "sku": sku,
+                "nombre": e.get('description') or f'SKU-{sku}',
+                "marca": e.get('brand'),  
+                "piso": e.get('width'),
+                "serie": e.get('ratio'),
+                "rin": e.get('diameter'),
+                "precio": prices_dict.get(sku),
+                "zonas": {}
             }
-        }
 
-    except Exception as e:
-        logger.error(f"💥 Error al generar reporte: {str(e)}", exc_info=True)
-        raise HTTPException(500, f"Error al generar reporte: {str(e)}")
+        zone_name = e.get('warehouse') or 'Planta'
+        if zone_name not in reporte[sku]['zonas']:
+            reporte[sku]['zonas'][zone_name] = {
+                "CEDIS": [], "Sucursales": [],
+                "total_cedis": 0, "total_sucursales": 0, "total_general": 0
+            }
+
+        reporte[sku]['zonas'][zone_name]['CEDIS'].append({
+            "almacen_id": None,
+            "nombre": f"Planta ({zone_name})",
+            "cantidad": e.get('on_hand') or 0
+        })
+
+    # Totales
+    for p in reporte.values():
+        for z in p['zonas'].values():
+            z['total_cedis'] = sum(i['cantidad'] for i in z['CEDIS'])
+            z['total_sucursales'] = sum(i['cantidad'] for i in z['Sucursales'])
+            z['total_general'] = z['total_cedis'] + z['total_sucursales']
 
+    return sorted(reporte.values(), key=lambda x: x['sku']), proveedores_info
+
+
+def _to_columnar(rows: List[Dict]) -> Dict:
+    """
+    Formato compacto: el diccionario de almacenes se envía una sola vez y cada
+    producto lleva arreglos paralelos de índices de almacén y cantidades.
+    Los totales por zona se recalculan en el cliente.
+    """
+    almacenes = []
+    almacen_index = {}
+    data = []
+
+    for row in rows:
+        indices, cantidades = [], []
+        for zona, zona_data in row["zonas"].items():
+            for tipo, items in (("CEDIS", zona_data["CEDIS"]), ("Sucursal", zona_data["Sucursales"])):
+                for item in items:
+                    key = (item["almacen_id"], item["nombre"], tipo, zona)
+                    idx = almacen_index.get(key)
+                    if idx is None:
+                        idx = almacen_index[key] = len(almacenes)
+                        almacenes.append({"id": item["almacen_id"], "nombre": item["nombre"], "tipo": tipo, "zona": zona})
+                    indices.append(idx)
+                    cantidades.append(item["cantidad"])
+
+        data.append({
+            **{k: row.get(k) for k in ("sku", "nombre", "piso", "serie", "rin", "marca", "precio")},
+            "almacenes": indices,
+            "cantidades": cantidades
+        })
+
+    return {"format": "columnar", "almacenes": almacenes, "data": data}
 
 
 def _process_products_data(products_data, inventory_data, precios_data):
@@ -479,13 +707,431 @@ def _process_products_data(products_data, inventory_data, precios_data):
     
     return list(reporte.values())
 
+@router.post("/reporte-zonas-detallado/lote", response_model=Dict)
+async def get_reporte_zonas_lote(
+    payload: InventoryBatchSearch,
+    per_size: int = Query(200, ge=1, le=500),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Disponibilidad por zona y precio de varias medidas en una sola respuesta.
+    Se resuelve desde el snapshot en memoria o con consultas por conjunto (no una por medida).
+    """
+    try:
+        medidas = []
+        for item in payload.medidas:
+            size = parse_size_filters(item.piso, item.serie, item.rin)
+            valid = None not in size
+            medidas.append({
+                "piso": item.piso, "serie": item.serie, "rin": item.rin,
+                "medidas": inventory_snapshot.format_size(*size) if valid else f"{item.piso}/{item.serie}R{item.rin}",
+                "size": size if valid else None
+            })
+
+        # --- Registrar búsquedas en un solo insert ---
+        try:
+            supabase_db_service.registrar_busquedas_supabase(
+                usuario_id=str(current_user.id),
+                partner_id=str(current_user.parent_partner_id) if current_user.parent_partner_id else None,
+                busquedas=medidas
+            )
+        except Exception as e:
+            logger.error(f"Error registrando búsquedas: {str(e)}", exc_info=True)
+
+        sizes = list(dict.fromkeys(m["size"] for m in medidas if m["size"] is not None))
+        snapshot = inventory_snapshot.get_snapshot()
+        if snapshot is not None:
+            por_medida = {}
+            for size in sizes:
+                rows, proveedores, total, _ = snapshot.reporte(*size, page=1, per_page=per_size)
+                por_medida[size] = (rows, proveedores, total)
+        else:
+            por_medida = _reporte_lote_via_rest(sizes, per_size)
+
+        resultados = []
+        proveedores_info = {}
+        for m in medidas:
+            base = {"medida": m["medidas"], "piso": m["piso"], "serie": m["serie"], "rin": m["rin"]}
+            if m["size"] is None:
+                resultados.append({**base, "error": "Medida inválida: piso, serie y rin deben ser numéricos"})
+                continue
+            rows, proveedores, total = por_medida[m["size"]]
+            for manufacturer, info in proveedores.items():
+                proveedores_info.setdefault(manufacturer, info)
+            resultados.append({**base, "total_items": total, "data": rows})
+
+        return ORJSONResponse({"resultados": resultados, "proveedores": proveedores_info})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"💥 Error al generar reporte por lote: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Error al generar reporte por lote: {str(e)}")
+
+
+def _require_snapshot():
+    """Snapshot vigente para los endpoints que solo existen en memoria"""
+    if not inventory_snapshot.SNAPSHOT_ENABLED:
+        # Deshabilitado nunca se va a cargar: no tiene caso reintentar
+        raise HTTPException(status_code=501, detail="Disponible solo con INVENTORY_SNAPSHOT_ENABLED=true")
+    snapshot = inventory_snapshot.get_snapshot()
+    if snapshot is None:
+        raise HTTPException(
+            status_code=503,
+            detail="El inventario en memoria aún no está cargado, intenta de nuevo",
+            headers={"Retry-After": "30"}
+        )
+    return snapshot
+
+
+def _sizes_or_filter(sizes, columns) -> str:
+    """Filtro PostgREST or=(and(width.eq.205,ratio.eq.55,rim.eq.16),...) para todas las medidas"""
+    width, ratio, rim = columns
+    return ",".join(f"and({width}.eq.{w},{ratio}.eq.{r},{rim}.eq.{d:g})" for w, r, d in sizes)
+
+
+def _chunks(values: list, size: int = 300):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _fetch_pages(build_query, page_size: int = 1000) -> List[Dict]:
+    """Todas las filas de una consulta ordenada, en páginas (PostgREST corta en max-rows)"""
+    rows = []
+    start = 0
+    while True:
+        batch = build_query().range(start, start + page_size - 1).execute().data
+        rows.extend(batch)
+        if len(batch) < page_size:
+            return rows
+        start += page_size
+
+
+def _reporte_lote_via_rest(sizes, per_size, page_size: int = 1000):
+    """Todas las medidas con consultas por conjunto: productos, inventario, precios y planta"""
+    if not sizes:
+        return {}
+
+    # --- Productos de todas las medidas (paginado por max-rows de PostgREST) ---
+    products_data = _fetch_pages(
+        lambda: supabase.table('products').select('*')
+            .or_(_sizes_or_filter(sizes, ('width', 'ratio', 'rim')))
+            .order('sku').order('id'),
+        page_size
+    )
+
+    products_by_size = {size: [] for size in sizes}
+    totals = {size: 0 for size in sizes}
+    for p in products_data:
+        size = (p.get('width'), p.get('ratio'), float(p['rim']) if p.get('rim') is not None else None)
+        if size in products_by_size:
+            totals[size] += 1
+            if len(products_by_size[size]) < per_size:
+                products_by_size[size].append(p)
+    page_products = [p for rows in products_by_size.values() for p in rows]
+
+    # --- Inventario de las páginas (por bloques para no exceder el largo de la URL) ---
+    inventory_data = []
+    for ids in _chunks([p['id'] for p in page_products]):
+        # Un bloque de productos puede tener más filas de inventario que max-rows
+        inventory_data.extend(_fetch_pages(
+            lambda: supabase.table('inventory').select(
+                "quantity, product_id, warehouse_id!inner(id, name, type, zone)"
+            ).in_('product_id', ids).order('product_id').order('warehouse_id'),
+            page_size
+        ))
+
+    # --- ExistenciaPlanta de todas las medidas (también paginado) ---
+    existencia_data = _fetch_pages(
+        lambda: supabase.table('ExistenciaPlanta').select('*')
+            .or_(_sizes_or_filter(sizes, ('width_num', 'ratio_num', 'rim_num')))
+            .order('id'),
+        page_size
+    )
+    existencia_by_size = {size: [] for size in sizes}
+    for e in existencia_data:
+        size = (e.get('width_num'), e.get('ratio_num'), float(e['rim_num']) if e.get('rim_num') is not None else None)
+        if size in existencia_by_size:
+            existencia_by_size[size].append(e)
+
+    # --- Precios de todos los SKUs ---
+    skus = list({str(r['sku']) for r in page_products + existencia_data if r.get('sku')})
+    prices_dict = {}
+    for chunk in _chunks(skus):
+        prices_dict.update({
+            str(p['sku']): p['price']
+            for p in supabase.table('product_prices_aft').select('sku, price').in_('sku', chunk).execute().data
+        })
+
+    inventory_by_product = {}
+    for item in inventory_data:
+        inventory_by_product.setdefault(item['product_id'], []).append(item)
+
+    por_medida = {}
+    for size in sizes:
+        rows = products_by_size[size]
+        inventory = [item for p in rows for item in inventory_by_product.get(p['id'], [])]
+        reporte, proveedores = _build_reporte(rows, inventory, existencia_by_size[size], prices_dict)
+        por_medida[size] = (reporte, proveedores, totals[size])
+    return por_medida
+
+
+@router.get("/equivalencias", response_model=Dict)
+async def get_equivalencias(
+    request: Request,
+    piso: str = Query(..., example="205"),
+    serie: str = Query(..., example="55"),
+    rin: str = Query(..., example="16"),
+    limit: int = Query(10, ge=1, le=inventory_snapshot.EQUIVALENCE_MAX_NEIGHBORS),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Medidas alternativas con existencia (inventario y planta) para una medida agotada:
+    mismo rin y diámetro total dentro de la tolerancia, ordenadas por diferencia y cantidad.
+    """
+    width, ratio, rim = parse_size_filters(piso, serie, rin)
+    if None in (width, ratio, rim):
+        raise HTTPException(status_code=400, detail="Medida inválida: piso, serie y rin deben ser numéricos")
+
+    etag = build_etag(request, "inventory", "existencia")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    snapshot = _require_snapshot()
+
+    return ORJSONResponse({
+        "medida": inventory_snapshot.format_size(width, ratio, rim),
+        "diametro_mm": round(inventory_snapshot.overall_diameter_mm(width, ratio, rim), 1),
+        "tolerancia_pct": inventory_snapshot.EQUIVALENCE_TOLERANCE_PCT,
+        "alternativas": snapshot.equivalent_sizes(width, ratio, rim, limit)
+    }, headers=cache_headers(etag))
+
+
+@router.get("/facetas", response_model=Dict)
+async def get_facetas(
+    request: Request,
+    piso: Optional[str] = None,
+    serie: Optional[str] = None,
+    solo_existencia: bool = True,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Opciones de los filtros de medida con existencia (inventario + planta), en cascada:
+    ?piso=205 acota serie y rin; ?piso=205&serie=55 acota rin.
+    """
+    width, ratio = parse_width(piso), parse_ratio(serie)
+    if (piso and width is None) or (serie and ratio is None):
+        raise HTTPException(400, "piso y serie deben ser numéricos")
+
+    etag = build_etag(request, "inventory", "existencia")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    snapshot = _require_snapshot()
+
+    return ORJSONResponse(snapshot.facets(width, ratio, solo_existencia), headers=cache_headers(etag))
+
+
+ROLLUP_DIMENSIONS = ("zona", "tipo", "rim", "width", "ratio", "marca")
+
+
+@router.get("/estadisticas", response_model=Dict)
+async def get_estadisticas(
+    request: Request,
+    group_by: str = Query("zona", description=f"Dimensiones separadas por coma: {', '.join(ROLLUP_DIMENSIONS)}"),
+    zona: Optional[str] = None,
+    tipo: Optional[str] = Query(None, regex="^(CEDIS|Sucursal)$"),
+    piso: Optional[str] = None,
+    serie: Optional[str] = None,
+    rin: Optional[str] = None,
+    marca: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Totales de inventario desde la vista materializada inventory_rollups, p. ej.
+    ?group_by=zona&rin=15 (unidades de rin 15 por zona) o ?group_by=marca,tipo.
+    """
+    # Sin repetir dimensiones, en el orden pedido
+    dimensions = list(dict.fromkeys(d.strip() for d in group_by.split(",") if d.strip()))
+    invalid = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+    if invalid:
+        raise HTTPException(400, f"Dimensiones no válidas: {', '.join(invalid)}")
+
+    if not _numeric_size_filters(piso, serie, rin):
+        raise HTTPException(400, "piso, serie y rin deben ser numéricos")
+
+    etag = build_etag(request, "inventory")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
+    try:
+        width, ratio, rim = parse_size_filters(piso, serie, rin)
+        params = {
+            "p_group_by": dimensions,
+            "p_zona": zona,
+            "p_tipo": tipo,
+            "p_width": width,
+            "p_ratio": ratio,
+            "p_rim": rim,
+            "p_marca": marca
+        }
+        # Lectura por índice del nivel zona / tipo ya agrupado en la vista; paginado por max-rows
+        data = _fetch_pages(lambda: supabase.rpc('inventory_rollup_totals', params))
+
+        return ORJSONResponse({
+            "group_by": dimensions,
+            "total_cantidad": sum(g["cantidad"] or 0 for g in data),
+            "data": data
+        }, headers=cache_headers(etag))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"💥 Error consultando estadísticas: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Error consultando estadísticas: {str(e)}")
+
+
+@router.get("/historial/corridas", response_model=List[Dict])
+async def get_historial_corridas(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Corridas de sync registradas (checkpoint / delta y número de tuplas)"""
+    try:
+        return inventory_history.list_runs(limit)
+    except Exception as e:
+        logger.error(f"Error listando historial: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Error listando historial: {str(e)}")
+
+
+@router.get("/historial", response_model=Dict)
+async def get_historial(
+    fecha: Optional[datetime] = Query(None, description="Estado a esta fecha/hora (ISO 8601); vacío = última corrida"),
+    zona: Optional[str] = None,
+    tipo: Optional[str] = Query(None, regex="^(CEDIS|Sucursal)$"),
+    warehouse_id: Optional[int] = None,
+    sku: Optional[str] = None,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """
+    Inventario tal como quedó en la última corrida de sync anterior a la fecha, p. ej.
+    ?fecha=2026-10-13T18:00:00-06:00&zona=2&tipo=CEDIS. Nombres, zonas y tipos de
+    almacén son los actuales.
+    """
+    try:
+        if fecha is not None and fecha.tzinfo is None:
+            fecha = MEXICO_TZ.localize(fecha)
+        run, product_ids, warehouse_ids, quantities = await asyncio.get_running_loop().run_in_executor(
+            None, inventory_history.state_as_of, fecha
+        )
+        if run is None:
+            raise HTTPException(404, "No hay historial de inventario para esa fecha")
+
+        warehouses = {w["id"]: w for w in supabase_db_service.fetch_all("warehouses", "id, name, type, zone")}
+        snapshot = inventory_snapshot.get_snapshot()
+        if snapshot is not None:
+            products = snapshot.product_texts(sorted(set(product_ids.tolist())))
+        else:
+            products = {p["id"]: p for p in supabase_db_service.fetch_all("products", "id, sku, name")}
+
+        data = []
+        for pid, wid, qty in zip(product_ids.tolist(), warehouse_ids.tolist(), quantities.tolist()):
+            wh = warehouses.get(wid, {})
+            product = products.get(pid, {})
+            wh_tipo = 'CEDIS' if str(wh.get('type') or '').upper() == 'CEDIS' else 'Sucursal'
+            if warehouse_id is not None and wid != warehouse_id:
+                continue
+            if zona is not None and str(wh.get('zone')) != zona:
+                continue
+            if tipo is not None and wh_tipo != tipo:
+                continue
+            if sku is not None and product.get('sku') != sku:
+                continue
+            data.append({
+                "product_id": pid,
+                "sku": product.get('sku'),
+                "nombre": product.get('name'),
+                "warehouse_id": wid,
+                "almacen": wh.get('name'),
+                "zona": str(wh['zone']) if wh.get('zone') is not None else None,
+                "tipo": wh_tipo,
+                "cantidad": qty
+            })
+
+        return ORJSONResponse({
+            "corrida": run,
+            "total_items": len(data),
+            "total_cantidad": sum(row["cantidad"] for row in data),
+            "data": data
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"💥 Error consultando historial: {str(e)}", exc_info=True)
+        raise HTTPException(500, f"Error consultando historial: {str(e)}")
+
+
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _sse_message(message: Dict) -> bytes:
+    return b"id: " + message["generation"].encode() + b"\nevent: inventory\ndata: " + orjson.dumps(message) + b"\n\n"
+
+
+@router.get("/eventos")
+async def inventory_eventos(
+    request: Request,
+    current_user: UserInDB = Depends(get_current_user_for_stream)
+):
+    """
+    Server-sent events con los cambios de stock, precios y planta (ver app/services/inventory_events.py).
+    Desde el navegador: new EventSource(`/inventory/eventos?token=${accessToken}`); también
+    acepta el header Authorization o la cookie access_token.
+    El id de cada evento es la generación de datos; al reconectar con Last-Event-ID de una
+    generación vieja se envía un resync.
+    """
+    queue = inventory_events.subscribe()
+
+    async def stream():
+        try:
+            yield b"retry: 5000\n\n"
+            last_seen = request.headers.get("last-event-id")
+            current = inventory_events.last_generation()
+            if last_seen and current and last_seen != current:
+                yield _sse_message({"generation": current, "changes": [{"type": "resync"}]})
+
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield b": ping\n\n"
+                    continue
+                yield _sse_message(message)
+        finally:
+            inventory_events.unsubscribe(queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+
 @router.get("/export/supabase/csv", tags=["inventory"])
 async def export_supabase_inventory_csv(
+    request: Request,
     current_user: UserInDB = Depends(get_current_user)
 ):
     """
     Exporta todo el inventario desde Supabase en formato CSV simplificado.
     """
+    etag = build_etag(request, "inventory", "prices")
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+
     try:
         logger.info(f"Iniciando exportación CSV desde Supabase para usuario {current_user.email}")
 
@@ -566,7 +1212,7 @@ async def export_supabase_inventory_csv(
         return StreamingResponse(
             generate_csv(),
             media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+            headers={"Content-Disposition": f"attachment; filename={filename}", **cache_headers(etag)}
         )
 
     except HTTPException:
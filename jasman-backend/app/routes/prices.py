@@ -4,6 +4,7 @@ from fastapi.responses import JSONResponse
 from app.models import UserInDB
 from app.services.auth import get_current_user
 from app.services.supabase_db import supabase_db_service
+from app.services import data_generation
 from datetime import datetime
 import pandas as pd
 import io
@@ -87,6 +88,9 @@ async def upload_prices(
             except Exception as e:
                 errors.append(f"Error procesando SKU {update['sku']}: {str(e)}")
 
+        if success_count:
+            data_generation.mark_changed("prices")
+
         return JSONResponse(
             status_code=status.HTTP_200_OK,
             content={
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from app.models import UserInDB, UserUpdate
 from app.models import UserInDB, UserRole
-from app.services.auth import get_current_user, get_password_hash
+from app.services.auth import get_current_user, get_password_hash_async
 from app.services.supabase_db import supabase_db_service
+from app.utils.supabase import upload_face_image
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -14,6 +16,9 @@ class FlexiblePasswordUpdate(BaseModel):
     user_id: Optional[UUID] = None  # Opcional: si es None, se usa el usuario actual
     new_password: str = Field(..., min_length=8)
 
+class FaceImageUpload(BaseModel):
+    image: str = Field(..., min_length=1)  # JPEG/PNG en base64
+
 @router.get("/me", response_model=UserInDB)
 async def read_user_me(current_user: UserInDB = Depends(get_current_user)):
     return current_user
@@ -53,7 +58,8 @@ async def update_self(
         if not updated_fields:
             return current_user
 
-        supabase_db_service.update_user(
+        await run_in_threadpool(
+            supabase_db_service.update_user,
             current_user.id,
             updated_fields
         )
@@ -100,11 +106,11 @@ async def change_password_flexible(
     try:
         # Hashear la nueva contraseña
         update_data = {
-            "contraseña": get_password_hash(data.new_password)
+            "contraseña": await get_password_hash_async(data.new_password)
         }
         
         # Actualizar en la base de datos
-        success = supabase_db_service.update_user(target_user_id, update_data)
+        success = await run_in_threadpool(supabase_db_service.update_user, target_user_id, update_data)
         
         if not success:
             raise HTTPException(
@@ -130,6 +136,26 @@ async def change_password_flexible(
         )
 
 
+@router.post("/me/face", response_model=dict)
+async def upload_face(
+    data: FaceImageUpload,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    """Registra la foto de rostro del usuario: guarda imagen reducida y miniatura, regresa sus URLs"""
+    try:
+        return await upload_face_image(data.image, current_user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error uploading face image: {str(e)}"
+        )
+
+
 @router.post("/logout")
 async def logout_user():
     return {"message": "Logged out successfully"}
@@ -0,0 +1,239 @@
+# app/services/ExistenciaPlantaService.py
+"""
+Carga de existencias de planta (archivos CSV/XLSX de proveedores) a ExistenciaPlanta.
+
+El archivo se lee por bloques (pandas chunksize para CSV, openpyxl read_only para
+XLSX), cada bloque se normaliza y se sube con un upsert masivo sobre la llave
+(manufacturer, sku, warehouse). Todas las filas de la carga llevan la misma marca
+"update"; al terminar se borran las filas del proveedor que no vinieron en el archivo.
+
+Uso desde línea de comandos (desde jasman-backend/):
+    python -m app.services.ExistenciaPlantaService archivo.xlsx --manufacturer "PROVEEDOR"
+"""
+import math
+import argparse
+import logging
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+import pandas as pd
+import pytz
+
+from app.supabase import supabase
+from app.services import data_generation
+from app.utils.tire_size import parse_width, parse_ratio, parse_rim, parse_size_string, format_rim
+
+logger = logging.getLogger(__name__)
+
+TABLE = "ExistenciaPlanta"
+CHUNK_SIZE = 5000
+UPSERT_BATCH_SIZE = 1000
+DEFAULT_WAREHOUSE = "Planta"
+# Líneas omitidas que se regresan en el resumen, por motivo
+MAX_SKIPPED_REPORTED = 500
+
+# Encabezados aceptados en los archivos de proveedores -> columna de ExistenciaPlanta
+COLUMN_ALIASES = {
+    "sku": ("sku", "codigo", "código", "clave", "articulo", "artículo"),
+    "description": ("description", "descripcion", "descripción", "nombre"),
+    "brand": ("brand", "marca"),
+    "size": ("size", "medida", "medidas"),
+    "width": ("width", "piso", "ancho"),
+    "ratio": ("ratio", "serie", "perfil"),
+    "diameter": ("diameter", "rin", "diametro", "diámetro"),
+    "warehouse": ("warehouse", "almacen", "almacén", "planta", "sucursal"),
+    "on_hand": ("on_hand", "existencia", "existencias", "cantidad", "stock", "disponible"),
+}
+
+
+def _resolve_columns(headers: List[str]) -> Dict[str, str]:
+    """Encabezado del archivo -> columna destino"""
+    normalized = {str(h).strip().lower(): h for h in headers if h is not None}
+    mapping = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                mapping[normalized[alias]] = column
+                break
+    missing = {"sku", "on_hand"} - set(mapping.values())
+    if missing:
+        raise ValueError(f"El archivo no tiene las columnas requeridas: {', '.join(sorted(missing))}")
+    if "size" not in mapping.values() and not {"width", "ratio", "diameter"} <= set(mapping.values()):
+        raise ValueError("El archivo debe tener la columna 'medida' o 'piso', 'serie' y 'rin'")
+    return mapping
+
+
+def iter_chunks(file: BinaryIO, filename: str, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Bloques del archivo como DataFrames de texto con las columnas ya renombradas"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        reader = pd.read_csv(file, dtype=str, chunksize=chunk_size, encoding="utf-8-sig", keep_default_na=False)
+        mapping = None
+        for chunk in reader:
+            mapping = mapping or _resolve_columns(list(chunk.columns))
+            yield chunk[list(mapping)].rename(columns=mapping)
+    elif name.endswith(".xlsx"):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = list(next(rows, None) or [])
+            mapping = _resolve_columns(headers)
+            positions = [(i, mapping[h]) for i, h in enumerate(headers) if h in mapping]
+            buffer = []
+            for row in rows:
+                buffer.append({column: row[i] if i < len(row) else None for i, column in positions})
+                if len(buffer) >= chunk_size:
+                    yield pd.DataFrame(buffer)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer)
+        finally:
+            workbook.close()
+    else:
+        raise ValueError("Formato de archivo no soportado. Use CSV o XLSX.")
+
+
+def _text(value) -> Optional[str]:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+class RowSkipped(ValueError):
+    """Fila que no se carga; reason es sin_sku, medida o existencia"""
+
+    def __init__(self, reason: str, value=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.value = value
+
+
+def _size_text(row: Dict) -> Optional[str]:
+    parts = [_text(row.get(c)) for c in ("width", "ratio", "diameter")]
+    return _text(row.get("size")) or "/".join(p or "" for p in parts)
+
+
+def normalize_row(row: Dict, manufacturer: str, stamp: str) -> Dict:
+    """Fila del archivo -> fila de ExistenciaPlanta; RowSkipped si no tiene SKU, medida o existencia válidas"""
+    sku = _text(row.get("sku"))
+    if sku is None:
+        raise RowSkipped("sin_sku")
+    if sku.endswith(".0") and sku[:-2].isdigit():
+        sku = sku[:-2]  # Excel guarda los códigos numéricos como float
+
+    width, ratio, rim = parse_width(row.get("width")), parse_ratio(row.get("ratio")), parse_rim(row.get("diameter"))
+    if None in (width, ratio, rim):
+        width, ratio, rim = parse_size_string(row.get("size"))
+    if None in (width, ratio, rim):
+        # Medidas LT / flotación o texto sin medida
+        raise RowSkipped("medida", _size_text(row))
+
+    raw_on_hand = _text(row.get("on_hand"))
+    try:
+        value = float(raw_on_hand or 0)
+        if not math.isfinite(value):  # "inf", "1e400", "nan"
+            raise ValueError(raw_on_hand)
+        on_hand = int(value)
+    except (ValueError, OverflowError):
+        raise RowSkipped("existencia", raw_on_hand)
+
+    return {
+        "manufacturer": manufacturer,
+        "sku": sku,
+        "description": _text(row.get("description")),
+        "brand": _text(row.get("brand")),
+        "size": f"{width}/{ratio}R{format_rim(rim)}",
+        "width": str(width),
+        "ratio": ratio,
+        "diameter": format_rim(rim),
+        "warehouse": _text(row.get("warehouse")) or DEFAULT_WAREHOUSE,
+        "on_hand": max(on_hand, 0),
+        "update": stamp,
+    }
+
+
+def _upsert(rows: List[Dict]) -> None:
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        supabase.table(TABLE).upsert(
+            rows[i:i + UPSERT_BATCH_SIZE], on_conflict="manufacturer,sku,warehouse"
+        ).execute()
+
+
+def load_file(file: BinaryIO, filename: str, manufacturer: str, replace: bool = True) -> Dict:
+    """
+    Carga un archivo de existencias del proveedor. Con replace=True se borran las filas del
+    proveedor que no vinieron en el archivo (la carga representa su existencia completa).
+    """
+    manufacturer = manufacturer.strip()
+    if not manufacturer:
+        raise ValueError("Se requiere el proveedor (manufacturer)")
+
+    stamp = datetime.now(pytz.timezone('America/Mexico_City')).isoformat()
+    rows_read = rows_loaded = rows_skipped = 0
+    skipped: Dict[str, List[Dict]] = {"sin_sku": [], "medida": [], "existencia": []}
+
+    for chunk in iter_chunks(file, filename):
+        # Dentro del bloque, la última fila de cada (sku, almacén) gana: un upsert no puede
+        # tocar la misma llave dos veces
+        batch = {}
+        for offset, row in enumerate(chunk.to_dict("records")):
+            try:
+                normalized = normalize_row(row, manufacturer, stamp)
+            except RowSkipped as e:
+                rows_skipped += 1
+                if len(skipped[e.reason]) < MAX_SKIPPED_REPORTED:
+                    skipped[e.reason].append({
+                        "linea": rows_read + offset + 2,  # +2: encabezado y base 1, como en Excel
+                        "sku": _text(row.get("sku")),
+                        "valor": e.value
+                    })
+                continue
+            batch[(normalized["sku"], normalized["warehouse"])] = normalized
+        rows_read += len(chunk)
+        _upsert(list(batch.values()))
+        rows_loaded += len(batch)
+        logger.info(f"📦 {manufacturer}: {rows_read} filas leídas, {rows_loaded} cargadas")
+
+    deleted = 0
+    if replace:
+        response = supabase.table(TABLE).delete() \
+            .eq("manufacturer", manufacturer) \
+            .or_(f'update.lt."{stamp}",update.is.null') \
+            .execute()
+        deleted = len(response.data or [])
+
+    data_generation.mark_changed("existencia")
+    logger.info(f"✅ Existencia de {manufacturer} cargada: {rows_loaded} filas, {deleted} eliminadas")
+
+    return {
+        "manufacturer": manufacturer,
+        "update": stamp,
+        "rows_read": rows_read,
+        "rows_loaded": rows_loaded,
+        "rows_deleted": deleted,
+        "rows_skipped": rows_skipped,
+        "skipped_lines": sorted(item["linea"] for items in skipped.values() for item in items)[:100],
+        # Líneas por motivo para corregir el archivo (hasta MAX_SKIPPED_REPORTED por motivo)
+        "skipped": skipped
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga existencias de planta de un proveedor")
+    parser.add_argument("path", help="Archivo CSV o XLSX")
+    parser.add_argument("--manufacturer", required=True, help="Proveedor (columna manufacturer)")
+    parser.add_argument("--keep-missing", action="store_true",
+                        help="No borrar las filas del proveedor que no vienen en el archivo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.path, "rb") as file:
+        result = load_file(file, args.path, args.manufacturer, replace=not args.keep_missing)
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,13 @@ import os
 from typing import Optional
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, status, Depends, Request, Query
 from fastapi.security import OAuth2PasswordBearer
 from app.models import TokenData, UserInDB
 from app.services.supabase_db import supabase_db_service
+from app.services.user_cache import user_cache
+from app.services.password_hasher import password_executor
+from app.services.token_revocations import token_revocations, STATELESS_AUTH, CLAIM_FIELDS
 from dotenv import load_dotenv
 import logging
 from uuid import UUID
@@ -48,6 +51,14 @@ def get_password_hash(password: str) -> str:
             detail="Error processing password"
         )
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password en el pool de bcrypt (no bloquea el event loop)"""
+    return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash en el pool de bcrypt (no bloquea el event loop)"""
+    return await password_executor.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta is None:
@@ -56,18 +67,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def authenticate_user(email: str, password: str) -> Optional[UserInDB]:
+def user_token_claims(user: UserInDB) -> dict:
+    """Claims del token de acceso; en modo sin estado incluye los datos del usuario"""
+    claims = {"sub": str(user.id), "rol": user.role.value}
+    if STATELESS_AUTH:
+        version = token_revocations.version_for_new_token(user.id)
+        if version is not None:
+            data = user.dict(by_alias=True)
+            claims["usr"] = {
+                field: str(data[field]) if field in ("parent_partner_id", "creado_en") and data[field] is not None else data[field]
+                for field in CLAIM_FIELDS
+            }
+            claims["ver"] = version
+    return claims
+
+async def authenticate_user(email: str, password: str) -> Optional[UserInDB]:
     try:
         user_data = supabase_db_service.get_user_by_email(email)
         if not user_data:
             logger.warning(f"User not found: {email}")
             return None
 
-        if not verify_password(password, user_data.get("contraseña")):
+        if not await verify_password_async(password, user_data.get("contraseña")):
             logger.warning(f"Invalid password for user: {email}")
             return None
 
         return UserInDB(**user_data)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -89,8 +116,39 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
         token_data = TokenData(user_id=user_id)
     except JWTError as e:
         raise credentials_exception
-    
-    user = supabase_db_service.get_user_by_id(token_data.user_id)
+
+    # Token sin estado: se valida contra la lista de revocación en memoria. Si la lista no
+    # está disponible se cae al camino normal (consulta del usuario)
+    if STATELESS_AUTH and payload.get("usr") is not None:
+        current_version = token_revocations.current_version(token_data.user_id)
+        if current_version is not None:
+            if payload.get("ver", 0) < current_version:
+                raise credentials_exception
+            return UserInDB(id=token_data.user_id, rol=payload.get("rol"), contraseña="", **payload["usr"])
+
+    # Cache con TTL corto: update_user / delete_user invalidan la entrada
+    user = user_cache.get_or_load(str(token_data.user_id), supabase_db_service.get_user_by_id)
     if user is None:
         raise credentials_exception
-    return UserInDB(**user)
\ No newline at end of file
+    return UserInDB(**user)
+
+def get_current_user_for_stream(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token de acceso (EventSource no puede enviar Authorization)")
+) -> UserInDB:
+    """
+    get_current_user para endpoints de streaming: el EventSource del navegador no envía
+    headers, así que el token también se acepta en ?token= o en la cookie access_token.
+    El header Authorization tiene prioridad.
+    """
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    token = token or request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return get_current_user(token)
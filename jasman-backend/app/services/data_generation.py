@@ -0,0 +1,101 @@
+# app/services/data_generation.py
+"""
+Generación de los datos de inventario, precios y existencia de planta.
+
+Cada "generación" es la marca de la última escritura en Supabase (last_sync de
+products, updated_at de precios, update de ExistenciaPlanta). Al venir de la base
+de datos, todos los workers llegan al mismo valor y por lo tanto generan los mismos
+ETags. Se refresca tras cada sync/carga local y periódicamente desde el scheduler;
+leerla en una petición no toca Supabase. Los caches en memoria se suscriben con
+on_change() y se recargan cuando la generación cambia (en este worker o en otro).
+"""
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Set
+
+import pytz
+
+from app.supabase import supabase
+
+logger = logging.getLogger(__name__)
+
+MEXICO_TZ = pytz.timezone('America/Mexico_City')
+
+# tipo -> (tabla, columna de marca de tiempo)
+_SOURCES = {
+    "inventory": ("products", "last_sync"),
+    "prices": ("product_prices_aft", "updated_at"),
+    "existencia": ("ExistenciaPlanta", "update"),
+}
+
+_lock = threading.Lock()
+_generations: Dict[str, str] = {kind: "0" for kind in _SOURCES}
+
+# Callbacks (caches en memoria) que se recargan cuando cambia una generación.
+# Corren en un hilo propio y en serie para no bloquear el event loop ni la petición.
+_listeners: List[Callable[[Set[str]], None]] = []
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="data-generation")
+
+
+def on_change(callback: Callable[[Set[str]], None]) -> None:
+    """Registra un callback que recibe el conjunto de tipos que cambiaron"""
+    _listeners.append(callback)
+
+
+def _run_listeners(kinds: Set[str]) -> None:
+    for callback in list(_listeners):
+        try:
+            callback(kinds)
+        except Exception as e:
+            logger.error(f"Error recargando {getattr(callback, '__qualname__', callback)}: {str(e)}", exc_info=True)
+
+
+def _notify(kinds: Set[str]) -> None:
+    if kinds and _listeners:
+        _executor.submit(_run_listeners, kinds)
+
+
+def current(*kinds: str) -> str:
+    """Generación combinada de los tipos pedidos (todos si no se indica ninguno)"""
+    with _lock:
+        return "|".join(_generations[k] for k in (kinds or _SOURCES))
+
+
+def _read_marker(kind: str) -> str:
+    table, column = _SOURCES[kind]
+    response = supabase.table(table) \
+        .select(column) \
+        .order(column, desc=True, nullsfirst=False) \
+        .limit(1) \
+        .execute()
+    if not response.data:
+        return "empty"
+    return str(response.data[0].get(column))
+
+
+def refresh(*kinds: str) -> Dict[str, bool]:
+    """Relee la marca de Supabase; devuelve qué tipos cambiaron"""
+    changed = {}
+    for kind in (kinds or _SOURCES):
+        try:
+            marker = _read_marker(kind)
+        except Exception as e:
+            logger.error(f"Error leyendo generación de {kind}: {str(e)}")
+            continue
+        with _lock:
+            changed[kind] = _generations[kind] != marker
+            _generations[kind] = marker
+    _notify({kind for kind, did_change in changed.items() if did_change})
+    return changed
+
+
+def mark_changed(kind: str) -> None:
+    """Llamar después de escribir en Supabase (sync, carga de precios, carga de planta)"""
+    result = refresh(kind)
+    if kind not in result:
+        # No se pudo leer la marca: invalidar localmente para no servir datos viejos
+        with _lock:
+            _generations[kind] = f"local-{datetime.now(MEXICO_TZ).isoformat()}"
+        _notify({kind})
@@ -0,0 +1,167 @@
+# app/services/inventory_events.py
+"""
+Eventos de cambio de inventario y precios para GET /inventory/eventos (SSE).
+
+Cuando cambia una generación de datos (sync de Odoo, carga de precios o de planta, en
+este worker o detectada por el refresh periódico) se publica un solo mensaje. Con el
+snapshot en memoria se compara contra el anterior y el mensaje lleva los cambios:
+
+    {"generation": "...", "changes": [
+        {"type": "stock", "product_id": 1, "sku": "...", "warehouse_id": 3, "quantity": 4},
+        {"type": "price", "sku": "...", "price": 1234.5},
+        {"type": "planta", "manufacturer": "...", "sku": "...", "warehouse": "...", "on_hand": 2}
+    ]}
+
+Si son demasiados cambios, el cliente se atrasó o no hay snapshot con qué comparar
+(INVENTORY_SNAPSHOT_ENABLED=false o falló la carga) se envía {"type": "resync"} para que
+recargue la página completa.
+"""
+import asyncio
+import logging
+import threading
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from app.services import data_generation
+from app.services import inventory_snapshot
+
+logger = logging.getLogger(__name__)
+
+MAX_CHANGES_PER_EVENT = 5000
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+_lock = threading.Lock()
+_last_generation: Optional[str] = None
+# Snapshot contra el que se calcula el siguiente diff (None sin snapshot)
+_last_snapshot = None
+
+
+def subscribe() -> asyncio.Queue:
+    """Cola del cliente; llamar desde el event loop del request"""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        _subscribers[queue] = asyncio.get_running_loop()
+    return queue
+
+
+def unsubscribe(queue: asyncio.Queue) -> None:
+    with _lock:
+        _subscribers.pop(queue, None)
+
+
+def subscriber_count() -> int:
+    return len(_subscribers)
+
+
+def last_generation() -> Optional[str]:
+    return _last_generation
+
+
+def _put(queue: asyncio.Queue, message: Dict) -> None:
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        # Cliente lento: se descartan los pendientes y se le pide recargar
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({"generation": message["generation"], "changes": [{"type": "resync"}]})
+
+
+def publish(message: Dict) -> None:
+    """Entrega el mensaje a todos los suscriptores; seguro desde cualquier hilo"""
+    global _last_generation
+    _last_generation = message["generation"]
+    with _lock:
+        subscribers = list(_subscribers.items())
+    for queue, loop in subscribers:
+        try:
+            loop.call_soon_threadsafe(_put, queue, message)
+        except RuntimeError:
+            # El loop ya se cerró (worker apagándose)
+            unsubscribe(queue)
+
+
+def _stock_entries(snapshot) -> Dict:
+    rows, cols = np.nonzero(snapshot.present)
+    return dict(zip(
+        zip(snapshot.product_id[rows].tolist(), snapshot.warehouse_id[cols].tolist()),
+        snapshot.quantity[rows, cols].tolist()
+    ))
+
+
+def _planta_entries(snapshot) -> Dict:
+    return dict(zip(
+        zip(snapshot.texts("e_manufacturer"), snapshot.texts("e_sku"), snapshot.texts("e_warehouse")),
+        snapshot.e_on_hand.tolist()
+    ))
+
+
+def _price_entries(snapshot) -> Dict:
+    return dict(zip(snapshot.texts("price_sku"), snapshot.price_value.tolist()))
+
+
+def diff(old, new) -> List[Dict]:
+    """Cambios entre dos snapshots de inventario"""
+    changes = []
+
+    old_stock, new_stock = _stock_entries(old), _stock_entries(new)
+    changed = [key for key in old_stock.keys() | new_stock.keys() if old_stock.get(key, 0) != new_stock.get(key, 0)]
+    # SKU solo de los productos que cambiaron (del snapshot nuevo o, si ya no está, del anterior)
+    product_ids = sorted({product_id for product_id, _ in changed})
+    products = {**old.product_texts(product_ids, ("sku",)), **new.product_texts(product_ids, ("sku",))}
+    for product_id, warehouse_id in changed:
+        changes.append({
+            "type": "stock", "product_id": product_id, "sku": products.get(product_id, {}).get("sku"),
+            "warehouse_id": warehouse_id, "quantity": new_stock.get((product_id, warehouse_id), 0)
+        })
+
+    old_prices, new_prices = _price_entries(old), _price_entries(new)
+    for sku in old_prices.keys() | new_prices.keys():
+        if old_prices.get(sku) != new_prices.get(sku):
+            changes.append({"type": "price", "sku": sku, "price": new_prices.get(sku)})
+
+    old_planta, new_planta = _planta_entries(old), _planta_entries(new)
+    for key in old_planta.keys() | new_planta.keys():
+        if old_planta.get(key) != new_planta.get(key):
+            manufacturer, sku, warehouse = key
+            changes.append({
+                "type": "planta", "manufacturer": manufacturer, "sku": sku,
+                "warehouse": warehouse, "on_hand": new_planta.get(key, 0)
+            })
+
+    return changes
+
+
+def on_data_change(kinds: Set[str]) -> None:
+    """Listener de data_generation: corre con y sin snapshot en memoria"""
+    global _last_generation, _last_snapshot
+    try:
+        # Idempotente: si el listener del snapshot ya recargó esta generación la regresa tal cual
+        snapshot = inventory_snapshot.reload()
+    except Exception as e:
+        logger.error(f"Error recargando el snapshot para publicar cambios: {str(e)}", exc_info=True)
+        snapshot = None
+    generation = snapshot.generation if snapshot is not None else data_generation.current()
+    previous, _last_snapshot = _last_snapshot, snapshot
+
+    if _last_generation is None or not _subscribers:
+        # Arranque del worker o sin clientes: solo se registra la generación
+        _last_generation = generation
+        return
+    if previous is not None and snapshot is not None:
+        changes = diff(previous, snapshot)
+        if not changes:
+            # Sin cambios no se envía nada; last_generation sigue en el último evento enviado
+            # para que un cliente al día no reciba un resync al reconectar
+            return
+        if len(changes) > MAX_CHANGES_PER_EVENT:
+            changes = [{"type": "resync"}]
+    else:
+        changes = [{"type": "resync"}]
+    logger.info(f"📡 {len(changes)} cambios de inventario ({', '.join(sorted(kinds))}) a {len(_subscribers)} clientes")
+    publish({"generation": generation, "changes": changes})
+
+
+data_generation.on_change(on_data_change)
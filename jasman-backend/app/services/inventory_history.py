@@ -0,0 +1,160 @@
+# app/services/inventory_history.py
+"""
+Historial del inventario: una corrida por sync en inventory_history_runs/_parts.
+
+Cada corrida guarda un checkpoint completo cada CHECKPOINT_EVERY corridas y, entre
+checkpoints, solo las tuplas (producto, almacén, cantidad) que cambiaron. El estado a
+una fecha se reconstruye con el último checkpoint anterior más los deltas siguientes,
+todo en arreglos NumPy (sin ciclos por tupla).
+"""
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pytz
+
+from app.supabase import supabase
+
+logger = logging.getLogger(__name__)
+
+RUNS_TABLE = "inventory_history_runs"
+PARTS_TABLE = "inventory_history_parts"
+PART_SIZE = 20000
+CHECKPOINT_EVERY = int(os.getenv("INVENTORY_HISTORY_CHECKPOINT_EVERY", "7"))
+
+# Llave compacta producto/almacén: product_id << 20 | warehouse_id
+_WAREHOUSE_BITS = 20
+
+
+def _keys(product_ids: np.ndarray, warehouse_ids: np.ndarray) -> np.ndarray:
+    return (product_ids.astype(np.int64) << _WAREHOUSE_BITS) | warehouse_ids.astype(np.int64)
+
+
+def _split(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return keys >> _WAREHOUSE_BITS, keys & ((1 << _WAREHOUSE_BITS) - 1)
+
+
+def _last_per_key(keys: np.ndarray, quantities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Deja la última cantidad de cada llave (orden de aplicación) y quita las de 0"""
+    if keys.size == 0:
+        return keys, quantities
+    unique, first_in_reversed = np.unique(keys[::-1], return_index=True)
+    values = quantities[::-1][first_in_reversed]
+    present = values != 0
+    return unique[present], values[present]
+
+
+def _state_from_rows(rows: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    keys = _keys(
+        np.array([r["product_id"] for r in rows], dtype=np.int64),
+        np.array([r["warehouse_id"] for r in rows], dtype=np.int64)
+    )
+    return _last_per_key(keys, np.array([int(r.get("quantity") or 0) for r in rows], dtype=np.int64))
+
+
+def _delta(old: Tuple[np.ndarray, np.ndarray], new: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Tuplas que cambiaron de old a new; las que desaparecen van con cantidad 0"""
+    old_keys, old_qty = old
+    new_keys, new_qty = new
+    keys = np.union1d(old_keys, new_keys)
+    old_full = np.zeros(keys.size, dtype=np.int64)
+    new_full = np.zeros(keys.size, dtype=np.int64)
+    old_full[np.searchsorted(keys, old_keys)] = old_qty
+    new_full[np.searchsorted(keys, new_keys)] = new_qty
+    changed = old_full != new_full
+    return keys[changed], new_full[changed]
+
+
+# ---------------------------------------------------------------------- lectura
+def list_runs(limit: int = 50) -> List[Dict]:
+    return supabase.table(RUNS_TABLE).select("*").order("run_at", desc=True).limit(limit).execute().data
+
+
+def _read_parts(run_ids: List[int], page_size: int = 20) -> Dict[int, List[Dict]]:
+    parts: Dict[int, List[Dict]] = {run_id: [] for run_id in run_ids}
+    start = 0
+    while run_ids:
+        batch = supabase.table(PARTS_TABLE).select("*") \
+            .in_("run_id", run_ids) \
+            .order("run_id").order("part") \
+            .range(start, start + page_size - 1) \
+            .execute().data
+        for row in batch:
+            parts[row["run_id"]].append(row)
+        if len(batch) < page_size:
+            break
+        start += page_size
+    return parts
+
+
+def state_as_of(as_of: Optional[datetime] = None) -> Tuple[Optional[Dict], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estado del inventario a la fecha (o el último registrado): (corrida, product_ids,
+    warehouse_ids, quantities). Corrida es None si no hay checkpoint anterior a la fecha.
+    """
+    checkpoint_query = supabase.table(RUNS_TABLE).select("*").eq("kind", "checkpoint")
+    if as_of is not None:
+        checkpoint_query = checkpoint_query.lte("run_at", as_of.isoformat())
+    checkpoint = checkpoint_query.order("run_at", desc=True).limit(1).execute().data
+    empty = np.empty(0, dtype=np.int64)
+    if not checkpoint:
+        return None, empty, empty, empty
+
+    runs_query = supabase.table(RUNS_TABLE).select("*").gte("run_at", checkpoint[0]["run_at"])
+    if as_of is not None:
+        runs_query = runs_query.lte("run_at", as_of.isoformat())
+    runs = [r for r in runs_query.order("run_at").order("id").execute().data if r["id"] >= checkpoint[0]["id"]]
+
+    parts = _read_parts([r["id"] for r in runs])
+    keys, quantities = [], []
+    for run in runs:
+        for part in parts[run["id"]]:
+            keys.append(_keys(np.array(part["product_ids"], dtype=np.int64), np.array(part["warehouse_ids"], dtype=np.int64)))
+            quantities.append(np.array(part["quantities"], dtype=np.int64))
+
+    state_keys, state_qty = _last_per_key(
+        np.concatenate(keys) if keys else empty, np.concatenate(quantities) if quantities else empty
+    )
+    product_ids, warehouse_ids = _split(state_keys)
+    return runs[-1], product_ids, warehouse_ids, state_qty
+
+
+# ---------------------------------------------------------------------- escritura
+def _write_run(kind: str, keys: np.ndarray, quantities: np.ndarray, generation: Optional[str]) -> Dict:
+    """Corrida y bloques en una sola transacción (RPC record_inventory_history_run)"""
+    product_ids, warehouse_ids = _split(keys)
+    return supabase.rpc("record_inventory_history_run", {
+        "p_kind": kind,
+        "p_generation": generation,
+        "p_run_at": datetime.now(pytz.timezone('America/Mexico_City')).isoformat(),
+        "p_product_ids": product_ids.tolist(),
+        "p_warehouse_ids": warehouse_ids.tolist(),
+        "p_quantities": quantities.tolist(),
+        "p_part_size": PART_SIZE
+    }).execute().data
+
+
+def record_run(inventory_rows: List[Dict], generation: Optional[str] = None) -> Dict:
+    """
+    Registra el estado del inventario recién sincronizado: delta contra el último estado
+    registrado, o checkpoint completo si toca (o si el delta no sería más chico).
+    """
+    new_state = _state_from_rows(inventory_rows)
+
+    last_runs = supabase.table(RUNS_TABLE).select("kind").order("run_at", desc=True).limit(CHECKPOINT_EVERY).execute().data
+    since_checkpoint = next((i for i, r in enumerate(last_runs) if r["kind"] == "checkpoint"), None)
+
+    if since_checkpoint is None or since_checkpoint + 1 >= CHECKPOINT_EVERY:
+        run = _write_run("checkpoint", *new_state, generation)
+    else:
+        _, product_ids, warehouse_ids, quantities = state_as_of()
+        delta_keys, delta_qty = _delta((_keys(product_ids, warehouse_ids), quantities), new_state)
+        if delta_keys.size >= new_state[0].size:
+            run = _write_run("checkpoint", *new_state, generation)
+        else:
+            run = _write_run("delta", delta_keys, delta_qty, generation)
+
+    logger.info(f"🗂️ Historial de inventario: {run['kind']} con {run['entries']} tuplas")
+    return run
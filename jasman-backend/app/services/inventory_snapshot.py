@@ -0,0 +1,644 @@
+# app/services/inventory_snapshot.py
+"""
+Foto del inventario en memoria del proceso, en arreglos NumPy.
+
+Se carga completa después de cada sync (y al arrancar) y sirve el reporte de zonas
+y /existencia/search sin ir a Supabase:
+
+- productos (ordenados por id): id, medidas parseadas, precio y columnas de texto
+- almacenes: id, nombre, tipo, zona
+- cantidades: matriz densa producto x almacén (int32) + máscara de registros presentes
+- ExistenciaPlanta: columnas de medida, existencia y precio + cada fila como JSON
+- precios: SKU y precio ordenados por SKU
+- medidas con existencia (inventario y planta) y su índice de equivalencias
+
+La búsqueda por medida es una máscara vectorizada y los totales por zona y
+CEDIS/Sucursal son un producto matricial contra la pertenencia de cada almacén.
+
+Cada carga se escribe además a disco (INVENTORY_SNAPSHOT_DIR) como un directorio
+versionado de archivos .npy más un puntero CURRENT. Todo lo derivado (orden (sku, id),
+tabla de medidas, vecinos de equivalencia) se guarda ya calculado, los textos son arreglos
+unicode de ancho fijo con su máscara de nulos y las filas de planta un buffer JSON con
+offsets. Al arrancar, o cuando otro worker ya escribió la generación vigente, todo se abre
+con mmap: la carga no recorre el catálogo, las páginas se comparten entre procesos por el
+page cache y los textos se decodifican solo para las filas que se regresan.
+"""
+import os
+import bisect
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+import numpy as np
+import orjson
+
+from app.services import data_generation
+from app.services.supabase_db import supabase_db_service
+from app.utils.tire_size import format_rim
+
+logger = logging.getLogger(__name__)
+
+ZONES = ("1", "2", "3", "4")
+# Columnas de la matriz de pertenencia: (zona, CEDIS) y (zona, Sucursal) para cada zona
+_GROUPS = [(zone, is_cedis) for zone in ZONES for is_cedis in (True, False)]
+
+_INT_NULL = -1
+
+# Equivalencias de medida: diferencia máxima de diámetro total y vecinos guardados por medida
+EQUIVALENCE_TOLERANCE_PCT = float(os.getenv("EQUIVALENCE_TOLERANCE_PCT", "3"))
+EQUIVALENCE_MAX_NEIGHBORS = int(os.getenv("EQUIVALENCE_MAX_NEIGHBORS", "20"))
+
+# Ordena los SKU nulos al final, como NULLS LAST en Postgres
+_SKU_NULL_KEY = (1, "")
+
+# Llave entera de una medida: rin (centésimas) * 10^8 + piso * 10^4 + serie, así la tabla
+# de medidas queda ordenada por rin y las del mismo rin son un rango contiguo
+_SIZE_SPAN = 10 ** 4
+
+
+def _sku_key(sku) -> Tuple[int, str]:
+    return _SKU_NULL_KEY if sku is None else (0, str(sku))
+
+
+def _int_column(rows: List[Dict], key: str) -> np.ndarray:
+    return np.array([_INT_NULL if r.get(key) is None else int(r[key]) for r in rows], dtype=np.int32)
+
+
+def _float_column(rows: List[Dict], key: str) -> np.ndarray:
+    return np.array([np.nan if r.get(key) is None else float(r[key]) for r in rows], dtype=np.float64)
+
+
+def _price_column(skus: Iterable, prices: Dict[str, Any]) -> np.ndarray:
+    values = [None if sku is None else prices.get(str(sku)) for sku in skus]
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _text_column(values: List) -> Tuple[np.ndarray, np.ndarray]:
+    """Textos -> (arreglo unicode de ancho fijo, máscara de nulos)"""
+    nulls = np.array([v is None for v in values], dtype=bool)
+    text = np.array(["" if v is None else str(v) for v in values], dtype=str)
+    return text, nulls
+
+
+def _size_keys(width, ratio, rim) -> np.ndarray:
+    rim_code = np.round(np.asarray(rim, dtype=np.float64) * 100).astype(np.int64)
+    return (rim_code * _SIZE_SPAN + np.asarray(width, dtype=np.int64)) * _SIZE_SPAN + np.asarray(ratio, dtype=np.int64)
+
+
+def _optional_float(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def overall_diameter_mm(width, ratio, rim):
+    """Diámetro total de la llanta: rin en pulgadas + dos alturas de costado"""
+    return rim * 25.4 + 2 * width * ratio / 100
+
+
+def format_size(width, ratio, rim) -> str:
+    return f"{width}/{ratio}R{rim:g}"
+
+
+class InventorySnapshot:
+    def __init__(
+        self,
+        products: List[Dict],
+        warehouses: List[Dict],
+        inventory: List[Dict],
+        prices: Dict[str, Any],
+        existencia: List[Dict],
+        generation: str
+    ):
+        self.generation = generation
+        self._texts: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._facet_cache: Dict[Tuple, Dict] = {}
+
+        # --- Productos (por id: se ubican con searchsorted) ---
+        products = sorted(products, key=lambda p: int(p["id"]))
+        self.product_id = np.array([int(p["id"]) for p in products], dtype=np.int64)
+        for field in ("sku", "name", "piso", "serie", "rin", "marca"):
+            self._texts[field] = _text_column([p.get(field) for p in products])
+        self.width = _int_column(products, "width")
+        self.ratio = _int_column(products, "ratio")
+        self.rim = _float_column(products, "rim")
+        self.price = _price_column((p.get("sku") for p in products), prices)
+
+        # Orden (sku, id) del reporte
+        self.order = np.array(
+            sorted(range(len(products)), key=lambda i: (_sku_key(products[i].get("sku")), int(self.product_id[i]))),
+            dtype=np.int64
+        )
+
+        # --- Almacenes ---
+        self.warehouse_id = np.array([int(w["id"]) for w in warehouses], dtype=np.int64)
+        zones = [str(w.get("zone", "1")) for w in warehouses]
+        self._texts["warehouse_name"] = _text_column([w.get("name") for w in warehouses])
+        self._texts["warehouse_zone"] = _text_column(zones)
+        self.is_cedis = np.array([str(w.get("type") or "").upper() == "CEDIS" for w in warehouses], dtype=bool)
+
+        # Pertenencia almacén -> (zona, tipo); almacenes fuera de las zonas 1-4 quedan en cero
+        self.membership = np.zeros((len(warehouses), len(_GROUPS)), dtype=np.int64)
+        for j, zone in enumerate(zones):
+            key = (zone, bool(self.is_cedis[j]))
+            if key in _GROUPS:
+                self.membership[j, _GROUPS.index(key)] = 1
+
+        # --- Matriz de cantidades ---
+        product_pos = {pid: i for i, pid in enumerate(self.product_id.tolist())}
+        warehouse_pos = {wid: j for j, wid in enumerate(self.warehouse_id.tolist())}
+        self.quantity = np.zeros((len(products), len(warehouses)), dtype=np.int32)
+        self.present = np.zeros((len(products), len(warehouses)), dtype=bool)
+        for item in inventory:
+            i = product_pos.get(item["product_id"])
+            j = warehouse_pos.get(item["warehouse_id"])
+            if i is None or j is None:
+                continue
+            self.quantity[i, j] = int(item.get("quantity") or 0)
+            self.present[i, j] = True
+
+        # --- ExistenciaPlanta ---
+        self.e_width = _int_column(existencia, "width_num")
+        self.e_ratio = _int_column(existencia, "ratio_num")
+        self.e_rim = _float_column(existencia, "rim_num")
+        self.e_on_hand = np.array([int(e.get("on_hand") or 0) for e in existencia], dtype=np.int64)
+        self.e_price = _price_column((e.get("sku") for e in existencia), prices)
+        for field, key in (("e_sku", "sku"), ("e_manufacturer", "manufacturer"), ("e_warehouse", "warehouse")):
+            self._texts[field] = _text_column([e.get(key) for e in existencia])
+        # Filas completas (las regresa /existencia/search) como JSON: offsets + un solo buffer
+        blobs = [orjson.dumps(e) for e in existencia]
+        self.e_offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in blobs], out=self.e_offsets[1:])
+        self.e_blob = np.frombuffer(b"".join(blobs), dtype=np.uint8)
+
+        # --- Precios (por SKU, para comparar generaciones) ---
+        price_items = sorted((str(sku), float(price)) for sku, price in prices.items() if price is not None)
+        self._texts["price_sku"] = _text_column([sku for sku, _ in price_items])
+        self.price_value = np.array([price for _, price in price_items], dtype=np.float64)
+
+        self._build_sizes()
+
+    # ------------------------------------------------------------------ disco
+    # Todo se guarda como .npy y se abre con mmap; los textos llevan además <campo>.null.npy
+    _ARRAY_FIELDS = (
+        "product_id", "width", "ratio", "rim", "price", "order",
+        "warehouse_id", "is_cedis", "membership", "quantity", "present",
+        "e_width", "e_ratio", "e_rim", "e_on_hand", "e_price", "e_offsets", "e_blob",
+        "price_value",
+        "size_key", "size_width", "size_ratio", "size_rim", "size_stock", "eq_offsets", "eq_neighbors",
+    )
+    _TEXT_FIELDS = (
+        "sku", "name", "piso", "serie", "rin", "marca",
+        "warehouse_name", "warehouse_zone",
+        "e_sku", "e_manufacturer", "e_warehouse",
+        "price_sku",
+    )
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for field in self._ARRAY_FIELDS:
+            np.save(os.path.join(directory, f"{field}.npy"), getattr(self, field))
+        for field in self._TEXT_FIELDS:
+            text, nulls = self._texts[field]
+            np.save(os.path.join(directory, f"{field}.npy"), text)
+            np.save(os.path.join(directory, f"{field}.null.npy"), nulls)
+        with open(os.path.join(directory, "meta.json"), "wb") as f:
+            f.write(orjson.dumps({"generation": self.generation}))
+
+    @classmethod
+    def load(cls, directory: str) -> "InventorySnapshot":
+        """Abre un snapshot escrito con save(): solo mapea los archivos (solo lectura), no los recorre"""
+        snapshot = cls.__new__(cls)
+        with open(os.path.join(directory, "meta.json"), "rb") as f:
+            snapshot.generation = orjson.loads(f.read())["generation"]
+        for field in cls._ARRAY_FIELDS:
+            setattr(snapshot, field, np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r"))
+        snapshot._texts = {
+            field: (
+                np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, f"{field}.null.npy"), mmap_mode="r")
+            )
+            for field in cls._TEXT_FIELDS
+        }
+        snapshot._facet_cache = {}
+        return snapshot
+
+    # ------------------------------------------------------------------ textos
+    def text(self, field: str, i: int) -> Optional[str]:
+        """Valor de texto de una fila (se decodifica solo esa)"""
+        text, nulls = self._texts[field]
+        return None if nulls[i] else str(text[i])
+
+    def texts(self, field: str, indices=None) -> List[Optional[str]]:
+        """Valores de texto de varias filas (todas si indices es None)"""
+        text, nulls = self._texts[field]
+        if indices is not None:
+            text, nulls = text[indices], nulls[indices]
+        return [None if null else value for value, null in zip(text.tolist(), nulls.tolist())]
+
+    def product_positions(self, product_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """(ids encontrados, posiciones) de los product_id pedidos"""
+        ids = np.asarray(product_ids, dtype=np.int64)
+        positions = np.searchsorted(self.product_id, ids)
+        found = positions < self.product_id.size
+        found[found] = self.product_id[positions[found]] == ids[found]
+        return ids[found], positions[found]
+
+    def product_texts(self, product_ids, fields=("sku", "name")) -> Dict[int, Dict[str, Optional[str]]]:
+        """product_id -> {campo: texto} solo para los productos pedidos"""
+        ids, positions = self.product_positions(product_ids)
+        columns = [self.texts(field, positions) for field in fields]
+        return {pid: dict(zip(fields, values)) for pid, *values in zip(ids.tolist(), *columns)}
+
+    # ------------------------------------------------------------------ búsquedas
+    @property
+    def size(self) -> Dict[str, int]:
+        return {
+            "products": int(self.product_id.size),
+            "warehouses": int(self.warehouse_id.size),
+            "existencia": int(self.e_on_hand.size),
+            "bytes": int(self.quantity.nbytes + self.present.nbytes)
+        }
+
+    def product_mask(self, width=None, ratio=None, rim=None) -> np.ndarray:
+        mask = np.ones(self.product_id.size, dtype=bool)
+        if width is not None:
+            mask &= self.width == width
+        if ratio is not None:
+            mask &= self.ratio == ratio
+        if rim is not None:
+            mask &= self.rim == rim
+        return mask
+
+    def existencia_indices(self, width=None, ratio=None, rim=None) -> np.ndarray:
+        mask = np.ones(self.e_on_hand.size, dtype=bool)
+        if width is not None:
+            mask &= self.e_width == width
+        if ratio is not None:
+            mask &= self.e_ratio == ratio
+        if rim is not None:
+            mask &= self.e_rim == rim
+        return np.flatnonzero(mask)
+
+    def existencia_row(self, k: int) -> Dict:
+        return orjson.loads(self.e_blob[self.e_offsets[k]:self.e_offsets[k + 1]].tobytes())
+
+    def existencia_rows(self, width=None, ratio=None, rim=None) -> List[Dict]:
+        return [self.existencia_row(k) for k in self.existencia_indices(width, ratio, rim).tolist()]
+
+    def zone_totals(self, indices: np.ndarray) -> np.ndarray:
+        """(k, 8): totales por (zona, CEDIS/Sucursal) de los productos indicados"""
+        return (self.quantity[indices] * self.present[indices]) @ self.membership
+
+    def _sort_key(self, position: int) -> Tuple[Tuple[int, str], int]:
+        i = int(self.order[position])
+        return _sku_key(self.text("sku", i)), int(self.product_id[i])
+
+    def page(self, mask: np.ndarray, offset: int, limit: int, after=None) -> Tuple[np.ndarray, int]:
+        """Índices de productos de la página en orden (sku, id) y total filtrado"""
+        positions = np.flatnonzero(mask[self.order])
+        total = int(positions.size)
+        if after is not None:
+            # Búsqueda binaria sobre el orden guardado: solo se decodifican O(log n) SKU
+            cut = bisect.bisect_right(
+                range(self.order.size), (_sku_key(after[0]), int(after[1])), key=self._sort_key
+            )
+            positions = positions[positions >= cut]
+        return self.order[positions[offset:offset + limit]], total
+
+    # ------------------------------------------------------------------ medidas y equivalencias
+    def _build_sizes(self) -> None:
+        """Tabla de medidas (inventario y planta) y vecinos precalculados de cada medida"""
+        product_qty = (self.quantity.astype(np.int64) * self.present).sum(axis=1)
+        width = np.concatenate([self.width, self.e_width]).astype(np.int64)
+        ratio = np.concatenate([self.ratio, self.e_ratio]).astype(np.int64)
+        rim = np.concatenate([self.rim, self.e_rim])
+        qty = np.concatenate([product_qty, self.e_on_hand])
+        slot = np.concatenate([np.zeros(product_qty.size, dtype=np.int64), np.ones(self.e_on_hand.size, dtype=np.int64)])
+        valid = (width >= 0) & (width < _SIZE_SPAN) & (ratio >= 0) & (ratio < _SIZE_SPAN) & ~np.isnan(rim)
+        width, ratio, rim, qty, slot = width[valid], ratio[valid], rim[valid], qty[valid], slot[valid]
+
+        # size_stock[s] = [cantidad en inventario, cantidad en planta]
+        self.size_key, first, inverse = np.unique(_size_keys(width, ratio, rim), return_index=True, return_inverse=True)
+        self.size_width = width[first].astype(np.int32)
+        self.size_ratio = ratio[first].astype(np.int32)
+        self.size_rim = rim[first]
+        self.size_stock = np.zeros((self.size_key.size, 2), dtype=np.int64)
+        np.add.at(self.size_stock, (inverse, slot), qty)
+
+        # Vecinos por medida (índices a la tabla de medidas), en formato CSR
+        neighbors = []
+        self.eq_offsets = np.zeros(self.size_key.size + 1, dtype=np.int64)
+        for s in range(self.size_key.size):
+            lo, hi = self._rim_range(self.size_rim[s])
+            candidates = np.delete(np.arange(lo, hi), s - lo)
+            ranked = self._rank_neighbors(self._size(s), candidates)[:EQUIVALENCE_MAX_NEIGHBORS]
+            neighbors.append(ranked)
+            self.eq_offsets[s + 1] = self.eq_offsets[s] + ranked.size
+        self.eq_neighbors = np.concatenate(neighbors) if neighbors else np.zeros(0, dtype=np.int64)
+
+    def _size(self, s: int) -> Tuple[int, int, float]:
+        return int(self.size_width[s]), int(self.size_ratio[s]), float(self.size_rim[s])
+
+    def _rim_range(self, rim: float) -> Tuple[int, int]:
+        """Rango de la tabla de medidas con ese rin"""
+        low = int(_size_keys(0, 0, rim))
+        return (
+            int(np.searchsorted(self.size_key, low)),
+            int(np.searchsorted(self.size_key, low + _SIZE_SPAN * _SIZE_SPAN))
+        )
+
+    def _size_index(self, width: int, ratio: int, rim: float) -> Optional[int]:
+        if not (0 <= width < _SIZE_SPAN and 0 <= ratio < _SIZE_SPAN):
+            return None
+        key = int(_size_keys(width, ratio, rim))
+        s = int(np.searchsorted(self.size_key, key))
+        return s if s < self.size_key.size and int(self.size_key[s]) == key else None
+
+    def _rank_neighbors(self, size: Tuple[int, int, float], candidates: np.ndarray) -> np.ndarray:
+        """Candidatos del mismo rin con existencia y dentro de la tolerancia, mejores primero"""
+        if candidates.size == 0:
+            return candidates.astype(np.int64)
+        diameter = overall_diameter_mm(*size)
+        diameters = overall_diameter_mm(
+            self.size_width[candidates].astype(np.float64),
+            self.size_ratio[candidates].astype(np.float64),
+            self.size_rim[candidates]
+        )
+        totals = self.size_stock[candidates].sum(axis=1)
+        delta = (diameters - diameter) / diameter * 100
+        keep = np.flatnonzero((np.abs(delta) <= EQUIVALENCE_TOLERANCE_PCT) & (totals > 0))
+        # Diferencia de diámetro (redondeada a 0.1%) y a igualdad la mayor cantidad disponible
+        ranked = keep[np.lexsort((-totals[keep], np.round(np.abs(delta[keep]), 1)))]
+        return candidates[ranked].astype(np.int64)
+
+    def _neighbor(self, diameter: float, s: int) -> Dict:
+        width, ratio, rim = self._size(s)
+        neighbor_diameter = overall_diameter_mm(width, ratio, rim)
+        inventario, planta = self.size_stock[s].tolist()
+        return {
+            "medida": format_size(width, ratio, rim),
+            "piso": width,
+            "serie": ratio,
+            "rin": rim,
+            "diametro_mm": round(neighbor_diameter, 1),
+            "diferencia_pct": round((neighbor_diameter - diameter) / diameter * 100, 2),
+            "cantidad_inventario": inventario,
+            "cantidad_planta": planta,
+            "cantidad_total": inventario + planta
+        }
+
+    def equivalent_sizes(self, width: int, ratio: int, rim: float, limit: int = 10) -> List[Dict]:
+        """Medidas alternativas con existencia para (piso, serie, rin); O(k) sobre el índice guardado"""
+        size = (width, ratio, rim)
+        s = self._size_index(*size)
+        if s is not None:
+            neighbors = self.eq_neighbors[self.eq_offsets[s]:self.eq_offsets[s + 1]]
+        else:
+            # Medida que no aparece en el inventario: se compara contra las del mismo rin
+            neighbors = self._rank_neighbors(size, np.arange(*self._rim_range(rim)))
+        diameter = overall_diameter_mm(*size)
+        return [self._neighbor(diameter, c) for c in neighbors[:limit].tolist()]
+
+    # ------------------------------------------------------------------ facetas
+    def facets(self, width: Optional[int] = None, ratio: Optional[int] = None, in_stock: bool = True) -> Dict:
+        """
+        Valores de piso / serie / rin con existencia, en cascada: serie se acota por el piso
+        elegido y rin por piso y serie. Se calcula sobre la tabla de medidas, una vez por
+        combinación y por snapshot.
+        """
+        key = (width, ratio, in_stock)
+        cached = self._facet_cache.get(key)
+        if cached is not None:
+            return cached
+
+        totals = self.size_stock.sum(axis=1)
+
+        def values(level: int, formatter) -> List[Dict]:
+            mask = np.ones(self.size_key.size, dtype=bool)
+            if width is not None and level > 0:
+                mask &= self.size_width == width
+            if ratio is not None and level > 1:
+                mask &= self.size_ratio == ratio
+            column = (self.size_width, self.size_ratio, self.size_rim)[level][mask]
+            groups, inverse = np.unique(column, return_inverse=True)
+            existencia = np.bincount(inverse, weights=totals[mask], minlength=groups.size)
+            medidas = np.bincount(inverse, weights=totals[mask] > 0, minlength=groups.size)
+            return [
+                {"valor": formatter(value), "existencia": int(total), "medidas": int(count)}
+                for value, total, count in zip(groups.tolist(), existencia.tolist(), medidas.tolist())
+                if total > 0 or not in_stock
+            ]
+
+        result = {
+            "piso": values(0, str),
+            "serie": values(1, str),
+            "rin": values(2, format_rim)
+        }
+        if len(self._facet_cache) >= 2048:
+            self._facet_cache.clear()
+        self._facet_cache[key] = result
+        return result
+
+    # ------------------------------------------------------------------ reporte
+    def reporte(self, width, ratio, rim, page: int, per_page: int, after=None, cursor_mode: bool = False):
+        """Mismo resultado que el reporte por PostgREST: (filas, proveedores, total, llaves)"""
+        offset = 0 if cursor_mode else (page - 1) * per_page
+        indices, total = self.page(self.product_mask(width, ratio, rim), offset, per_page, after)
+        totals = self.zone_totals(indices).tolist()
+
+        reporte = {}
+        page_keys = []
+        for row_pos, i in enumerate(indices.tolist()):
+            sku_value = self.text("sku", i)
+            page_keys.append((sku_value, int(self.product_id[i])))
+            sku = sku_value or ""
+            if not sku:
+                continue
+
+            zonas = {}
+            for z, zone in enumerate(ZONES):
+                total_cedis = totals[row_pos][2 * z]
+                total_sucursales = totals[row_pos][2 * z + 1]
+                zonas[zone] = {
+                    "CEDIS": [], "Sucursales": [],
+                    "total_cedis": total_cedis, "total_sucursales": total_sucursales,
+                    "total_general": total_cedis + total_sucursales
+                }
+            for j in np.flatnonzero(self.present[i]).tolist():
+                zone = self.text("warehouse_zone", j)
+                if zone not in zonas:
+                    continue
+                zonas[zone]["CEDIS" if self.is_cedis[j] else "Sucursales"].append({
+                    "almacen_id": int(self.warehouse_id[j]),
+                    "nombre": self.text("warehouse_name", j),
+                    "cantidad": int(self.quantity[i, j])
+                })
+
+            reporte[sku] = {
+                "sku": sku,
+                "nombre": self.text("name", i),
+                "piso": self.text("piso", i),
+                "serie": self.text("serie", i),
+                "marca": self.text("marca", i),
+                "rin": self.text("rin", i),
+                "precio": _optional_float(self.price[i]),
+                "zonas": zonas
+            }
+
+        proveedores_info = self._merge_existencia(reporte, self.existencia_indices(width, ratio, rim))
+        return sorted(reporte.values(), key=lambda x: x["sku"]), proveedores_info, total, page_keys
+
+    def _merge_existencia(self, reporte: Dict, indices: np.ndarray) -> Dict:
+        proveedores_info = {}
+        for k in indices.tolist():
+            e = self.existencia_row(k)
+            manufacturer = e.get("manufacturer")
+            if manufacturer and manufacturer not in proveedores_info:
+                proveedores_info[manufacturer] = {"update": e.get("update"), "created_at": e.get("created_at")}
+
+            sku = str(e.get("sku") or "")
+            if not sku:
+                continue
+            if sku not in reporte:
+                reporte[sku] = {
+                    "sku": sku,
+                    "nombre": e.get("description") or f"SKU-{sku}",
+                    "marca": e.get("brand"),
+                    "piso": e.get("width"),
+                    "serie": e.get("ratio"),
+                    "rin": e.get("diameter"),
+                    "precio": _optional_float(self.e_price[k]),
+                    "zonas": {}
+                }
+            zone_name = e.get("warehouse") or "Planta"
+            zona = reporte[sku]["zonas"].setdefault(zone_name, {
+                "CEDIS": [], "Sucursales": [],
+                "total_cedis": 0, "total_sucursales": 0, "total_general": 0
+            })
+            cantidad = e.get("on_hand") or 0
+            zona["CEDIS"].append({"almacen_id": None, "nombre": f"Planta ({zone_name})", "cantidad": cantidad})
+            zona["total_cedis"] += cantidad
+            zona["total_general"] += cantidad
+        return proveedores_info
+
+
+# ---------------------------------------------------------------------- carga
+SNAPSHOT_ENABLED = os.getenv("INVENTORY_SNAPSHOT_ENABLED", "true").lower() == "true"
+
+# Directorio compartido por los workers del servidor; vacío para no escribir a disco
+SNAPSHOT_DIR = os.getenv(
+    "INVENTORY_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "jasman_inventory_snapshot")
+)
+SNAPSHOT_KEEP_VERSIONS = 3
+# Versión del formato en disco (cambia cuando cambian los archivos de save())
+SNAPSHOT_FORMAT = 2
+
+_snapshot: Optional[InventorySnapshot] = None
+_reload_lock = threading.Lock()
+
+
+def get_snapshot() -> Optional[InventorySnapshot]:
+    """Snapshot vigente, o None si no está cargado o ya no corresponde a la generación actual"""
+    snapshot = _snapshot
+    if snapshot is None or snapshot.generation != data_generation.current():
+        return None
+    return snapshot
+
+
+def load_from_supabase(generation: str) -> InventorySnapshot:
+    products = supabase_db_service.fetch_all(
+        "products", "id, sku, name, piso, serie, rin, marca, width, ratio, rim"
+    )
+    warehouses = supabase_db_service.fetch_all("warehouses", "id, name, type, zone")
+    inventory = supabase_db_service.fetch_all(
+        "inventory", "product_id, warehouse_id, quantity", order="product_id,warehouse_id"
+    )
+    prices = {
+        str(p["sku"]): p["price"]
+        for p in supabase_db_service.fetch_all("product_prices_aft", "sku, price", order="sku")
+    }
+    existencia = supabase_db_service.fetch_all("ExistenciaPlanta", "*", order="manufacturer,sku,warehouse")
+    return InventorySnapshot(products, warehouses, inventory, prices, existencia, generation)
+
+
+def _version_name(generation: str) -> str:
+    # El formato va en el nombre: un directorio de un formato anterior no se reutiliza
+    return hashlib.sha1(f"{SNAPSHOT_FORMAT}:{generation}".encode()).hexdigest()[:16]
+
+
+def load_from_disk(generation: Optional[str] = None) -> Optional[InventorySnapshot]:
+    """Snapshot apuntado por CURRENT (si coincide con la generación pedida)"""
+    if not SNAPSHOT_DIR:
+        return None
+    try:
+        with open(os.path.join(SNAPSHOT_DIR, "CURRENT")) as f:
+            version = f.read().strip()
+        if generation is not None and version != _version_name(generation):
+            return None
+        return InventorySnapshot.load(os.path.join(SNAPSHOT_DIR, version))
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error abriendo snapshot de disco: {str(e)}")
+        return None
+
+
+def write_to_disk(snapshot: InventorySnapshot) -> None:
+    """Escribe la versión en un directorio temporal, la renombra y mueve CURRENT (ambos atómicos)"""
+    if not SNAPSHOT_DIR:
+        return
+    version = _version_name(snapshot.generation)
+    final_dir = os.path.join(SNAPSHOT_DIR, version)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        if not os.path.isdir(final_dir):
+            tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=SNAPSHOT_DIR)
+            snapshot.save(tmp_dir)
+            try:
+                os.rename(tmp_dir, final_dir)
+            except OSError:
+                # Otro worker escribió la misma versión primero
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        pointer = os.path.join(SNAPSHOT_DIR, f".CURRENT-{os.getpid()}")
+        with open(pointer, "w") as f:
+            f.write(version)
+        os.replace(pointer, os.path.join(SNAPSHOT_DIR, "CURRENT"))
+        _prune_versions(keep=version)
+    except Exception as e:
+        logger.error(f"Error escribiendo snapshot a disco: {str(e)}")
+
+
+def _prune_versions(keep: str) -> None:
+    # Los workers que aún tengan mapeada una versión borrada la siguen leyendo (unlink en Linux)
+    versions = sorted(
+        (entry for entry in os.scandir(SNAPSHOT_DIR) if entry.is_dir() and not entry.name.startswith(".")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    for entry in versions[SNAPSHOT_KEEP_VERSIONS:]:
+        if entry.name != keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def reload(changed=None) -> Optional[InventorySnapshot]:
+    """Reconstruye el snapshot y lo publica de forma atómica (cambio de referencia)"""
+    global _snapshot
+    if not SNAPSHOT_ENABLED:
+        return None
+    with _reload_lock:
+        generation = data_generation.current()
+        if _snapshot is not None and _snapshot.generation == generation:
+            return _snapshot
+        # Otro worker (o un arranque anterior) ya pudo haber escrito esta generación
+        snapshot = load_from_disk(generation)
+        if snapshot is None:
+            snapshot = load_from_supabase(generation)
+            write_to_disk(snapshot)
+        _snapshot = snapshot
+        logger.info(f"📸 Snapshot de inventario cargado: {snapshot.size}")
+        return snapshot
+
+
+data_generation.on_change(reload)
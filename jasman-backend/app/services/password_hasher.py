@@ -0,0 +1,97 @@
+# app/services/password_hasher.py
+"""
+Pool dedicado para bcrypt (hash y verificación de contraseñas).
+
+bcrypt con 12 rondas son ~250 ms de CPU por llamada; en el event loop bloquea todas
+las demás peticiones. Aquí corre en un pool de hilos acotado (bcrypt suelta el GIL, así
+que usa varios núcleos) con un límite de trabajos pendientes: si se excede se responde
+503 en lugar de encolar indefinidamente. Expone latencias para /admin/metrics.
+"""
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from fastapi import HTTPException, status
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, workers: int, max_pending: int, sample_size: int = 1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.errors = 0
+        self._wait_ms = deque(maxlen=sample_size)
+        self._run_ms = deque(maxlen=sample_size)
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Servidor ocupado, intenta de nuevo en unos segundos",
+                    headers={"Retry-After": "2"}
+                )
+            self._pending += 1
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self._wait_ms.append((started - submitted) * 1000)
+                    self._run_ms.append((finished - started) * 1000)
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+        with self._lock:
+            self.completed += 1
+        return result
+
+    @staticmethod
+    def _percentiles(samples) -> Dict:
+        if not samples:
+            return {"p50": None, "p95": None, "max": None}
+        ordered = sorted(samples)
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+        return {"p50": pick(0.5), "p95": pick(0.95), "max": round(ordered[-1], 1)}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "queue_wait_ms": self._percentiles(self._wait_ms),
+                "run_ms": self._percentiles(self._run_ms)
+            }
+
+
+_workers = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+password_executor = BoundedExecutor(
+    "bcrypt",
+    workers=_workers,
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", _workers * 8))
+)
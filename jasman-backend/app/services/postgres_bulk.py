@@ -0,0 +1,137 @@
+# app/services/postgres_bulk.py
+"""
+Camino directo a Postgres para la escritura masiva del sync de inventario.
+
+Con SUPABASE_DB_DSN configurado (y asyncpg instalado) productos e inventario se cargan
+con COPY binario a tablas temporales y se fusionan con SQL por conjuntos, todo en una
+transacción: en lugar de un upsert JSON de decenas de miles de filas por PostgREST, y sin
+el intervalo en que las tablas quedan vacías. Si no hay DSN o la carga falla, el sync usa
+PostgREST como antes.
+
+Para probarlo en local: docker-compose.postgres.yml + benchmarks/bench_bulk_sync.py.
+"""
+import os
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+try:
+    import asyncpg
+except ImportError:  # sin asyncpg solo queda el camino por PostgREST
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+# DSN directo a la base (Supabase: Settings → Database → Connection string)
+DB_DSN = os.getenv("SUPABASE_DB_DSN")
+POOL_MAX_SIZE = int(os.getenv("SUPABASE_DB_POOL_MAX", "4"))
+
+PRODUCT_COLUMNS = [
+    "id", "name", "sku", "total_quantity", "piso", "serie", "rin", "width", "ratio", "rim",
+    "carga_velocidad", "marca", "modelo", "last_sync"
+]
+INVENTORY_COLUMNS = ["product_id", "warehouse_id", "quantity", "last_updated"]
+TIMESTAMP_COLUMNS = {"last_sync", "last_updated"}
+NUMERIC_COLUMNS = {"rim"}
+
+_pool = None
+
+
+def enabled() -> bool:
+    return bool(DB_DSN) and asyncpg is not None
+
+
+async def open_pool():
+    """Crea el pool de conexiones (evento de arranque o primer uso)"""
+    global _pool
+    if _pool is None and enabled():
+        # statement_cache_size=0: compatible con el pooler de Supabase en modo transacción
+        _pool = await asyncpg.create_pool(DB_DSN, min_size=1, max_size=POOL_MAX_SIZE, statement_cache_size=0)
+        logger.info(f"🐘 Pool directo a Postgres abierto (máx. {POOL_MAX_SIZE} conexiones)")
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def _value(column: str, value):
+    if value is None:
+        return None
+    if column in TIMESTAMP_COLUMNS and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if column in NUMERIC_COLUMNS:
+        return Decimal(str(value))
+    return value
+
+
+def _records(rows: List[Dict], columns: List[str]) -> List[tuple]:
+    # La última columna (_ord) es la posición de la fila en el lote
+    return [(*(_value(c, row.get(c)) for c in columns), i) for i, row in enumerate(rows)]
+
+
+def _upsert_sql(table: str, stage: str, columns: List[str], key: List[str]) -> str:
+    cols = ", ".join(columns)
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c not in key)
+    # distinct on: una fila por llave (un upsert no puede tocar la misma fila dos veces);
+    # con llaves repetidas en el lote gana la última, igual que al aplicarlas en orden
+    return f"""
+        insert into public.{table} ({cols})
+        select distinct on ({", ".join(key)}) {cols} from {stage}
+        order by {", ".join(key)}, _ord desc
+        on conflict ({", ".join(key)}) do update set {updates}
+    """
+
+
+async def replace_inventory(products: List[Dict], inventory: List[Dict]) -> Dict:
+    """
+    Deja products e inventory iguales a lo recibido: COPY a staging, borra lo que ya no
+    viene y hace upsert del resto, en una sola transacción.
+    """
+    pool = await open_pool()
+    if pool is None:
+        raise RuntimeError("Camino directo a Postgres no configurado (SUPABASE_DB_DSN / asyncpg)")
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            await conn.execute(f"""
+                create temp table _products_stage on commit drop as
+                    select {", ".join(PRODUCT_COLUMNS)}, 0::integer as _ord from public.products with no data;
+                create temp table _inventory_stage on commit drop as
+                    select {", ".join(INVENTORY_COLUMNS)}, 0::integer as _ord from public.inventory with no data;
+            """)
+            await conn.copy_records_to_table(
+                "_products_stage", records=_records(products, PRODUCT_COLUMNS), columns=[*PRODUCT_COLUMNS, "_ord"]
+            )
+            await conn.copy_records_to_table(
+                "_inventory_stage", records=_records(inventory, INVENTORY_COLUMNS), columns=[*INVENTORY_COLUMNS, "_ord"]
+            )
+
+            # Primero inventario (llave foránea a products)
+            inventory_deleted = await conn.execute("""
+                delete from public.inventory i
+                where not exists (
+                    select 1 from _inventory_stage s
+                    where s.product_id = i.product_id and s.warehouse_id = i.warehouse_id
+                )
+            """)
+            products_deleted = await conn.execute("""
+                delete from public.products p
+                where not exists (select 1 from _products_stage s where s.id = p.id)
+            """)
+            await conn.execute(_upsert_sql("products", "_products_stage", PRODUCT_COLUMNS, ["id"]))
+            await conn.execute(_upsert_sql("inventory", "_inventory_stage", INVENTORY_COLUMNS, ["product_id", "warehouse_id"]))
+
+    result = {
+        "products": len(products),
+        "inventory": len(inventory),
+        # execute() regresa la etiqueta del comando, p. ej. "DELETE 12"
+        "products_deleted": int(products_deleted.split()[-1]),
+        "inventory_deleted": int(inventory_deleted.split()[-1])
+    }
+    logger.info(f"🐘 COPY directo a Postgres: {result}")
+    return result
@@ -0,0 +1,185 @@
+# app/services/product_search.py
+"""
+Índice en memoria para el typeahead de productos (SKU y nombre).
+
+- Prefijo: lista ordenada de (token, producto) sobre SKU y palabras del nombre, con bisect.
+- Trigramas: trigrama -> arreglo de productos; la intersección de las listas da los
+  candidatos de una búsqueda tipo ilike '%x%' y se verifica el substring.
+- Si no hay coincidencias exactas se rankea por trigramas compartidos (tolera errores de dedo).
+
+Se reconstruye cuando cambian products (sync) o product_prices_aft y cada resultado
+lleva su precio. Los resultados se ordenan: SKU exacto, prefijo de SKU, prefijo de
+una palabra del nombre, substring y al final coincidencias aproximadas.
+"""
+import os
+import bisect
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services import data_generation
+from app.services.supabase_db import supabase_db_service
+
+logger = logging.getLogger(__name__)
+
+# Rangos de relevancia (menor es mejor)
+RANK_SKU_EXACT = 0
+RANK_SKU_PREFIX = 1
+RANK_NAME_PREFIX = 2
+RANK_SUBSTRING = 3
+
+FUZZY_MIN_SIMILARITY = 0.5
+
+
+def normalize(text) -> str:
+    """Minúsculas y sin acentos, para que 'neumático' encuentre 'NEUMATICO'"""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _tokens(text: str) -> List[str]:
+    return [t for t in "".join(c if c.isalnum() else " " for c in text).split() if t]
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProductSearchIndex:
+    def __init__(self, products: List[Dict], prices: Dict[str, float], generation: str):
+        self.generation = generation
+        self.rows = []
+        for product in products:
+            row = product.copy()
+            row["price"] = prices.get(product.get("sku"))
+            self.rows.append(row)
+
+        self.sku_text = np.array([normalize(r.get("sku")) for r in self.rows], dtype=str)
+        self.name_text = np.array([normalize(r.get("name")) for r in self.rows], dtype=str)
+        # Posición de cada producto en el orden por (sku, id), para desempatar
+        order = sorted(range(len(self.rows)), key=lambda d: (
+            self.rows[d].get("sku") is None, str(self.rows[d].get("sku") or ""), self.rows[d].get("id") or 0
+        ))
+        self.order = np.array(order, dtype=np.int64)
+        self.sort_rank = np.empty(len(self.rows), dtype=np.int64)
+        self.sort_rank[self.order] = np.arange(len(self.rows))
+
+        # Prefijos: (token, producto) ordenados
+        prefix_entries = set()
+        for doc, (sku, name) in enumerate(zip(self.sku_text.tolist(), self.name_text.tolist())):
+            if sku:
+                prefix_entries.add((sku, doc))
+            for token in _tokens(name):
+                prefix_entries.add((token, doc))
+        prefix_entries = sorted(prefix_entries)
+        self.prefix_tokens = [token for token, _ in prefix_entries]
+        self.prefix_docs = np.array([doc for _, doc in prefix_entries], dtype=np.int64)
+
+        # Trigramas sobre "sku nombre"
+        postings: Dict[str, List[int]] = {}
+        for doc, (sku, name) in enumerate(zip(self.sku_text.tolist(), self.name_text.tolist())):
+            for gram in _trigrams(f"{sku} {name}"):
+                postings.setdefault(gram, []).append(doc)
+        self.postings = {gram: np.array(docs, dtype=np.int64) for gram, docs in postings.items()}
+
+    @property
+    def size(self) -> Dict[str, int]:
+        return {"products": len(self.rows), "tokens": len(self.prefix_tokens), "trigrams": len(self.postings)}
+
+    def _prefix_docs(self, term: str) -> np.ndarray:
+        start = bisect.bisect_left(self.prefix_tokens, term)
+        end = bisect.bisect_left(self.prefix_tokens, term + "\uffff", lo=start)
+        return self.prefix_docs[start:end]
+
+    def _substring_docs(self, term: str) -> np.ndarray:
+        if len(term) < 3:
+            candidates = np.arange(len(self.rows))
+        else:
+            lists = []
+            for gram in _trigrams(term):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    return np.empty(0, dtype=np.int64)
+                lists.append(posting)
+            lists.sort(key=len)
+            candidates = lists[0]
+            for posting in lists[1:]:
+                candidates = np.intersect1d(candidates, posting, assume_unique=True)
+                if candidates.size == 0:
+                    return candidates
+        # Los trigramas solo acotan: se verifica el substring como lo haría ilike '%x%'
+        found = (np.char.find(self.sku_text[candidates], term) >= 0) | \
+                (np.char.find(self.name_text[candidates], term) >= 0)
+        return candidates[found]
+
+    def _fuzzy_docs(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        grams = _trigrams(term)
+        lists = [self.postings[g] for g in grams if g in self.postings]
+        if not lists:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        similarity = np.bincount(np.concatenate(lists), minlength=len(self.rows)) / len(grams)
+        docs = np.flatnonzero(similarity >= FUZZY_MIN_SIMILARITY)
+        return docs, similarity[docs]
+
+    def search(self, query: str, offset: int = 0, limit: int = 10) -> Tuple[List[Dict], int]:
+        """Productos que coinciden (con precio) y total de coincidencias"""
+        term = normalize(query).strip()
+        if not term:
+            docs = self.order[offset:offset + limit]
+            return [self.rows[d] for d in docs.tolist()], len(self.rows)
+
+        docs = self._substring_docs(term)
+        if docs.size:
+            skus = self.sku_text[docs]
+            rank = np.select(
+                [skus == term, np.char.startswith(skus, term), np.isin(docs, self._prefix_docs(term))],
+                [RANK_SKU_EXACT, RANK_SKU_PREFIX, RANK_NAME_PREFIX],
+                default=RANK_SUBSTRING
+            )
+            ranked = docs[np.lexsort((self.sort_rank[docs], rank))]
+        else:
+            docs, similarity = self._fuzzy_docs(term)
+            ranked = docs[np.lexsort((self.sort_rank[docs], -similarity))]
+
+        return [self.rows[d] for d in ranked[offset:offset + limit].tolist()], int(ranked.size)
+
+
+# ---------------------------------------------------------------------- carga
+SEARCH_INDEX_ENABLED = os.getenv("PRODUCT_SEARCH_INDEX_ENABLED", "true").lower() == "true"
+
+_index: Optional[ProductSearchIndex] = None
+_reload_lock = threading.Lock()
+
+
+def get_index() -> Optional[ProductSearchIndex]:
+    """Índice vigente, o None si no está cargado o products/precios cambiaron desde la carga"""
+    index = _index
+    if index is None or index.generation != data_generation.current("inventory", "prices"):
+        return None
+    return index
+
+
+def reload(changed=None) -> Optional[ProductSearchIndex]:
+    global _index
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    if changed is not None and not {"inventory", "prices"} & set(changed):
+        return _index
+    with _reload_lock:
+        generation = data_generation.current("inventory", "prices")
+        if _index is not None and _index.generation == generation:
+            return _index
+        products = supabase_db_service.fetch_all("products", "*")
+        prices = {
+            p["sku"]: p["price"]
+            for p in supabase_db_service.fetch_all("product_prices_aft", "sku, price", order="sku")
+        }
+        _index = ProductSearchIndex(products, prices, generation)
+        logger.info(f"🔎 Índice de búsqueda de productos cargado: {_index.size}")
+        return _index
+
+
+data_generation.on_change(reload)
@@ -1,19 +1,39 @@
 from typing import Optional, Dict, List
+from postgrest import AsyncPostgrestClient
+from postgrest.exceptions import APIError
 from app.supabase import supabase
 from datetime import datetime
-from uuid import UUID
+from uuid import UUID, uuid4
 import logging
 from datetime import datetime
 import pytz
 
 from app.models import UserRole  # Agrega esto con las otras importaciones
+from app.services.user_cache import user_cache
+from app.services.telemetry_writer import telemetry_writer
+from app.services.token_revocations import token_revocations, STATELESS_AUTH, REVOKING_FIELDS
 
 
 logger = logging.getLogger(__name__)
 
 class SupabaseDBService:
-    def __init__(self):
-        self.client = supabase
+    def __init__(self, client=None):
+        # Por defecto el cliente compartido de la app (app.supabase)
+        self.client = client or supabase
+
+    def fetch_all(self, table: str, columns: str = "*", order: str = "id", page_size: int = 1000) -> List[Dict]:
+        """Lee una tabla completa en páginas (PostgREST limita cada respuesta a max-rows)"""
+        rows = []
+        start = 0
+        while True:
+            query = self.client.table(table).select(columns)
+            for column in order.split(","):
+                query = query.order(column.strip())
+            batch = query.range(start, start + page_size - 1).execute().data
+            rows.extend(batch)
+            if len(batch) < page_size:
+                return rows
+            start += page_size
 
     def create_user(self, user_data: Dict) -> Dict:
         try:
@@ -71,8 +91,13 @@ class SupabaseDBService:
             
             if not valid_fields:
                 return True
-                
+
+            # Revocar antes de escribir: si la revocación falla el cambio no se guarda y los
+            # tokens viejos no quedan vigentes con datos nuevos
+            if STATELESS_AUTH and (REVOKING_FIELDS & valid_fields.keys()):
+                token_revocations.revoke(str_id)
             response = self.client.table("usuarios").update(valid_fields).eq("id", str_id).execute()
+            user_cache.invalidate(str_id)
             if not response or not response.data:
                 raise Exception("Error updating user: empty or invalid response")
             return True
@@ -83,6 +108,14 @@ class SupabaseDBService:
     def generar_codigo_usuario(self, nombre: str) -> str:
         try:
             letra = nombre.strip()[0].upper()
+            try:
+                # Contador atómico por letra (sin scan y sin códigos repetidos)
+                return self.client.rpc("siguiente_codigo_usuario", {"p_letra": letra}).execute().data
+            except APIError as e:
+                if e.code != "PGRST202":
+                    raise
+                logger.warning("⚠️ siguiente_codigo_usuario no existe, se calcula el código con el último registrado")
+
             response = self.client.table("usuarios") \
                 .select("codigo_usuario") \
                 .ilike("codigo_usuario", f"{letra}-%") \
@@ -105,7 +138,11 @@ class SupabaseDBService:
 
     def delete_user(self, user_id: UUID) -> bool:
         try:
+            # Igual que en update_user: sin revocación no se borra
+            if STATELESS_AUTH:
+                token_revocations.revoke(user_id)
             response = self.client.table("usuarios").delete().eq("id", str(user_id)).execute()
+            user_cache.invalidate(user_id)
             if not response:
                 raise Exception("Error deleting user in Supabase")
             return True
@@ -158,10 +195,16 @@ class SupabaseDBService:
             logger.error(f"Error getting users by partner: {str(e)}")
             return []
 
-    def get_all_users(self, role=None, company=None, search=None, validated=None):
+    async def get_all_users(self, db: AsyncPostgrestClient, role=None, company=None, search=None,
+                            validated=None, parent_partner_id=None, page: int = 1,
+                            per_page: Optional[int] = None, count: str = "exact"):
+        """
+        Usuarios con filtros, orden y paginación resueltos en la consulta, por el PostgREST
+        asíncrono (db). Sin per_page regresa la lista completa; con per_page regresa (usuarios, total).
+        """
         try:
             # Consulta principal con JOIN explícito
-            query = self.client.from_('usuarios').select('''
+            query = db.from_('usuarios').select('''
                 id,
                 correo,
                 nombre,
@@ -172,22 +215,35 @@ class SupabaseDBService:
                 creado_en,
                 codigo_usuario,
                 parent_partner:parent_partner_id(codigo_usuario)
-            ''')
-
-            # Aplicar filtros
-            if role:
-                query = query.eq('rol', role.value if isinstance(role, UserRole) else role)
-            if company:
-                query = query.ilike('empresa', f'%{company}%')
-            if search:
-                query = query.or_(f'nombre.ilike.%{search}%,correo.ilike.%{search}%')
-            if validated is not None:
-                query = query.eq('validado', validated)
-
-            response = query.execute()
-            
-            # Debug: Ver la estructura completa de los datos
-            logger.debug(f"Datos crudos de Supabase: {response.data}")
+            ''', count=count if per_page else None)
+
+            def apply_filters(query):
+                if parent_partner_id:
+                    query = query.eq('parent_partner_id', str(parent_partner_id))
+                if role:
+                    query = query.eq('rol', role.value if isinstance(role, UserRole) else role)
+                if company:
+                    query = query.ilike('empresa', f'%{company}%')
+                if search:
+                    # Entre comillas para que comas o paréntesis no rompan el filtro or
+                    term = search.replace('\\', '\\\\').replace('"', '\\"')
+                    query = query.or_(f'nombre.ilike."%{term}%",correo.ilike."%{term}%"')
+                if validated is not None:
+                    query = query.eq('validado', validated)
+                return query
+
+            query = apply_filters(query).order('creado_en', desc=True).order('id')
+            if per_page:
+                query = query.range((page - 1) * per_page, page * per_page - 1)
+
+            try:
+                response = await query.execute()
+            except APIError as e:
+                # Página fuera de rango (PGRST103): sin filas, solo el total
+                if not per_page or e.code != "PGRST103":
+                    raise
+                total = (await apply_filters(db.from_('usuarios').select('id', count=count)).limit(1).execute()).count
+                return [], total or 0
 
             # Procesar respuesta
             processed_users = []
@@ -198,6 +254,8 @@ class SupabaseDBService:
                 }
                 processed_users.append(processed_user)
 
+            if per_page:
+                return processed_users, response.count or 0
             return processed_users
 
         except Exception as e:
@@ -218,10 +276,9 @@ class SupabaseDBService:
             "fecha": fecha_mexico.isoformat()  # Sobreescribe el valor automático
         }
         
-        response = self.client.table("log_sesiones").insert(data).execute()
-        if hasattr(response, "error") and response.error:
-            raise Exception(f"Error insertando log_sesion: {response.error}")
-        return response.data
+        # Se inserta en bloque desde el escritor en segundo plano
+        telemetry_writer.write("log_sesiones", [data])
+        return [data]
     
 
 
@@ -248,10 +305,31 @@ class SupabaseDBService:
             "fecha": fecha_mexico.isoformat()  # Sobreescribimos el valor automático
         }
         
-        response = self.client.table("log_busquedas").insert(data).execute()
-        if hasattr(response, "error") and response.error:
-            raise Exception(f"Error insertando log_busqueda: {response.error}")
-        return response.data
+        telemetry_writer.write("log_busquedas", [data])
+        return [data]
+
+    def registrar_busquedas_supabase(
+        self,
+        usuario_id: Optional[str],
+        partner_id: Optional[str],
+        busquedas: List[Dict]
+    ):
+        """Registra varias búsquedas (piso, serie, rin, medidas) en el escritor de logs"""
+        if not busquedas:
+            return []
+        fecha_mexico = datetime.now(pytz.timezone('America/Mexico_City')).isoformat()
+        data = [{
+            "usuario_id": usuario_id,
+            "partner_id": partner_id,
+            "piso": b.get("piso"),
+            "serie": b.get("serie"),
+            "rin": b.get("rin"),
+            "medidas": b.get("medidas"),
+            "fecha": fecha_mexico
+        } for b in busquedas]
+
+        telemetry_writer.write("log_busquedas", data)
+        return data
     
 
     def registrar_llanta_negada(
@@ -261,8 +339,11 @@ class SupabaseDBService:
         datos: dict
     ) -> Dict:
         try:
-            # Preparar datos para Supabase
+            # Preparar datos para Supabase; id y fecha se generan aquí porque el insert
+            # se hace en bloque desde el escritor en segundo plano
             supabase_data = {
+                "id": str(uuid4()),
+                "fecha": datetime.now(pytz.timezone('America/Mexico_City')).isoformat(),
                 "usuario_id": usuario_id,
                 "partner_id": partner_id,
                 "codigo": datos.get("sku"),
@@ -276,8 +357,8 @@ class SupabaseDBService:
                 "marca": datos.get("marca")
             }
 
-            response = self.client.table("llantas_negadas").insert(supabase_data).execute()
-            return response.data[0] if response.data else None
+            telemetry_writer.write("llantas_negadas", [supabase_data])
+            return supabase_data
             
         except Exception as e:
             logger.error(f"Error registrando llanta negada: {str(e)}")
@@ -0,0 +1,208 @@
+# app/services/telemetry_writer.py
+"""
+Escritor en segundo plano para los logs (log_sesiones, log_busquedas, llantas_negadas).
+
+Los eventos se encolan en memoria y un hilo los inserta por tabla en bloques: cuando se
+juntan TELEMETRY_BATCH_SIZE filas o pasan TELEMETRY_FLUSH_SECONDS. La cola es acotada; si
+se llena la fila se descarta (cuenta en "dropped"): una request nunca espera a la base por
+un log.
+Si un bloque falla se inserta fila por fila: solo las filas que fallan se reintentan, con
+espera creciente por tabla, y se descartan tras TELEMETRY_MAX_ATTEMPTS intentos. Al apagar
+la app se vacía la cola antes de salir.
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from app.supabase import supabase
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryWriter:
+    def __init__(self, batch_size: int = 200, flush_seconds: float = 2.0, max_queue: int = 10000, max_attempts: int = 3,
+                 retry_seconds: float = 1.0, max_retry_seconds: float = 60.0):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        # Espera antes de reintentar una tabla: retry_seconds, luego el doble... hasta max_retry_seconds
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.retrying = 0
+
+    # ------------------------------------------------------------------ productores
+    def write(self, table: str, rows: List[Dict]) -> None:
+        """
+        Encola filas para insertarse en bloque sin bloquear; con la cola llena se descartan.
+        Sin hilo activo (scripts, fuera del ciclo de vida de la app) inserta ya
+        """
+        if not rows:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._insert(table, rows)
+            return
+        enqueued = 0
+        for row in rows:
+            try:
+                self._queue.put_nowait((table, row))
+            except queue.Full:
+                break
+            enqueued += 1
+        dropped = len(rows) - enqueued
+        with self._lock:
+            self.enqueued += enqueued
+            self.dropped += dropped
+        if dropped:
+            logger.warning(f"⚠️ Cola de logs llena, se descartan {dropped} filas de {table}")
+
+    # ------------------------------------------------------------------ hilo
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+        logger.info("📝 Escritor de logs en segundo plano iniciado")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Detiene el hilo después de escribir lo que quede en la cola"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info(f"📝 Escritor de logs detenido ({self.stats()['pending']} filas pendientes)")
+
+    def _run(self) -> None:
+        pending: Dict[str, List[Dict]] = defaultdict(list)
+        # Filas que fallaron, con sus intentos; se reintentan cuando pasa retry_at de la tabla
+        retries: Dict[str, List[Tuple[Dict, int]]] = {}
+        retry_at: Dict[str, float] = {}
+        failures: Dict[str, int] = defaultdict(int)
+        deadline = time.monotonic() + self.flush_seconds
+        while True:
+            stopping = self._stop.is_set()
+            try:
+                table, row = self._queue.get(timeout=max(0.0, min(0.5, deadline - time.monotonic())))
+                pending[table].append(row)
+            except queue.Empty:
+                pass
+
+            if stopping:
+                # Vaciar la cola completa antes de la última escritura
+                while True:
+                    try:
+                        table, row = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending[table].append(row)
+
+            now = time.monotonic()
+            due = stopping or now >= deadline
+            for table in set(pending) | set(retries):
+                if not stopping and now < retry_at.get(table, 0.0):
+                    continue
+                rows = pending[table]
+                if table not in retries and not (rows and (due or len(rows) >= self.batch_size)):
+                    continue
+                items = retries.pop(table, []) + [(row, 0) for row in rows]
+                pending[table] = []
+                failed = self._flush(table, items, stopping)
+                if failed:
+                    failures[table] += 1
+                    retries[table] = failed
+                    delay = min(self.retry_seconds * 2 ** (failures[table] - 1), self.max_retry_seconds)
+                    retry_at[table] = time.monotonic() + delay
+                else:
+                    failures[table] = 0
+                    retry_at.pop(table, None)
+            with self._lock:
+                self.retrying = sum(len(items) for items in retries.values())
+            if due:
+                deadline = time.monotonic() + self.flush_seconds
+            if stopping:
+                return
+
+    def _flush(self, table: str, items: List[Tuple[Dict, int]], stopping: bool) -> List[Tuple[Dict, int]]:
+        """
+        Inserta (fila, intentos) en bloques; un bloque que falla se inserta fila por fila.
+        Regresa las filas por reintentar; las que agotan sus intentos se descartan
+        """
+        retry: List[Tuple[Dict, int]] = []
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            try:
+                self._insert(table, [row for row, _ in batch])
+                continue
+            except Exception as e:
+                logger.error(f"❌ Error insertando {len(batch)} filas en {table}, se insertan una por una: {e}")
+
+            failed = []
+            for row, attempts in batch:
+                try:
+                    self._insert(table, [row])
+                except Exception as e:
+                    failed.append((row, attempts + 1))
+                    error = e
+            if not failed:
+                continue
+
+            keep = [(row, attempts) for row, attempts in failed if attempts < self.max_attempts and not stopping]
+            if len(keep) < len(failed):
+                with self._lock:
+                    self.dropped += len(failed) - len(keep)
+                logger.error(f"❌ Se descartan {len(failed) - len(keep)} filas de {table} tras {self.max_attempts} intentos: {error}")
+            retry.extend(keep)
+
+            if len(batch) > 1 and len(failed) == len(batch):
+                # Falló todo el bloque (p. ej. sin conexión): el resto espera al siguiente intento
+                rest = items[start + self.batch_size:]
+                if stopping and rest:
+                    with self._lock:
+                        self.dropped += len(rest)
+                    logger.error(f"❌ Se descartan {len(rest)} filas de {table} al apagar (la tabla no acepta inserciones)")
+                elif rest:
+                    retry.extend(rest)
+                break
+        return retry
+
+    def _insert(self, table: str, rows: List[Dict]) -> None:
+        supabase.table(table).insert(rows).execute()
+        with self._lock:
+            self.written += len(rows)
+            self.batches += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "pending": self._queue.qsize(),
+                "batch_size": self.batch_size,
+                "flush_seconds": self.flush_seconds,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "batches": self.batches,
+                "retrying": self.retrying,
+                "dropped": self.dropped
+            }
+
+
+telemetry_writer = TelemetryWriter(
+    batch_size=int(os.getenv("TELEMETRY_BATCH_SIZE", "200")),
+    flush_seconds=float(os.getenv("TELEMETRY_FLUSH_SECONDS", "2")),
+    max_queue=int(os.getenv("TELEMETRY_MAX_QUEUE", "10000")),
+    max_attempts=int(os.getenv("TELEMETRY_MAX_ATTEMPTS", "3")),
+    retry_seconds=float(os.getenv("TELEMETRY_RETRY_SECONDS", "1"))
+)
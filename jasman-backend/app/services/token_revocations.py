@@ -0,0 +1,102 @@
+# app/services/token_revocations.py
+"""
+Lista de revocación para los JWT sin estado (JWT_STATELESS_AUTH).
+
+Cada usuario tiene una versión de token en token_revocations (0 si no tiene fila).
+Los tokens llevan la versión con la que se emitieron en "ver"; si es menor que la
+vigente el token está revocado. La tabla completa se cachea en memoria y el scheduler
+la refresca cada TOKEN_REVOCATION_REFRESH_SECONDS, así que validar un token no consulta
+la base. Una revocación se ve de inmediato en este worker y en los demás al refrescar.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+
+from app.supabase import supabase
+
+logger = logging.getLogger(__name__)
+
+# Modo sin estado: el token lleva los datos del usuario que necesita la autorización y
+# get_current_user no consulta la base
+STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "false").lower() == "true"
+
+TABLE = "token_revocations"
+# Datos del usuario que viajan en el token (claim "usr"); cambiarlos (o el rol) revoca
+CLAIM_FIELDS = ["correo", "nombre", "empresa", "parent_partner_id", "validado", "codigo_usuario", "creado_en"]
+# Campos de usuarios cuyo cambio invalida los tokens emitidos: los del claim, el rol y la contraseña
+REVOKING_FIELDS = frozenset({"rol", "contraseña", *CLAIM_FIELDS})
+REVOKE_ATTEMPTS = 3
+REFRESH_SECONDS = int(os.getenv("TOKEN_REVOCATION_REFRESH_SECONDS", "30"))
+
+
+class TokenRevocationList:
+    def __init__(self, max_age_seconds: float):
+        # Pasado este tiempo sin refrescar la lista no se confía en ella
+        self.max_age_seconds = max_age_seconds
+        self._versions: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        try:
+            rows, start, page_size = [], 0, 1000
+            while True:
+                batch = supabase.table(TABLE).select("user_id,version").order("user_id") \
+                    .range(start, start + page_size - 1).execute().data
+                rows.extend(batch)
+                if len(batch) < page_size:
+                    break
+                start += page_size
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo refrescar la lista de revocación de tokens: {e}")
+            return
+        with self._lock:
+            self._versions = {str(r["user_id"]): int(r["version"]) for r in rows}
+            self._loaded_at = time.monotonic()
+
+    def current_version(self, user_id: str) -> Optional[int]:
+        """Versión vigente del usuario, o None si la lista no está disponible o es vieja"""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age_seconds:
+                return None
+            return self._versions.get(str(user_id), 0)
+
+    def version_for_new_token(self, user_id) -> Optional[int]:
+        """
+        Versión leída directo de la base para emitir un token (en login): con la lista de
+        este worker atrasada se emitiría un token que nace revocado
+        """
+        try:
+            rows = supabase.table(TABLE).select("version").eq("user_id", str(user_id)).execute().data
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer la versión de token del usuario {user_id}: {e}")
+            return None
+        version = int(rows[0]["version"]) if rows else 0
+        with self._lock:
+            if version:
+                self._versions[str(user_id)] = version
+        return version
+
+    def revoke(self, user_id) -> None:
+        """
+        Invalida los tokens emitidos hasta ahora para el usuario. Reintenta y, si no lo
+        logra, propaga el error: se llama antes de escribir el cambio, que así no se aplica.
+        Bloquea entre reintentos; desde rutas async se usa vía run_in_threadpool
+        """
+        for attempt in range(1, REVOKE_ATTEMPTS + 1):
+            try:
+                version = supabase.rpc("revoke_user_tokens", {"p_user_id": str(user_id)}).execute().data
+                break
+            except Exception as e:
+                logger.error(f"❌ Error al revocar tokens del usuario {user_id} (intento {attempt}/{REVOKE_ATTEMPTS}): {e}")
+                if attempt == REVOKE_ATTEMPTS:
+                    raise
+                time.sleep(0.2 * attempt)
+        with self._lock:
+            self._versions[str(user_id)] = int(version)
+        logger.info(f"🔒 Tokens revocados para el usuario {user_id} (versión {version})")
+
+
+token_revocations = TokenRevocationList(max_age_seconds=REFRESH_SECONDS * 3)
@@ -0,0 +1,84 @@
+# app/services/user_cache.py
+"""
+Cache en proceso de usuarios para get_current_user.
+
+LRU acotado con TTL corto: evita el select a usuarios en cada petición autenticada.
+update_user / delete_user invalidan la entrada en este worker; en los demás workers
+el cambio se ve al vencer el TTL.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class UserCache:
+    def __init__(self, ttl_seconds: float = 30, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def set(self, user_id: str, user: Dict) -> None:
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, user_id: str, loader: Callable[[str], Optional[Dict]]) -> Optional[Dict]:
+        """Usuario del cache o del loader; los no encontrados no se guardan"""
+        user = self.get(user_id)
+        if user is None:
+            user = loader(user_id)
+            if user is not None:
+                self.set(user_id, user)
+        return user
+
+    def invalidate(self, user_id) -> None:
+        with self._lock:
+            if self._entries.pop(str(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+user_cache = UserCache(
+    ttl_seconds=float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+    max_size=int(os.getenv("USER_CACHE_MAX_SIZE", "1024"))
+)
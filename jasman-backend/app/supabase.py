@@ -1,8 +1,28 @@
 # app/supabase.py
+"""
+Clientes de Supabase de la aplicación (uno por proceso).
 
+- supabase: cliente síncrono compartido; su PostgREST usa un pool HTTP acotado y con
+  keep-alive (SUPABASE_HTTP_MAX_CONNECTIONS / SUPABASE_HTTP_MAX_KEEPALIVE).
+- PostgREST asíncrono: se abre en el arranque de la app (open_clients) y se cierra al
+  apagarla (close_clients), para que los handlers async esperen la E/S sin bloquear.
+
+El pool se configura con los puntos de extensión de las librerías: create_session de
+postgrest y la fábrica _init_postgrest_client de supabase.Client, que el cliente usa cada
+vez que (re)crea su PostgREST. Dependen de las versiones fijadas en requirements.txt
+(supabase 2.15.0 / postgrest 1.0.2); tests/test_supabase_clients.py lo verifica.
+
+En las rutas se inyectan con Depends(get_supabase) / Depends(get_async_postgrest).
+"""
 import os
+from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client
+from fastapi import HTTPException, status
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client
 
 # ✅ Cargar variables desde .env
 load_dotenv()
@@ -10,4 +30,74 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+HTTP_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("SUPABASE_HTTP_MAX_CONNECTIONS", "20")),
+    max_keepalive_connections=int(os.getenv("SUPABASE_HTTP_MAX_KEEPALIVE", "10")),
+    keepalive_expiry=float(os.getenv("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30"))
+)
+
+
+class PooledSyncPostgrestClient(SyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> SyncClient:
+        # SyncClient de postgrest: agrega aclose(), que usa el cierre del cliente
+        return SyncClient(
+            base_url=base_url, headers=headers, timeout=timeout, verify=verify, proxy=proxy,
+            follow_redirects=True, http2=True, limits=HTTP_LIMITS
+        )
+
+
+class PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url, headers=headers, timeout=timeout, verify=verify, proxy=proxy,
+            follow_redirects=True, http2=True, limits=HTTP_LIMITS
+        )
+
+
+class PooledClient(Client):
+    """supabase.Client cuyo PostgREST (table / rpc / from_) usa el pool acotado"""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout, verify=True, proxy=None) -> SyncPostgrestClient:
+        return PooledSyncPostgrestClient(
+            rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy
+        )
+
+
+supabase: Client = PooledClient.create(SUPABASE_URL, SUPABASE_KEY)
+
+_async_postgrest: Optional[AsyncPostgrestClient] = None
+
+
+async def open_clients() -> None:
+    """Abre el PostgREST asíncrono (evento de arranque)"""
+    global _async_postgrest
+    if _async_postgrest is None:
+        _async_postgrest = PooledAsyncPostgrestClient(
+            supabase.rest_url,
+            headers=supabase.options.headers,
+            schema=supabase.options.schema,
+            timeout=supabase.options.postgrest_client_timeout
+        )
+
+
+async def close_clients() -> None:
+    """Cierra los pools HTTP (evento de cierre)"""
+    global _async_postgrest
+    if _async_postgrest is not None:
+        await _async_postgrest.aclose()
+        _async_postgrest = None
+    supabase.postgrest.aclose()
+
+
+def get_supabase() -> Client:
+    return supabase
+
+
+def get_async_postgrest() -> AsyncPostgrestClient:
+    if _async_postgrest is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Cliente de base de datos no inicializado"
+        )
+    return _async_postgrest
@@ -0,0 +1,37 @@
+# app/utils/http_cache.py
+
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.services import data_generation
+
+
+def build_etag(request: Request, *kinds: str) -> str:
+    """ETag = generación de los datos + ruta + query (parámetros ordenados)"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    raw = f"{data_generation.current(*kinds)}#{request.url.path}?{query}"
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Acepta listas y ETags débiles (W/"...") que agregan proxies/compresión
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """Respuesta 304 si el cliente ya tiene esta versión, None si hay que generarla"""
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+def cache_headers(etag: str) -> dict:
+    # private: los datos dependen del token; no-cache: revalidar siempre con el ETag
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
@@ -2,51 +2,94 @@
 
 import os
 import base64
+import binascii
 import time
 import io
-from PIL import Image
-from supabase import create_client
+import asyncio
+import logging
+from typing import Dict, Tuple
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+from app.supabase import supabase as client, SUPABASE_URL
+
+logger = logging.getLogger(__name__)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET", "user-faces")
 
-client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Lado máximo (px) de la imagen guardada y de la miniatura, y calidad JPEG
+FACE_IMAGE_MAX_SIZE = int(os.getenv("FACE_IMAGE_MAX_SIZE", "1024"))
+FACE_THUMBNAIL_SIZE = int(os.getenv("FACE_THUMBNAIL_SIZE", "256"))
+FACE_IMAGE_QUALITY = int(os.getenv("FACE_IMAGE_QUALITY", "85"))
 
-def upload_face_image(base64_image: str, user_id: int) -> str:
-    try:
-        print("📤 Iniciando subida de imagen a Supabase...")
 
-        # Decodifica la imagen
-        image_bytes = base64.b64decode(base64_image)
+def _encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
 
-        # Valida que sea imagen JPEG
+
+def process_face_image(base64_image: str) -> Tuple[bytes, bytes]:
+    """
+    Decodifica el base64 y la imagen, orienta según EXIF, reduce a FACE_IMAGE_MAX_SIZE y
+    re-codifica a JPEG. Regresa (imagen, miniatura); ValueError si no es una imagen válida.
+    CPU puro: se llama desde el pool de hilos.
+    """
+    try:
+        image_bytes = base64.b64decode(base64_image)
         img = Image.open(io.BytesIO(image_bytes))
-        img.verify()
-
-        # Genera ruta única
-        timestamp = int(time.time())
-        file_path = f"faces/user_{user_id}/{timestamp}.jpg"
-
-        print(f"📁 Ruta de almacenamiento: {file_path}")
-
-        # Sube la imagen
-        response = client.storage.from_(SUPABASE_BUCKET).upload(
-            file=image_bytes,
-            path=file_path,
-            file_options={
-                "content-type": "image/jpeg",
-                "x-upsert": "true"
-            }
-        )
+    except (binascii.Error, UnidentifiedImageError) as e:
+        raise ValueError(f"Imagen no válida: {e}")
+    # Los JPEG se decodifican directo a una escala reducida (mucho menos trabajo)
+    img.draft("RGB", (FACE_IMAGE_MAX_SIZE, FACE_IMAGE_MAX_SIZE))
+    img = ImageOps.exif_transpose(img)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    img.thumbnail((FACE_IMAGE_MAX_SIZE, FACE_IMAGE_MAX_SIZE), Image.LANCZOS)
+    full = _encode_jpeg(img, FACE_IMAGE_QUALITY)
+
+    img.thumbnail((FACE_THUMBNAIL_SIZE, FACE_THUMBNAIL_SIZE), Image.LANCZOS)
+    thumbnail = _encode_jpeg(img, 80)
+    return full, thumbnail
 
-        print("✅ Imagen subida. Generando URL pública...")
 
-        # Devuelve la URL pública
-        public_url = f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{file_path}"
-        print(f"🌐 URL pública: {public_url}")
-        return public_url
+def _upload(file_path: str, data: bytes) -> None:
+    client.storage.from_(SUPABASE_BUCKET).upload(
+        file=data,
+        path=file_path,
+        file_options={
+            "content-type": "image/jpeg",
+            "x-upsert": "true"
+        }
+    )
 
+
+def _public_url(file_path: str) -> str:
+    return f"{SUPABASE_URL}/storage/v1/object/public/{SUPABASE_BUCKET}/{file_path}"
+
+
+async def upload_face_image(base64_image: str, user_id) -> Dict[str, str]:
+    """
+    Procesa la imagen fuera del event loop y sube imagen y miniatura en paralelo.
+    ValueError si la imagen no es válida; Exception si falla la subida
+    """
+    # Decodifica, valida y reduce la imagen en el pool de hilos
+    full, thumbnail = await run_in_threadpool(process_face_image, base64_image)
+
+    # Genera rutas únicas
+    timestamp = int(time.time())
+    file_path = f"faces/user_{user_id}/{timestamp}.jpg"
+    thumbnail_path = f"faces/user_{user_id}/{timestamp}_thumb.jpg"
+
+    try:
+        # Sube imagen y miniatura al mismo tiempo
+        await asyncio.gather(
+            run_in_threadpool(_upload, file_path, full),
+            run_in_threadpool(_upload, thumbnail_path, thumbnail)
+        )
     except Exception as e:
-        print(f"❌ Error al subir imagen a Supabase: {e}")
+        logger.error(f"❌ Error al subir imagen a Supabase ({file_path}): {e}")
         raise Exception(f"Error al subir imagen a Supabase: {e}")
+
+    logger.info(f"📤 Imagen de rostro subida: {file_path} ({len(full)} bytes, miniatura {len(thumbnail)} bytes)")
+    return {"url": _public_url(file_path), "thumbnail_url": _public_url(thumbnail_path)}
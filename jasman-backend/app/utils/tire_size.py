@@ -0,0 +1,80 @@
+# app/utils/tire_size.py
+
+import re
+from typing import Optional, Tuple, Any
+
+# Mismos patrones que la migración 20261019090000_tire_size_columns.sql (backfill y
+# columnas generadas de ExistenciaPlanta): el sync y la base deben dar el mismo valor.
+# Piso / serie: el valor completo es un entero ("205", " 55 ", "205.0"); "LT235" -> None
+_INTEGER_RE = re.compile(r'^\s*(\d+)(?:\.0+)?\s*$')
+# Rin: primer número del valor ("R16", "16.5", "19.5")
+_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+# Medida de flotación ("31x10.5R15", "33X12.50R15"): no tiene piso/serie/rin métricos
+_FLOTATION_RE = re.compile(r'\d\s*x\s*\d', re.IGNORECASE)
+
+# Medida completa: "205/55R16", "205/55 ZR16", "205/55-16", "7.50R16"
+_SIZE_RE = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(?:/\s*(\d+(?:\.\d+)?))?\s*[A-Z]{0,2}\s*-?\s*R?\s*(\d+(?:\.\d+)?)',
+    re.IGNORECASE
+)
+
+
+def _whole_integer(value: Any) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value) if float(value).is_integer() else None
+    match = _INTEGER_RE.match(str(value))
+    return int(match.group(1)) if match else None
+
+
+def _first_number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value))
+    return float(match.group(1)) if match else None
+
+
+def parse_width(value: Any) -> Optional[int]:
+    """Piso (ancho en mm) como entero. '205' -> 205; 'LT235' -> None"""
+    return _whole_integer(value)
+
+
+def parse_ratio(value: Any) -> Optional[int]:
+    """Serie (perfil en %) como entero. '55' -> 55; '10.50' (flotación) -> None"""
+    return _whole_integer(value)
+
+
+def parse_rim(value: Any) -> Optional[float]:
+    """Rin (diámetro en pulgadas). 'R16' -> 16.0, '19.5' -> 19.5"""
+    return _first_number(value)
+
+
+def parse_size_filters(
+    piso: Optional[str],
+    serie: Optional[str],
+    rin: Optional[str]
+) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+    """Convierte los filtros de búsqueda (texto) a los valores de las columnas numéricas"""
+    return parse_width(piso), parse_ratio(serie), parse_rim(rin)
+
+
+def parse_size_string(size: Any) -> Tuple[Optional[int], Optional[int], Optional[float]]:
+    """Descompone una medida completa. '205/55R16' -> (205, 55, 16.0); flotación -> None"""
+    if not size or _FLOTATION_RE.search(str(size)):
+        return None, None, None
+    match = _SIZE_RE.search(str(size))
+    if not match:
+        return None, None, None
+    width, ratio, rim = match.groups()
+    return parse_width(width), parse_ratio(ratio), parse_rim(rim)
+
+
+def format_rim(rim: Optional[float]) -> Optional[str]:
+    """16.0 -> '16', 19.5 -> '19.5'"""
+    if rim is None:
+        return None
+    return str(int(rim)) if float(rim).is_integer() else str(rim)
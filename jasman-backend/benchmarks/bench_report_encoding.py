@@ -0,0 +1,103 @@
+"""
+Benchmark de serialización y compresión del reporte de zonas.
+
+Compara el camino anterior (jsonable_encoder + JSONResponse) contra ORJSONResponse
+directo, y el tamaño en la red sin compresión, con gzip, con brotli y en formato columnar.
+
+Uso (desde jasman-backend/):
+    python -m benchmarks.bench_report_encoding [--products 500] [--repeat 20]
+"""
+import argparse
+import gzip
+import random
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_report(n_products: int, seed: int = 7) -> dict:
+    """Reporte sintético con la misma forma que /inventory/reporte-zonas-detallado"""
+    rng = random.Random(seed)
+    data = []
+    for i in range(n_products):
+        zonas = {}
+        for z in range(1, 5):
+            cedis = [{"almacen_id": 100 + z, "nombre": f"CEDIS ZONA {z}", "cantidad": rng.randint(0, 80)}]
+            sucursales = [
+                {"almacen_id": 200 + z * 10 + s, "nombre": f"SUCURSAL {z}-{s}", "cantidad": rng.randint(0, 12)}
+                for s in range(rng.randint(0, 6))
+            ]
+            total_cedis = sum(a["cantidad"] for a in cedis)
+            total_sucursales = sum(a["cantidad"] for a in sucursales)
+            zonas[str(z)] = {
+                "CEDIS": cedis, "Sucursales": sucursales,
+                "total_cedis": total_cedis, "total_sucursales": total_sucursales,
+                "total_general": total_cedis + total_sucursales
+            }
+        data.append({
+            "sku": f"LL{100000 + i}",
+            "nombre": f"[LL{100000 + i}] LLANTA 205/55R16 91V MARCA MODELO {i}",
+            "piso": "205", "serie": "55", "marca": "MARCA", "rin": "16",
+            "precio": round(rng.uniform(900, 4000), 2),
+            "zonas": zonas
+        })
+    return {
+        "data": data,
+        "proveedores": {},
+        "pagination": {"total_items": n_products, "current_page": 1, "per_page": n_products, "total_pages": 1}
+    }
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    report = build_report(args.products)
+
+    before_ms = _time(lambda: JSONResponse(jsonable_encoder(report)).body, args.repeat)
+    after_ms = _time(lambda: ORJSONResponse(report).body, args.repeat)
+
+    before_body = JSONResponse(jsonable_encoder(report)).body
+    after_body = ORJSONResponse(report).body
+
+    print(f"Reporte sintético: {args.products} productos, mejor de {args.repeat} corridas")
+    print(f"  Codificación antes (jsonable_encoder + json): {before_ms:8.1f} ms")
+    print(f"  Codificación después (orjson directo):        {after_ms:8.1f} ms")
+    print(f"  Bytes sin comprimir: antes {len(before_body):,} / después {len(after_body):,}")
+
+    gzip_body = gzip.compress(after_body, compresslevel=9)
+    gzip_ms = _time(lambda: gzip.compress(after_body, compresslevel=9), args.repeat)
+    print(f"  gzip (nivel 9):   {len(gzip_body):>10,} bytes  ({gzip_ms:.1f} ms)")
+    if brotli is not None:
+        br_body = brotli.compress(after_body, quality=4)
+        br_ms = _time(lambda: brotli.compress(after_body, quality=4), args.repeat)
+        print(f"  brotli (q=4):     {len(br_body):>10,} bytes  ({br_ms:.1f} ms)")
+    else:
+        print("  brotli no instalado, se omite")
+
+    # Formato columnar (format=columnar)
+    from app.routes.odoo.inventory import _to_columnar
+    columnar_body = ORJSONResponse(_to_columnar(report["data"])).body
+    print(f"  columnar:         {len(columnar_body):>10,} bytes  "
+          f"(gzip {len(gzip.compress(columnar_body, compresslevel=9)):,})")
+
+
+if __name__ == "__main__":
+    main()
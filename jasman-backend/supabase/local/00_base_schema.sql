@@ -0,0 +1,41 @@
+-- Esquema mínimo para el Postgres local de docker-compose.postgres.yml: roles de Supabase
+-- y las tablas que escribe el sync de inventario (warehouses, products, inventory), con
+-- las columnas de medida de la migración 20261019090000.
+
+do $$ begin
+    if not exists (select 1 from pg_roles where rolname = 'anon') then create role anon; end if;
+    if not exists (select 1 from pg_roles where rolname = 'authenticated') then create role authenticated; end if;
+    if not exists (select 1 from pg_roles where rolname = 'service_role') then create role service_role; end if;
+end $$;
+
+create table if not exists public.warehouses (
+    id   bigint primary key,
+    name text,
+    type text,
+    zone integer
+);
+
+create table if not exists public.products (
+    id              bigint primary key,
+    name            text,
+    sku             text,
+    total_quantity  integer,
+    piso            text,
+    serie           text,
+    rin             text,
+    width           integer,
+    ratio           integer,
+    rim             numeric(4, 1),
+    carga_velocidad text,
+    marca           text,
+    modelo          text,
+    last_sync       timestamptz
+);
+
+create table if not exists public.inventory (
+    product_id   bigint references public.products (id),
+    warehouse_id bigint references public.warehouses (id),
+    quantity     integer,
+    last_updated timestamptz,
+    primary key (product_id, warehouse_id)
+);
@@ -0,0 +1,40 @@
+-- Columnas numéricas de medida (piso / serie / rin) con índice compuesto.
+-- Reemplazan los filtros ilike '%205%' (scan completo y falsos positivos como
+-- rin '16' dentro de '165') por igualdades sobre un índice B-tree.
+
+-- ---------------------------------------------------------------------------
+-- products: columnas escritas por la sincronización con Odoo
+-- ---------------------------------------------------------------------------
+alter table public.products
+    add column if not exists width integer,
+    add column if not exists ratio integer,
+    add column if not exists rim   numeric(4, 1);
+
+-- Backfill de los productos existentes (la siguiente sync las reescribe)
+update public.products
+set width = nullif(substring(piso  from '^\s*(\d+)(?:\.0+)?\s*$'), '')::integer,
+    ratio = nullif(substring(serie from '^\s*(\d+)(?:\.0+)?\s*$'), '')::integer,
+    rim   = nullif(substring(rin   from '(\d+(?:\.\d+)?)'), '')::numeric(4, 1)
+where width is null and ratio is null and rim is null;
+
+create index if not exists products_width_ratio_rim_idx
+    on public.products (width, ratio, rim);
+
+-- Búsquedas solo por rin (filtros de la tabla general)
+create index if not exists products_rim_idx
+    on public.products (rim);
+
+-- ---------------------------------------------------------------------------
+-- ExistenciaPlanta: columnas generadas a partir de las de texto, así cualquier
+-- carga de proveedor (manual o por el backend) las mantiene consistentes.
+-- ---------------------------------------------------------------------------
+alter table public."ExistenciaPlanta"
+    add column if not exists width_num integer
+        generated always as (nullif(substring("width"::text from '^\s*(\d+)(?:\.0+)?\s*$'), '')::integer) stored,
+    add column if not exists ratio_num integer
+        generated always as (nullif(substring("ratio"::text from '^\s*(\d+)(?:\.0+)?\s*$'), '')::integer) stored,
+    add column if not exists rim_num numeric(4, 1)
+        generated always as (nullif(substring("diameter"::text from '(\d+(?:\.\d+)?)'), '')::numeric(4, 1)) stored;
+
+create index if not exists existencia_planta_width_ratio_rim_idx
+    on public."ExistenciaPlanta" (width_num, ratio_num, rim_num);
@@ -0,0 +1,15 @@
+-- Paginación por cursor del reporte de zonas: (sku, id) > (:sku, :id)
+-- El orden del índice coincide con el ORDER BY sku, id (NULLS LAST por defecto).
+
+-- sku ordena por punto de código (collate "C"), igual que el snapshot en memoria: un cursor
+-- emitido por una fuente (PostgREST, RPC o snapshot) se puede continuar en otra sin saltar
+-- ni repetir filas. Con la collation del idioma 'a-b' < 'B2'; en "C" y en Python es al revés.
+alter table public.products alter column sku type text collate "C";
+
+create index if not exists products_sku_id_idx
+    on public.products (sku, id);
+
+-- Con filtro de medida el planner combina este índice con products_width_ratio_rim_idx;
+-- para el caso más común (medida completa) conviene el índice que ya trae el orden.
+create index if not exists products_width_ratio_rim_sku_id_idx
+    on public.products (width, ratio, rim, sku, id);
@@ -0,0 +1,174 @@
+-- Reporte de zonas armado en Postgres: una sola llamada (supabase.rpc) en lugar de
+-- las 5 consultas PostgREST de /inventory/reporte-zonas-detallado?source=rpc.
+--
+-- Devuelve el mismo JSON que el endpoint:
+--   { data: [...filas...], proveedores: {...}, total_items: n, page_keys: [[sku, id], ...] }
+-- page_keys son los (sku, id) de la página en orden, para construir el cursor.
+-- El orden por sku es collate "C" (punto de código), el mismo del snapshot en memoria.
+
+create or replace function public.reporte_zonas_detallado(
+    p_width     integer default null,
+    p_ratio     integer default null,
+    p_rim       numeric default null,
+    p_limit     integer default 500,
+    p_offset    integer default 0,
+    p_after_sku text    default null,
+    p_after_id  bigint  default null,
+    p_count     boolean default true
+)
+returns jsonb
+language sql
+stable
+as $$
+with filtered as (
+    select p.*
+    from public.products p
+    where (p_width is null or p.width = p_width)
+      and (p_ratio is null or p.ratio = p_ratio)
+      and (p_rim   is null or p.rim   = p_rim)
+),
+page as (
+    select f.*
+    from filtered f
+    where p_after_id is null
+       or (p_after_sku is not null and ((f.sku collate "C", f.id) > (p_after_sku collate "C", p_after_id) or f.sku is null))
+       or (p_after_sku is null and f.sku is null and f.id > p_after_id)
+    order by f.sku collate "C", f.id
+    limit p_limit
+    offset p_offset
+),
+existencia as (
+    select e.*
+    from public."ExistenciaPlanta" e
+    where (p_width is null or e.width_num = p_width)
+      and (p_ratio is null or e.ratio_num = p_ratio)
+      and (p_rim   is null or e.rim_num   = p_rim)
+),
+prices as (
+    select pr.sku::text as sku, pr.price
+    from public.product_prices_aft pr
+    where pr.sku::text in (
+        select pg.sku::text from page pg where nullif(pg.sku::text, '') is not null
+        union
+        select e.sku::text from existencia e where nullif(e.sku::text, '') is not null
+    )
+),
+-- Inventario de la página agrupado por producto / zona / CEDIS-Sucursales
+stock as (
+    select
+        pg.id as product_id,
+        w.zone::text as zona,
+        case when upper(w.type) = 'CEDIS' then 'CEDIS' else 'Sucursales' end as grupo,
+        jsonb_agg(
+            jsonb_build_object('almacen_id', w.id, 'nombre', w.name, 'cantidad', i.quantity)
+            order by w.id
+        ) as almacenes,
+        sum(i.quantity) as total
+    from page pg
+    join public.inventory i on i.product_id = pg.id
+    join public.warehouses w on w.id = i.warehouse_id
+    group by pg.id, w.zone, 3
+),
+-- ExistenciaPlanta agrupada por SKU / almacén del proveedor (va como CEDIS "Planta (...)")
+planta as (
+    select
+        e.sku::text as sku,
+        coalesce(e.warehouse, 'Planta') as zona,
+        jsonb_agg(jsonb_build_object(
+            'almacen_id', null,
+            'nombre', 'Planta (' || coalesce(e.warehouse, 'Planta') || ')',
+            'cantidad', coalesce(e.on_hand, 0)
+        )) as almacenes,
+        sum(coalesce(e.on_hand, 0)) as total
+    from existencia e
+    where nullif(e.sku::text, '') is not null
+    group by e.sku::text, coalesce(e.warehouse, 'Planta')
+),
+planta_zonas as (
+    select
+        pl.sku,
+        jsonb_object_agg(pl.zona, jsonb_build_object(
+            'CEDIS', pl.almacenes, 'Sucursales', '[]'::jsonb,
+            'total_cedis', pl.total, 'total_sucursales', 0, 'total_general', pl.total
+        )) as zonas
+    from planta pl
+    group by pl.sku
+),
+product_rows as (
+    select
+        pg.sku::text as sku,
+        jsonb_build_object(
+            'sku', pg.sku::text,
+            'nombre', pg.name,
+            'piso', pg.piso,
+            'serie', pg.serie,
+            'marca', pg.marca,
+            'rin', pg.rin,
+            'precio', (select pr.price from prices pr where pr.sku = pg.sku::text limit 1),
+            'zonas', (
+                select jsonb_object_agg(z.zona, jsonb_build_object(
+                    'CEDIS', coalesce(c.almacenes, '[]'::jsonb),
+                    'Sucursales', coalesce(s.almacenes, '[]'::jsonb),
+                    'total_cedis', coalesce(c.total, 0),
+                    'total_sucursales', coalesce(s.total, 0),
+                    'total_general', coalesce(c.total, 0) + coalesce(s.total, 0)
+                ))
+                from (values ('1'), ('2'), ('3'), ('4')) as z(zona)
+                left join stock c on c.product_id = pg.id and c.zona = z.zona and c.grupo = 'CEDIS'
+                left join stock s on s.product_id = pg.id and s.zona = z.zona and s.grupo = 'Sucursales'
+            ) || coalesce((select pz.zonas from planta_zonas pz where pz.sku = pg.sku::text), '{}'::jsonb)
+        ) as row
+    from page pg
+    where nullif(pg.sku::text, '') is not null
+),
+-- SKUs que solo existen en ExistenciaPlanta
+planta_rows as (
+    select
+        pz.sku,
+        jsonb_build_object(
+            'sku', pz.sku,
+            'nombre', coalesce(info.description, 'SKU-' || pz.sku),
+            'marca', info.brand,
+            'piso', info.width,
+            'serie', info.ratio,
+            'rin', info.diameter,
+            'precio', (select pr.price from prices pr where pr.sku = pz.sku limit 1),
+            'zonas', pz.zonas
+        ) as row
+    from planta_zonas pz
+    cross join lateral (
+        select e.description, e.brand, e.width, e.ratio, e.diameter
+        from existencia e
+        where e.sku::text = pz.sku
+        limit 1
+    ) info
+    where not exists (select 1 from page pg where pg.sku::text = pz.sku)
+),
+all_rows as (
+    select sku, row from product_rows
+    union all
+    select sku, row from planta_rows
+),
+proveedores as (
+    select distinct on (e.manufacturer)
+        e.manufacturer, e."update", e.created_at
+    from existencia e
+    where e.manufacturer is not null
+)
+select jsonb_build_object(
+    'data', coalesce((select jsonb_agg(a.row order by a.sku collate "C") from all_rows a), '[]'::jsonb),
+    'proveedores', coalesce((
+        select jsonb_object_agg(pv.manufacturer, jsonb_build_object('update', pv."update", 'created_at', pv.created_at))
+        from proveedores pv
+    ), '{}'::jsonb),
+    'total_items', case when p_count then (select count(*) from filtered) end,
+    'page_keys', coalesce((select jsonb_agg(jsonb_build_array(pg.sku, pg.id) order by pg.sku collate "C", pg.id) from page pg), '[]'::jsonb)
+);
+$$;
+
+-- Solo el backend (service_role): el reporte lleva precios y no debe quedar expuesto a la
+-- llave anon; las funciones nuevas tienen EXECUTE para PUBLIC por omisión
+revoke execute on function public.reporte_zonas_detallado(integer, integer, numeric, integer, integer, text, bigint, boolean)
+    from public, anon, authenticated;
+grant execute on function public.reporte_zonas_detallado(integer, integer, numeric, integer, integer, text, bigint, boolean)
+    to service_role;
@@ -0,0 +1,21 @@
+-- Llave natural de ExistenciaPlanta para la carga por proveedor (POST /existencia/upload):
+-- una fila por (manufacturer, sku, warehouse), cargada con upsert on_conflict.
+
+-- Filas sin almacén quedan como 'Planta' (el reporte ya las muestra así) para que el
+-- índice único las distinga: NULL no choca contra NULL.
+update public."ExistenciaPlanta" set warehouse = 'Planta' where warehouse is null or warehouse = '';
+
+-- Duplicados previos: se conserva la fila más reciente
+delete from public."ExistenciaPlanta" e
+using public."ExistenciaPlanta" newer
+where e.manufacturer is not distinct from newer.manufacturer
+  and e.sku is not distinct from newer.sku
+  and e.warehouse = newer.warehouse
+  and e.id < newer.id;
+
+create unique index if not exists existencia_planta_manufacturer_sku_warehouse_key
+    on public."ExistenciaPlanta" (manufacturer, sku, warehouse);
+
+-- Borrado de filas que ya no vienen en el archivo del proveedor
+create index if not exists existencia_planta_manufacturer_update_idx
+    on public."ExistenciaPlanta" (manufacturer, "update");
@@ -0,0 +1,31 @@
+-- Historial del inventario por corrida de sync (GET /inventory/historial).
+--
+-- Cada sync registra una corrida:
+--   checkpoint: estado completo (tuplas con cantidad distinta de 0)
+--   delta:      solo las tuplas (producto, almacén) cuya cantidad cambió contra el estado
+--               anterior; cantidad 0 = la tupla desapareció
+-- Las tuplas se guardan en columnas de arreglos (una fila por bloque), no una fila por tupla:
+-- el espacio crece con los cambios, no con catálogo x días.
+
+create table if not exists public.inventory_history_runs (
+    id         bigserial primary key,
+    run_at     timestamptz not null default now(),
+    kind       text        not null check (kind in ('checkpoint', 'delta')),
+    entries    integer     not null default 0,
+    generation text
+);
+
+create index if not exists inventory_history_runs_run_at_idx
+    on public.inventory_history_runs (run_at);
+
+create index if not exists inventory_history_runs_checkpoint_idx
+    on public.inventory_history_runs (run_at) where kind = 'checkpoint';
+
+create table if not exists public.inventory_history_parts (
+    run_id        bigint    not null references public.inventory_history_runs (id) on delete cascade,
+    part          integer   not null,
+    product_ids   bigint[]  not null,
+    warehouse_ids integer[] not null,
+    quantities    integer[] not null,
+    primary key (run_id, part)
+);
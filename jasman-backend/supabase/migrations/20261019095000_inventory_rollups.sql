@@ -0,0 +1,40 @@
+-- Totales de inventario precalculados para tableros (GET /inventory/estadisticas).
+-- Una fila por zona / tipo de almacén / medida / marca; se refresca al final de cada sync
+-- con public.refresh_inventory_rollups().
+
+create materialized view if not exists public.inventory_rollups as
+select
+    w.zone::text                                                          as zona,
+    case when upper(w.type) = 'CEDIS' then 'CEDIS' else 'Sucursal' end    as tipo,
+    p.rim                                                                 as rim,
+    p.width                                                               as width,
+    p.ratio                                                               as ratio,
+    coalesce(nullif(p.marca, ''), 'SIN MARCA')                            as marca,
+    sum(i.quantity)::bigint                                               as cantidad,
+    count(distinct p.id)::integer                                         as productos,
+    count(distinct p.id) filter (where i.quantity > 0)::integer           as productos_con_existencia
+from public.inventory i
+join public.products p   on p.id = i.product_id
+join public.warehouses w on w.id = i.warehouse_id
+group by 1, 2, 3, 4, 5, 6;
+
+-- Requerido por REFRESH ... CONCURRENTLY (las lecturas no se bloquean durante el refresh)
+create unique index if not exists inventory_rollups_key
+    on public.inventory_rollups (zona, tipo, rim, width, ratio, marca) nulls not distinct;
+
+create index if not exists inventory_rollups_rim_idx   on public.inventory_rollups (rim);
+create index if not exists inventory_rollups_marca_idx on public.inventory_rollups (marca);
+
+create or replace function public.refresh_inventory_rollups()
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    refresh materialized view concurrently public.inventory_rollups;
+end;
+$$;
+
+grant select on public.inventory_rollups to anon, authenticated, service_role;
+grant execute on function public.refresh_inventory_rollups() to service_role;
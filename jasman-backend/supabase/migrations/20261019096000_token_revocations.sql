@@ -0,0 +1,29 @@
+-- Versión de tokens por usuario para el modo JWT sin estado (JWT_STATELESS_AUTH).
+--
+-- Los tokens llevan la versión vigente del usuario en el claim "ver". Subir la versión
+-- (public.revoke_user_tokens) invalida todos los tokens emitidos antes. La tabla es chica
+-- (solo usuarios con tokens revocados alguna vez) y cada worker la cachea completa.
+-- Sin llave foránea a usuarios: la fila debe sobrevivir al borrado del usuario.
+
+create table if not exists public.token_revocations (
+    user_id    uuid        primary key,
+    version    integer     not null default 1,
+    revoked_at timestamptz not null default now()
+);
+
+create or replace function public.revoke_user_tokens(p_user_id uuid)
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+    insert into public.token_revocations as t (user_id)
+    values (p_user_id)
+    on conflict (user_id) do update
+        set version = t.version + 1,
+            revoked_at = now()
+    returning version;
+$$;
+
+grant select on public.token_revocations to service_role;
+grant execute on function public.revoke_user_tokens(uuid) to service_role;
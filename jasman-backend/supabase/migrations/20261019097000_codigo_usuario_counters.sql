@@ -0,0 +1,36 @@
+-- Códigos de usuario (LETRA-NUMERO) asignados por un contador por letra.
+--
+-- Antes el siguiente código se calculaba con ilike 'X-%' + order desc limit 1 y +1 en
+-- Python: un scan por registro, y dos registros simultáneos recibían el mismo código.
+-- public.siguiente_codigo_usuario incrementa el contador en un solo upsert (el lock de la
+-- fila serializa registros concurrentes de la misma letra).
+
+create table if not exists public.codigo_usuario_counters (
+    letra  text    primary key,
+    ultimo integer not null
+);
+
+-- Arranca cada letra en el código más alto ya asignado
+insert into public.codigo_usuario_counters as c (letra, ultimo)
+select split_part(codigo_usuario, '-', 1), max(split_part(codigo_usuario, '-', 2)::integer)
+from public.usuarios
+where codigo_usuario ~ '^[^-]+-[0-9]{1,9}$'
+group by 1
+on conflict (letra) do update set ultimo = greatest(c.ultimo, excluded.ultimo);
+
+-- Búsquedas por código (registro con codigo_usuario del partner, /admin/user-by-code)
+create index if not exists usuarios_codigo_usuario_idx on public.usuarios (codigo_usuario);
+
+create or replace function public.siguiente_codigo_usuario(p_letra text)
+returns text
+language sql
+security definer
+set search_path = public
+as $$
+    insert into public.codigo_usuario_counters as c (letra, ultimo)
+    values (p_letra, 450000)
+    on conflict (letra) do update set ultimo = c.ultimo + 1
+    returning c.letra || '-' || c.ultimo;
+$$;
+
+grant execute on function public.siguiente_codigo_usuario(text) to service_role;
@@ -0,0 +1,54 @@
+-- Escritura atómica de una corrida del historial de inventario.
+--
+-- Antes se insertaba la corrida y luego cada bloque en peticiones separadas: si un bloque
+-- fallaba quedaba una corrida incompleta y state_as_of reconstruía un estado equivocado
+-- (y los deltas siguientes se calculaban contra él). Esta función inserta la corrida y
+-- todos sus bloques en una sola transacción.
+
+create or replace function public.record_inventory_history_run(
+    p_kind          text,
+    p_generation    text,
+    p_run_at        timestamptz,
+    p_product_ids   bigint[],
+    p_warehouse_ids integer[],
+    p_quantities    integer[],
+    p_part_size     integer default 20000
+)
+returns public.inventory_history_runs
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_run   public.inventory_history_runs;
+    v_n     integer := coalesce(cardinality(p_product_ids), 0);
+    v_start integer := 1;
+    v_part  integer := 0;
+begin
+    if v_n <> coalesce(cardinality(p_warehouse_ids), 0) or v_n <> coalesce(cardinality(p_quantities), 0) then
+        raise exception 'product_ids, warehouse_ids y quantities deben tener el mismo tamaño';
+    end if;
+
+    insert into public.inventory_history_runs (run_at, kind, entries, generation)
+    values (p_run_at, p_kind, v_n, p_generation)
+    returning * into v_run;
+
+    while v_start <= v_n loop
+        insert into public.inventory_history_parts (run_id, part, product_ids, warehouse_ids, quantities)
+        values (
+            v_run.id,
+            v_part,
+            p_product_ids[v_start:v_start + p_part_size - 1],
+            p_warehouse_ids[v_start:v_start + p_part_size - 1],
+            p_quantities[v_start:v_start + p_part_size - 1]
+        );
+        v_start := v_start + p_part_size;
+        v_part := v_part + 1;
+    end loop;
+
+    return v_run;
+end;
+$$;
+
+grant execute on function public.record_inventory_history_run(text, text, timestamptz, bigint[], integer[], integer[], integer)
+    to service_role;
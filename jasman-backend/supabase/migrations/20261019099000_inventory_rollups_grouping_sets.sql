@@ -0,0 +1,127 @@
+-- inventory_rollups por niveles de zona / tipo (GET /inventory/estadisticas).
+--
+-- La vista anterior tenía una fila por zona / tipo / medida / marca con count(distinct
+-- producto) por grupo; al re-agrupar (p. ej. solo por marca) esos conteos se sumaban y un
+-- producto con existencia en varias zonas contaba varias veces.
+--
+-- Ahora la vista guarda los totales ya agrupados con GROUPING SETS en cuatro niveles:
+--   nivel 0: zona y tipo, 1: solo zona, 2: solo tipo, 3: total
+-- siempre desglosados por medida (rim, width, ratio) y marca. Un producto tiene una sola
+-- medida y una sola marca, así que dentro de un nivel los conteos de productos se pueden
+-- sumar entre medidas / marcas sin contar dos veces; lo único que no se puede sumar es
+-- entre zonas o tipos, y para eso está el nivel correspondiente.
+
+drop function if exists public.inventory_rollup_totals(text[], text, text, integer, integer, numeric, text);
+drop materialized view if exists public.inventory_rollups;
+
+create materialized view public.inventory_rollups as
+with base as (
+    select
+        w.zone::text                                                          as zona,
+        case when upper(w.type) = 'CEDIS' then 'CEDIS' else 'Sucursal' end    as tipo,
+        p.id                                                                  as product_id,
+        p.rim                                                                 as rim,
+        p.width                                                               as width,
+        p.ratio                                                               as ratio,
+        coalesce(nullif(p.marca, ''), 'SIN MARCA')                            as marca,
+        i.quantity                                                            as quantity
+    from public.inventory i
+    join public.products p   on p.id = i.product_id
+    join public.warehouses w on w.id = i.warehouse_id
+)
+select
+    (grouping(zona) * 2 + grouping(tipo))::smallint                      as nivel,
+    zona,
+    tipo,
+    rim,
+    width,
+    ratio,
+    marca,
+    sum(quantity)::bigint                                                 as cantidad,
+    count(distinct product_id)::integer                                   as productos,
+    count(distinct product_id) filter (where quantity > 0)::integer       as productos_con_existencia
+from base
+group by grouping sets (
+    (zona, tipo, rim, width, ratio, marca),
+    (zona, rim, width, ratio, marca),
+    (tipo, rim, width, ratio, marca),
+    (rim, width, ratio, marca)
+);
+
+-- Requerido por REFRESH ... CONCURRENTLY (public.refresh_inventory_rollups no cambia);
+-- también es el índice de las lecturas: siempre filtran por nivel
+create unique index if not exists inventory_rollups_key
+    on public.inventory_rollups (nivel, zona, tipo, rim, width, ratio, marca) nulls not distinct;
+
+create index if not exists inventory_rollups_size_idx  on public.inventory_rollups (nivel, width, ratio, rim);
+create index if not exists inventory_rollups_marca_idx on public.inventory_rollups (nivel, marca);
+
+-- Solo el backend (service_role) lee la vista; el endpoint ya valida al usuario
+revoke all on public.inventory_rollups from public, anon, authenticated;
+grant select on public.inventory_rollups to service_role;
+
+-- Totales agrupados por las dimensiones pedidas (zona, tipo, rim, width, ratio, marca),
+-- una fila jsonb por grupo ordenada por las dimensiones. Lee solo las filas del nivel que
+-- incluye la zona / tipo pedidos o filtrados y suma entre medidas / marcas.
+create or replace function public.inventory_rollup_totals(
+    p_group_by text[]  default '{}',
+    p_zona     text    default null,
+    p_tipo     text    default null,
+    p_width    integer default null,
+    p_ratio    integer default null,
+    p_rim      numeric default null,
+    p_marca    text    default null
+)
+returns setof jsonb
+language plpgsql
+stable
+security definer
+set search_path = public
+as $$
+declare
+    v_dims  text[] := coalesce(p_group_by, '{}');
+    v_nivel smallint;
+    v_group text;
+    v_order text;
+begin
+    if exists (
+        select 1 from unnest(v_dims) d
+        where d <> all (array['zona', 'tipo', 'rim', 'width', 'ratio', 'marca'])
+    ) then
+        raise exception 'Dimensión no válida en %', p_group_by using errcode = '22023';
+    end if;
+
+    v_nivel := (case when 'zona' = any(v_dims) or p_zona is not null then 0 else 2 end)
+             + (case when 'tipo' = any(v_dims) or p_tipo is not null then 0 else 1 end);
+
+    select string_agg(format('%I', d), ', ' order by o),
+           string_agg(format('%I nulls last', d), ', ' order by o)
+    into v_group, v_order
+    from unnest(v_dims) with ordinality u(d, o);
+
+    return query execute format($sql$
+        select to_jsonb(t) from (
+            select %s
+                   sum(cantidad)::bigint                   as cantidad,
+                   sum(productos)::integer                 as productos,
+                   sum(productos_con_existencia)::integer  as productos_con_existencia
+            from public.inventory_rollups
+            where nivel = $7
+              and ($1::text    is null or zona  = $1)
+              and ($2::text    is null or tipo  = $2)
+              and ($3::integer is null or width = $3)
+              and ($4::integer is null or ratio = $4)
+              and ($5::numeric is null or rim   = $5)
+              and ($6::text    is null or marca ilike $6)
+            group by %s
+            order by %s
+        ) t
+    $sql$, coalesce(v_group || ',', ''), coalesce(v_group, '()'), coalesce(v_order, '1'))
+    using p_zona, p_tipo, p_width, p_ratio, p_rim, p_marca, v_nivel;
+end;
+$$;
+
+revoke all on function public.inventory_rollup_totals(text[], text, text, integer, integer, numeric, text)
+    from public, anon, authenticated;
+grant execute on function public.inventory_rollup_totals(text[], text, text, integer, integer, numeric, text)
+    to service_role;
@@ -0,0 +1,12 @@
+# tests/conftest.py
+"""
+Variables mínimas para importar la app sin .env: los módulos crean el cliente de
+Supabase y leen la configuración de JWT al importarse (no se hace ninguna llamada).
+"""
+import os
+
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
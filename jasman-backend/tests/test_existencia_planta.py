@@ -0,0 +1,92 @@
+import io
+
+import pytest
+
+from app.services import ExistenciaPlantaService as service
+
+STAMP = "2026-10-19T10:00:00-06:00"
+
+
+def row(**values):
+    return {"sku": "A1", "size": "205/55R16", "on_hand": "4", **values}
+
+
+@pytest.mark.parametrize("on_hand", ["inf", "-inf", "1e400", "nan", "NaN", "abc"])
+def test_non_finite_or_invalid_on_hand_is_skipped(on_hand):
+    with pytest.raises(service.RowSkipped) as info:
+        service.normalize_row(row(on_hand=on_hand), "FAB", STAMP)
+    assert info.value.reason == "existencia"
+    assert info.value.value == on_hand
+
+
+@pytest.mark.parametrize("size", ["31x10.50R15", "33X12.50R15", "sin medida"])
+def test_unparseable_size_is_skipped_with_its_value(size):
+    with pytest.raises(service.RowSkipped) as info:
+        service.normalize_row(row(size=size), "FAB", STAMP)
+    assert (info.value.reason, info.value.value) == ("medida", size)
+
+
+def test_lt_width_column_is_skipped():
+    values = {"sku": "A1", "width": "LT235", "ratio": "75", "diameter": "15", "on_hand": "2"}
+    with pytest.raises(service.RowSkipped) as info:
+        service.normalize_row(values, "FAB", STAMP)
+    assert (info.value.reason, info.value.value) == ("medida", "LT235/75/15")
+
+
+def test_valid_row_is_normalized():
+    normalized = service.normalize_row(row(on_hand="3.0", warehouse=None), "FAB", STAMP)
+    assert normalized["on_hand"] == 3
+    assert normalized["warehouse"] == service.DEFAULT_WAREHOUSE
+    assert (normalized["width"], normalized["ratio"], normalized["diameter"]) == ("205", 55, "16")
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, rows, on_conflict=None):
+        self.client.upserted.extend(rows)
+        return self
+
+    def delete(self):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def or_(self, *args):
+        return self
+
+    def execute(self):
+        return type("Response", (), {"data": []})()
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.upserted = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def test_load_file_reports_skipped_lines_by_reason(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(service, "supabase", client)
+    monkeypatch.setattr(service.data_generation, "mark_changed", lambda kind: None)
+    csv = (
+        "sku,medida,existencia\n"
+        "A1,205/55R16,4\n"
+        "A2,31x10.50R15,2\n"
+        ",205/55R16,1\n"
+        "A3,205/55R16,1e400\n"
+        "A4,195/65R15,7\n"
+    ).encode("utf-8")
+    result = service.load_file(io.BytesIO(csv), "planta.csv", "FAB")
+    assert [r["sku"] for r in client.upserted] == ["A1", "A4"]
+    assert result["rows_read"] == 5 and result["rows_loaded"] == 2 and result["rows_skipped"] == 3
+    assert result["skipped_lines"] == [3, 4, 5]
+    assert result["skipped"] == {
+        "sin_sku": [{"linea": 4, "sku": None, "valor": None}],
+        "medida": [{"linea": 3, "sku": "A2", "valor": "31x10.50R15"}],
+        "existencia": [{"linea": 5, "sku": "A3", "valor": "1e400"}],
+    }
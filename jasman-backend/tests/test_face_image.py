@@ -0,0 +1,33 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from app.utils import supabase as faces
+
+
+def _b64_jpeg(size):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (120, 80, 40)).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_process_face_image_downscales_and_builds_thumbnail():
+    full, thumbnail = faces.process_face_image(_b64_jpeg((3000, 2000)))
+    assert max(Image.open(io.BytesIO(full)).size) == faces.FACE_IMAGE_MAX_SIZE
+    assert max(Image.open(io.BytesIO(thumbnail)).size) == faces.FACE_THUMBNAIL_SIZE
+
+
+def test_process_face_image_rejects_invalid_data():
+    with pytest.raises(ValueError):
+        faces.process_face_image(base64.b64encode(b"no es una imagen").decode())
+
+
+def test_upload_face_image_uploads_image_and_thumbnail(monkeypatch):
+    uploads = {}
+    monkeypatch.setattr(faces, "_upload", lambda path, data: uploads.__setitem__(path, data))
+    urls = asyncio.run(faces.upload_face_image(_b64_jpeg((400, 300)), "u1"))
+    assert sorted(uploads) == sorted(u.split(f"/{faces.SUPABASE_BUCKET}/")[1] for u in urls.values())
+    assert urls["thumbnail_url"].endswith("_thumb.jpg")
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.services import inventory_events as events
+from app.services.inventory_snapshot import InventorySnapshot
+
+WAREHOUSES = [{"id": 1, "name": "CEDIS", "type": "CEDIS", "zone": 1}]
+PRODUCTS = [{"id": 1, "sku": "A1", "name": "A1", "width": 205, "ratio": 55, "rim": 16.0}]
+
+
+def snapshot(quantity, generation):
+    inventory = [{"product_id": 1, "warehouse_id": 1, "quantity": quantity}]
+    return InventorySnapshot(PRODUCTS, WAREHOUSES, inventory, {}, [], generation)
+
+
+@pytest.fixture(autouse=True)
+def reset(monkeypatch):
+    monkeypatch.setattr(events, "_last_generation", None)
+    monkeypatch.setattr(events, "_last_snapshot", None)
+    monkeypatch.setattr(events, "_subscribers", {})
+
+
+def run(reloads, generations, monkeypatch):
+    """Llama al listener una vez por snapshot (None = sin snapshot) y regresa lo publicado"""
+    async def scenario():
+        queue = events.subscribe()
+        for snap, generation in zip(reloads, generations):
+            monkeypatch.setattr(events.inventory_snapshot, "reload", lambda: snap)
+            monkeypatch.setattr(events.data_generation, "current", lambda *kinds: generation)
+            events.on_data_change({"inventory"})
+        await asyncio.sleep(0)
+        messages = []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+        return messages
+    return asyncio.run(scenario())
+
+
+def test_without_snapshot_changes_publish_a_resync(monkeypatch):
+    messages = run([None, None], ["g1", "g2"], monkeypatch)
+    # El primer cambio (arranque) solo fija la generación
+    assert messages == [{"generation": "g2", "changes": [{"type": "resync"}]}]
+
+
+def test_with_snapshot_the_diff_is_published(monkeypatch):
+    messages = run([snapshot(4, "g1"), snapshot(4, "g2"), snapshot(7, "g3")], ["g1", "g2", "g3"], monkeypatch)
+    # g2 no cambió nada: no se envía
+    assert messages == [{"generation": "g3", "changes": [
+        {"type": "stock", "product_id": 1, "sku": "A1", "warehouse_id": 1, "quantity": 7}
+    ]}]
+    assert events.last_generation() == "g3"
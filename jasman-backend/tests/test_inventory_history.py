@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services import inventory_history as history
+
+
+def arr(values):
+    return np.array(values, dtype=np.int64)
+
+
+# ---------------------------------------------------------------------- NumPy puras
+def test_keys_roundtrip():
+    keys = history._keys(arr([1, 2, 123456]), arr([7, 0, (1 << 20) - 1]))
+    product_ids, warehouse_ids = history._split(keys)
+    assert product_ids.tolist() == [1, 2, 123456]
+    assert warehouse_ids.tolist() == [7, 0, (1 << 20) - 1]
+
+
+def test_last_per_key_keeps_last_value_and_drops_zeros():
+    keys, quantities = history._last_per_key(arr([5, 3, 5, 9, 9]), arr([1, 4, 2, 6, 0]))
+    # 5 -> último valor 2; 9 -> último valor 0 (se elimina)
+    assert keys.tolist() == [3, 5]
+    assert quantities.tolist() == [4, 2]
+
+
+def test_last_per_key_empty():
+    keys, quantities = history._last_per_key(arr([]), arr([]))
+    assert keys.size == 0 and quantities.size == 0
+
+
+def test_delta_reports_changes_additions_and_removals():
+    old = (arr([1, 2, 3]), arr([10, 20, 30]))
+    new = (arr([2, 3, 4]), arr([20, 31, 5]))
+    keys, quantities = history._delta(old, new)
+    # 1 desaparece (0), 3 cambia, 4 es nueva; 2 no cambia
+    assert keys.tolist() == [1, 3, 4]
+    assert quantities.tolist() == [0, 31, 5]
+
+
+def test_delta_applied_over_old_state_gives_new_state():
+    rng = np.random.default_rng(3)
+    old_keys = np.unique(rng.integers(0, 500, 200))
+    old = (old_keys, rng.integers(1, 50, old_keys.size))
+    new_keys = np.unique(rng.integers(0, 500, 200))
+    new = (new_keys, rng.integers(1, 50, new_keys.size))
+    delta_keys, delta_qty = history._delta(old, new)
+    keys, quantities = history._last_per_key(
+        np.concatenate([old[0], delta_keys]), np.concatenate([old[1], delta_qty])
+    )
+    assert keys.tolist() == new[0].tolist()
+    assert quantities.tolist() == new[1].tolist()
+
+
+def test_state_from_rows():
+    keys, quantities = history._state_from_rows([
+        {"product_id": 1, "warehouse_id": 2, "quantity": 3},
+        {"product_id": 1, "warehouse_id": 3, "quantity": None},
+        {"product_id": 4, "warehouse_id": 2, "quantity": "7"},
+    ])
+    product_ids, warehouse_ids = history._split(keys)
+    assert list(zip(product_ids.tolist(), warehouse_ids.tolist(), quantities.tolist())) == [(1, 2, 3), (4, 2, 7)]
+
+
+# ---------------------------------------------------------------------- PostgREST falso
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db, self.table = db, table
+        self.filters, self.orders = [], []
+        self.limit_n, self.range_ = None, None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda r: r[column] == value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda r: r[column] <= value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda r: r[column] >= value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda r: r[column] in values)
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def range(self, start, end):
+        self.range_ = (start, end)
+        return self
+
+    def execute(self):
+        rows = [r for r in self.db.tables[self.table] if all(f(r) for f in self.filters)]
+        for column, desc in reversed(self.orders):
+            rows.sort(key=lambda r: r[column], reverse=desc)
+        if self.range_:
+            rows = rows[self.range_[0]:self.range_[1] + 1]
+        if self.limit_n is not None:
+            rows = rows[:self.limit_n]
+        return type("Response", (), {"data": rows})()
+
+
+class FakeSupabase:
+    """Tablas del historial en memoria; la RPC escribe corrida y bloques juntos, como en SQL"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.tables = {history.RUNS_TABLE: [], history.PARTS_TABLE: []}
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        assert name == "record_inventory_history_run"
+        n, size = len(params["p_product_ids"]), params["p_part_size"]
+        run = {
+            "id": len(self.tables[history.RUNS_TABLE]) + 1, "kind": params["p_kind"],
+            "entries": n, "generation": params["p_generation"], "run_at": self.clock.pop(0).isoformat()
+        }
+        self.tables[history.RUNS_TABLE].append(run)
+        for part, start in enumerate(range(0, n, size)):
+            self.tables[history.PARTS_TABLE].append({
+                "run_id": run["id"], "part": part,
+                "product_ids": params["p_product_ids"][start:start + size],
+                "warehouse_ids": params["p_warehouse_ids"][start:start + size],
+                "quantities": params["p_quantities"][start:start + size],
+            })
+        return type("Response", (), {"execute": lambda self: type("R", (), {"data": run})()})()
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    base = datetime(2026, 1, 1)
+    db = FakeSupabase([base + timedelta(days=i) for i in range(20)])
+    monkeypatch.setattr(history, "supabase", db)
+    monkeypatch.setattr(history, "PART_SIZE", 2)
+    monkeypatch.setattr(history, "CHECKPOINT_EVERY", 3)
+    return db
+
+
+def rows(state):
+    return [{"product_id": p, "warehouse_id": w, "quantity": q} for (p, w), q in state.items()]
+
+
+def as_dict(result):
+    _, product_ids, warehouse_ids, quantities = result
+    return dict(zip(zip(product_ids.tolist(), warehouse_ids.tolist()), quantities.tolist()))
+
+
+def test_state_as_of_rebuilds_every_run(fake_db):
+    states = [
+        {(1, 1): 5, (1, 2): 3, (2, 1): 8},
+        {(1, 1): 4, (1, 2): 3, (3, 1): 1},
+        {(1, 1): 4, (3, 1): 2, (4, 2): 9},
+        {(2, 2): 1},
+        {(2, 2): 1, (5, 5): 5},
+    ]
+    for i, state in enumerate(states):
+        history.record_run(rows(state), generation=f"g{i}")
+
+    kinds = [r["kind"] for r in fake_db.tables[history.RUNS_TABLE]]
+    assert kinds[0] == "checkpoint" and "delta" in kinds
+
+    assert as_dict(history.state_as_of()) == states[-1]
+    for i, state in enumerate(states):
+        as_of = datetime(2026, 1, 1) + timedelta(days=i, hours=1)
+        run, *_ = result = history.state_as_of(as_of)
+        assert run["generation"] == f"g{i}"
+        assert as_dict(result) == state
+
+
+def test_state_as_of_before_first_checkpoint(fake_db):
+    history.record_run(rows({(1, 1): 5}), generation="g0")
+    run, product_ids, _, _ = history.state_as_of(datetime(2025, 12, 31))
+    assert run is None and product_ids.size == 0
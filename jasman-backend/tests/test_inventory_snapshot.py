@@ -0,0 +1,120 @@
+import numpy as np
+import pytest
+
+from app.services import inventory_events
+from app.services.inventory_snapshot import InventorySnapshot
+
+WAREHOUSES = [
+    {"id": 1, "name": "CEDIS NORTE", "type": "CEDIS", "zone": 1},
+    {"id": 2, "name": "SUC A", "type": "Sucursal", "zone": 2},
+]
+
+
+def product(pid, sku, width, ratio, rim, **extra):
+    return {"id": pid, "sku": sku, "name": f"[{sku}] {width}/{ratio}R{rim}", "piso": str(width), "serie": str(ratio),
+            "rin": str(rim), "marca": extra.get("marca"), "width": width, "ratio": ratio, "rim": float(rim)}
+
+
+PRODUCTS = [
+    product(3, "C3", 205, 55, 16, marca="M1"),
+    product(1, "A1", 205, 55, 16),
+    product(2, None, 215, 50, 16),
+    product(4, "D4", 195, 60, 16),
+    product(5, "E5", 225, 55, 16),
+    product(6, "F6", 185, 65, 15),
+]
+INVENTORY = [
+    {"product_id": 1, "warehouse_id": 1, "quantity": 4},
+    {"product_id": 2, "warehouse_id": 2, "quantity": 6},
+    {"product_id": 3, "warehouse_id": 1, "quantity": 1},
+    {"product_id": 5, "warehouse_id": 1, "quantity": 9},
+    {"product_id": 6, "warehouse_id": 2, "quantity": 2},
+]
+EXISTENCIA = [
+    {"id": 1, "sku": "D4", "description": "d4", "manufacturer": "FAB1", "warehouse": "Planta Norte", "on_hand": 8,
+     "width": "195", "ratio": 60, "diameter": "16", "width_num": 195, "ratio_num": 60, "rim_num": 16.0},
+    {"id": 2, "sku": "X9", "description": None, "manufacturer": "FAB2", "warehouse": None, "on_hand": 3,
+     "width": "205", "ratio": 55, "diameter": "16", "width_num": 205, "ratio_num": 55, "rim_num": 16.0},
+]
+PRICES = {"A1": 1000, "X9": 500.5}
+
+
+@pytest.fixture
+def built():
+    return InventorySnapshot(PRODUCTS, WAREHOUSES, INVENTORY, PRICES, EXISTENCIA, generation="g1")
+
+
+@pytest.fixture
+def loaded(built, tmp_path):
+    built.save(str(tmp_path))
+    return InventorySnapshot.load(str(tmp_path))
+
+
+def test_load_maps_files_without_object_arrays(loaded):
+    for field in InventorySnapshot._ARRAY_FIELDS:
+        assert isinstance(getattr(loaded, field), np.memmap), field
+    for field in InventorySnapshot._TEXT_FIELDS:
+        text, nulls = loaded._texts[field]
+        assert isinstance(text, np.memmap) and text.dtype.kind == "U", field
+        assert nulls.dtype == bool
+    assert loaded.generation == "g1"
+
+
+def test_loaded_snapshot_answers_like_the_built_one(built, loaded):
+    for snapshot in (built, loaded):
+        assert snapshot.text("sku", 1) is None  # productos ordenados por id: el 2 no tiene SKU
+    assert loaded.reporte(205, 55, 16.0, page=1, per_page=10) == built.reporte(205, 55, 16.0, page=1, per_page=10)
+    assert loaded.existencia_rows(205, 55, 16.0) == built.existencia_rows(205, 55, 16.0) == [EXISTENCIA[1]]
+    assert loaded.equivalent_sizes(205, 55, 16.0) == built.equivalent_sizes(205, 55, 16.0)
+    assert loaded.facets(205) == built.facets(205)
+    assert loaded.product_texts([6, 2, 99]) == {2: {"sku": None, "name": "[None] 215/50R16"},
+                                                 6: {"sku": "F6", "name": "[F6] 185/65R15"}}
+
+
+def test_cursor_pages_cover_every_product_once(loaded):
+    keys, after = [], None
+    while True:
+        _, _, _, page_keys = loaded.reporte(None, None, None, page=1, per_page=2, after=after, cursor_mode=True)
+        keys += page_keys
+        if len(page_keys) < 2:
+            break
+        after = page_keys[-1]
+    assert keys == [("A1", 1), ("C3", 3), ("D4", 4), ("E5", 5), ("F6", 6), (None, 2)]
+
+
+def test_equivalences_rank_by_diameter_and_skip_out_of_tolerance(loaded):
+    medidas = [n["medida"] for n in loaded.equivalent_sizes(205, 55, 16.0)]
+    # 195/60R16 (+1.3%, inventario + planta) y 215/50R16 (-1.7%); 225/55R16 (+3.5%) queda fuera
+    assert medidas == ["195/60R16", "215/50R16"]
+    first = loaded.equivalent_sizes(205, 55, 16.0)[0]
+    assert (first["cantidad_inventario"], first["cantidad_planta"], first["diferencia_pct"]) == (0, 8, 1.35)
+    # Medida sin inventario: se compara contra las del mismo rin
+    assert [n["medida"] for n in loaded.equivalent_sizes(200, 55, 16.0, limit=1)] == ["215/50R16"]
+    assert loaded.equivalent_sizes(205, 55, 17.0) == []
+
+
+def test_facets_cascade(loaded):
+    facets = loaded.facets(205, 55)
+    assert facets["piso"] == [
+        {"valor": "185", "existencia": 2, "medidas": 1},
+        {"valor": "195", "existencia": 8, "medidas": 1},
+        {"valor": "205", "existencia": 8, "medidas": 1},
+        {"valor": "215", "existencia": 6, "medidas": 1},
+        {"valor": "225", "existencia": 9, "medidas": 1},
+    ]
+    assert facets["serie"] == [{"valor": "55", "existencia": 8, "medidas": 1}]
+    assert facets["rin"] == [{"valor": "16", "existencia": 8, "medidas": 1}]
+
+
+def test_diff_between_snapshots(loaded):
+    inventory = [dict(item) for item in INVENTORY]
+    inventory[0]["quantity"] = 7
+    existencia = [dict(EXISTENCIA[0], on_hand=2), EXISTENCIA[1]]
+    new = InventorySnapshot(PRODUCTS, WAREHOUSES, inventory, {"A1": 1100}, existencia, generation="g2")
+    changes = sorted(inventory_events.diff(loaded, new), key=lambda c: (c["type"], str(c.get("sku"))))
+    assert changes == [
+        {"type": "planta", "manufacturer": "FAB1", "sku": "D4", "warehouse": "Planta Norte", "on_hand": 2},
+        {"type": "price", "sku": "A1", "price": 1100.0},
+        {"type": "price", "sku": "X9", "price": None},
+        {"type": "stock", "product_id": 1, "sku": "A1", "warehouse_id": 1, "quantity": 7},
+    ]
@@ -0,0 +1,78 @@
+from app.services.product_search import ProductSearchIndex, normalize
+
+PRODUCTS = [
+    {"id": 1, "sku": "MIC205", "name": "[MIC205] Michelin Primacy 205/55R16"},
+    {"id": 2, "sku": "MIC2055", "name": "[MIC2055] Michelin Energy 205/55R16"},
+    {"id": 3, "sku": "BRI100", "name": "[BRI100] Bridgestone Turanza Michelin compatible"},
+    {"id": 4, "sku": "PIR300", "name": "[PIR300] Pirelli Cinturato neumático 195/65R15"},
+    {"id": 5, "sku": None, "name": "Válvula genérica"},
+]
+PRICES = {"MIC205": 1500.0, "PIR300": 1200.0}
+
+
+def make_index():
+    return ProductSearchIndex(PRODUCTS, PRICES, generation="g1")
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+def test_normalize_lowercases_and_strips_accents():
+    assert normalize("NEUMÁTICO Válvula") == "neumatico valvula"
+    assert normalize(None) == ""
+
+
+def test_rank_sku_exact_then_sku_prefix_then_name_prefix():
+    results, total = make_index().search("mic205")
+    # SKU exacto, prefijo de SKU y luego el resto por (sku, id)
+    assert ids(results) == [1, 2]
+    assert total == 2
+
+    results, total = make_index().search("michelin")
+    # Prefijo de palabra del nombre en los tres; desempate por SKU
+    assert ids(results) == [3, 1, 2]
+    assert total == 3
+
+
+def test_name_prefix_ranks_before_plain_substring():
+    results, _ = make_index().search("turanza")
+    assert ids(results) == [3]
+    results, _ = make_index().search("helin")  # solo substring
+    assert ids(results) == [3, 1, 2]
+
+
+def test_search_matches_without_accents_and_returns_price():
+    results, total = make_index().search("neumatico")
+    assert ids(results) == [4]
+    assert results[0]["price"] == 1200.0
+    results, _ = make_index().search("valvula")
+    assert ids(results) == [5]
+    assert results[0]["price"] is None
+
+
+def test_pagination_and_total():
+    results, total = make_index().search("r16", offset=1, limit=1)
+    assert total == 2
+    assert ids(results) == [2]
+
+
+def test_empty_query_lists_all_in_sku_order():
+    results, total = make_index().search("  ", limit=10)
+    assert total == len(PRODUCTS)
+    assert ids(results) == [3, 1, 2, 4, 5]
+
+
+def test_fuzzy_fallback_returns_results_where_ilike_finds_nothing():
+    # "michelinn" no es substring de nada (ilike '%michelinn%' no regresa filas), pero
+    # comparte suficientes trigramas: el índice regresa coincidencias aproximadas
+    index = make_index()
+    assert index._substring_docs("michelinn").size == 0
+    results, total = index.search("michelinn")
+    assert set(ids(results)) == {1, 2, 3}
+    assert total == 3
+
+
+def test_fuzzy_fallback_requires_minimum_similarity():
+    results, total = make_index().search("xyzqwk")
+    assert results == [] and total == 0
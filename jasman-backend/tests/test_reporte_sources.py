@@ -0,0 +1,80 @@
+from app.routes.odoo.inventory import _build_reporte
+from app.services.inventory_snapshot import InventorySnapshot
+
+WAREHOUSES = [
+    {"id": 1, "name": "CEDIS NORTE", "type": "CEDIS", "zone": 1},
+    {"id": 2, "name": "SUC A", "type": "Sucursal", "zone": 1},
+    {"id": 3, "name": "SUC B", "type": "Sucursal", "zone": 2},
+]
+PRODUCTS = [
+    {"id": 10, "sku": "A1", "name": "[A1] 205/55R16", "piso": "205", "serie": "55", "rin": "16", "marca": "M1",
+     "width": 205, "ratio": 55, "rim": 16.0},
+    {"id": 11, "sku": None, "name": "sin sku", "piso": "205", "serie": "55", "rin": "16", "marca": "M2",
+     "width": 205, "ratio": 55, "rim": 16.0},
+    {"id": 12, "sku": "", "name": "sku vacío", "piso": "205", "serie": "55", "rin": "16", "marca": "M2",
+     "width": 205, "ratio": 55, "rim": 16.0},
+    {"id": 13, "sku": "B7", "name": "[B7] 205/55R16", "piso": "205", "serie": "55", "rin": "16", "marca": "M3",
+     "width": 205, "ratio": 55, "rim": 16.0},
+]
+INVENTORY = [
+    {"product_id": 10, "warehouse_id": 1, "quantity": 5},
+    {"product_id": 10, "warehouse_id": 3, "quantity": 2},
+    {"product_id": 11, "warehouse_id": 2, "quantity": 9},
+    {"product_id": 13, "warehouse_id": 2, "quantity": 1},
+]
+EXISTENCIA = [
+    {"sku": "A1", "description": "a1", "brand": "M1", "width": "205", "ratio": 55, "diameter": "16",
+     "warehouse": "Planta Norte", "on_hand": 20, "manufacturer": "FAB1", "update": None, "created_at": None,
+     "width_num": 205, "ratio_num": 55, "rim_num": 16.0},
+    {"sku": "X9", "description": None, "brand": "M9", "width": "205", "ratio": 55, "diameter": "16",
+     "warehouse": None, "on_hand": None, "manufacturer": "FAB2", "update": None, "created_at": None,
+     "width_num": 205, "ratio_num": 55, "rim_num": 16.0},
+    {"sku": None, "description": "sin sku", "brand": "M9", "width": "205", "ratio": 55, "diameter": "16",
+     "warehouse": "Planta Sur", "on_hand": 3, "manufacturer": "FAB2", "update": None, "created_at": None,
+     "width_num": 205, "ratio_num": 55, "rim_num": 16.0},
+]
+PRICES = {"A1": 1000.0, "X9": 500.0}
+
+
+def _rest_inventory():
+    warehouses = {w["id"]: w for w in WAREHOUSES}
+    return [{**item, "warehouse_id": warehouses[item["warehouse_id"]]} for item in INVENTORY]
+
+
+def _sorted_almacenes(rows):
+    for row in rows:
+        for zona in row["zonas"].values():
+            for key in ("CEDIS", "Sucursales"):
+                zona[key] = sorted(zona[key], key=lambda a: (str(a["almacen_id"]), a["nombre"]))
+    return rows
+
+
+def test_rest_report_skips_products_without_sku():
+    reporte, proveedores = _build_reporte(PRODUCTS, _rest_inventory(), EXISTENCIA, PRICES)
+    assert [row["sku"] for row in reporte] == ["A1", "B7", "X9"]
+    x9 = reporte[-1]
+    assert x9["nombre"] == "SKU-X9"
+    assert x9["zonas"]["Planta"]["CEDIS"] == [{"almacen_id": None, "nombre": "Planta (Planta)", "cantidad": 0}]
+    assert set(proveedores) == {"FAB1", "FAB2"}
+
+
+def test_snapshot_and_rest_produce_the_same_rows():
+    rest, rest_proveedores = _build_reporte(PRODUCTS, _rest_inventory(), EXISTENCIA, PRICES)
+    snapshot = InventorySnapshot(PRODUCTS, WAREHOUSES, INVENTORY, PRICES, EXISTENCIA, generation="g1")
+    rows, proveedores, total, page_keys = snapshot.reporte(205, 55, 16.0, page=1, per_page=10)
+    assert _sorted_almacenes(rows) == _sorted_almacenes(rest)
+    assert proveedores == rest_proveedores
+    assert total == 4
+    # Las llaves del cursor incluyen los productos sin SKU (van al final, como NULLS LAST)
+    assert page_keys == [("", 12), ("A1", 10), ("B7", 13), (None, 11)]
+
+
+def test_snapshot_cursor_uses_codepoint_order_like_collate_c():
+    products = [
+        {**PRODUCTS[0], "id": i, "sku": sku} for i, sku in enumerate(["a-b", "B2", "a3", "A0"], start=1)
+    ]
+    snapshot = InventorySnapshot(products, WAREHOUSES, [], {}, [], generation="g1")
+    _, _, _, first = snapshot.reporte(None, None, None, page=1, per_page=2, cursor_mode=True)
+    _, _, _, rest = snapshot.reporte(None, None, None, page=1, per_page=2, after=first[-1], cursor_mode=True)
+    # Postgres con sku collate "C" da el mismo orden: mayúsculas antes que minúsculas
+    assert first + rest == [("A0", 4), ("B2", 2), ("a-b", 1), ("a3", 3)]
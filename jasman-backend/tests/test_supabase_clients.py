@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from postgrest.utils import SyncClient
+
+from app import supabase as clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_postgrest():
+    yield
+    # Los tests cierran sesiones: el siguiente acceso crea un PostgREST nuevo
+    clients.supabase._listen_to_auth_events("SIGNED_OUT", None)
+
+
+def test_shared_client_uses_pooled_postgrest():
+    postgrest = clients.supabase.postgrest
+    assert isinstance(postgrest, clients.PooledSyncPostgrestClient)
+    assert isinstance(postgrest.session, SyncClient)
+    assert postgrest.session.base_url == clients.supabase.rest_url + "/"
+
+
+def test_pooled_postgrest_survives_auth_reset():
+    # supabase.Client vuelve a crear su PostgREST tras eventos de sesión
+    clients.supabase._listen_to_auth_events("SIGNED_OUT", None)
+    postgrest = clients.supabase.postgrest
+    assert isinstance(postgrest, clients.PooledSyncPostgrestClient)
+    with postgrest:
+        pass
+    assert postgrest.session.is_closed
+
+
+def test_async_postgrest_lifecycle():
+    async def run():
+        await clients.open_clients()
+        db = clients.get_async_postgrest()
+        assert isinstance(db, clients.PooledAsyncPostgrestClient)
+        await clients.close_clients()
+        return db
+
+    db = asyncio.run(run())
+    assert db.session.is_closed
+    assert clients._async_postgrest is None
@@ -0,0 +1,95 @@
+import pytest
+
+from app.services import telemetry_writer as module
+from app.services.telemetry_writer import TelemetryWriter
+
+
+class FakeInsert:
+    def __init__(self, client, table, rows):
+        self.client, self.table, self.rows = client, table, rows
+
+    def execute(self):
+        self.client.calls += 1
+        if self.client.down or any(row.get("bad") for row in self.rows):
+            raise RuntimeError("insert failed")
+        self.client.inserted.setdefault(self.table, []).extend(self.rows)
+
+
+class FakeTable:
+    def __init__(self, client, table):
+        self.client, self.table = client, table
+
+    def insert(self, rows):
+        return FakeInsert(self.client, self.table, rows)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+        self.inserted = {}
+
+    def table(self, name):
+        return FakeTable(self, name)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeSupabase()
+    monkeypatch.setattr(module, "supabase", fake)
+    return fake
+
+
+def items(rows, attempts=0):
+    return [(row, attempts) for row in rows]
+
+
+def test_bad_row_does_not_fail_the_batch(client):
+    writer = TelemetryWriter(batch_size=3, max_attempts=2)
+    rows = [{"n": 1}, {"n": 2, "bad": True}, {"n": 3}, {"n": 4}, {"n": 5}]
+    retry = writer._flush("log_busquedas", items(rows), stopping=False)
+    assert [r["n"] for r in client.inserted["log_busquedas"]] == [1, 3, 4, 5]
+    assert retry == [({"n": 2, "bad": True}, 1)]
+    assert writer.dropped == 0
+
+
+def test_row_is_dropped_after_max_attempts(client):
+    writer = TelemetryWriter(batch_size=3, max_attempts=2)
+    retry = writer._flush("log_busquedas", items([{"n": 1}, {"bad": True}], attempts=1), stopping=False)
+    assert retry == []
+    assert writer.dropped == 1
+    assert client.inserted["log_busquedas"] == [{"n": 1}]
+
+
+def test_outage_keeps_queued_rows_for_the_next_attempt(client):
+    client.down = True
+    writer = TelemetryWriter(batch_size=2, max_attempts=3)
+    rows = [{"n": i} for i in range(6)]
+    retry = writer._flush("log_sesiones", items(rows), stopping=False)
+    # Solo el primer bloque cuenta el intento; los bloques de atrás no se tocan
+    assert retry == items(rows[:2], attempts=1) + items(rows[2:])
+    assert client.calls == 1 + 2
+    assert writer.dropped == 0
+
+
+def test_stop_flushes_queue_and_backs_off_failed_rows(client):
+    writer = TelemetryWriter(batch_size=10, flush_seconds=0.05, max_attempts=5, retry_seconds=60)
+    writer.start()
+    writer.write("llantas_negadas", [{"n": 1}, {"n": 2, "bad": True}])
+    writer.write("log_busquedas", [{"n": 3}])
+    writer.stop()
+    assert client.inserted == {"llantas_negadas": [{"n": 1}], "log_busquedas": [{"n": 3}]}
+    # Al apagar no se espera el reintento: la fila mala se descarta
+    assert writer.dropped == 1
+
+
+def test_full_queue_drops_rows_without_inserting_inline(client):
+    writer = TelemetryWriter(max_queue=2)
+    # Hilo "activo" que no consume la cola
+    writer._thread = type("Alive", (), {"is_alive": lambda self: True})()
+    writer.write("log_busquedas", [{"n": 1}, {"n": 2}, {"n": 3}])
+    writer.write("log_busquedas", [{"n": 4}])
+    assert client.calls == 0
+    assert writer.stats()["pending"] == 2
+    assert writer.enqueued == 2
+    assert writer.dropped == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from app.utils.tire_size import parse_width, parse_ratio, parse_rim, parse_size_filters, parse_size_string
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("205", 205), (" 205 ", 205), ("205.0", 205), (205, 205), (205.0, 205),
+    ("LT235", None), ("235LT", None), ("7.50", None), ("", None), (None, None), ("abc", None),
+])
+def test_parse_width(value, expected):
+    assert parse_width(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("55", 55), ("55 ", 55), ("10.50", None), ("R55", None), (None, None),
+])
+def test_parse_ratio(value, expected):
+    assert parse_ratio(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("16", 16.0), ("R16", 16.0), ("19.5", 19.5), ("ZR17", 17.0), ("", None), (None, None),
+])
+def test_parse_rim(value, expected):
+    assert parse_rim(value) == expected
+
+
+@pytest.mark.parametrize("size, expected", [
+    ("205/55R16", (205, 55, 16.0)),
+    ("205/55 ZR16", (205, 55, 16.0)),
+    ("205/55-16", (205, 55, 16.0)),
+    ("225/70R19.5", (225, 70, 19.5)),
+    ("7.50R16", (None, None, 16.0)),
+    ("31x10.5R15", (None, None, None)),
+    ("33X12.50R15", (None, None, None)),
+    ("", (None, None, None)),
+    (None, (None, None, None)),
+    ("sin medida", (None, None, None)),
+])
+def test_parse_size_string(size, expected):
+    assert parse_size_string(size) == expected
+
+
+def test_parse_size_filters():
+    assert parse_size_filters("205", "55", "R16") == (205, 55, 16.0)
+    assert parse_size_filters(None, None, "16") == (None, None, 16.0)
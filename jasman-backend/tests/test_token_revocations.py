@@ -0,0 +1,118 @@
+from uuid import uuid4
+
+import pytest
+
+from app.services import supabase_db, token_revocations as revocations
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeRPC:
+    def __init__(self, client, name, params):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self):
+        self.client.calls.append((self.name, self.params))
+        if self.client.failures > 0:
+            self.client.failures -= 1
+            raise RuntimeError("timeout")
+        return FakeResponse(7)
+
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def update(self, fields):
+        self.client.updated = fields
+        return self
+
+    def delete(self):
+        self.client.deleted = True
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        return FakeResponse([{"id": "1"}])
+
+
+class FakeSupabase:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+        self.updated = None
+        self.deleted = False
+
+    def rpc(self, name, params):
+        return FakeRPC(self, name, params)
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def make(failures=0):
+        client = FakeSupabase(failures)
+        monkeypatch.setattr(revocations, "supabase", client)
+        monkeypatch.setattr(revocations.time, "sleep", lambda seconds: None)
+        return client
+    return make
+
+
+def test_revoke_retries_transient_errors(fake):
+    client = fake(failures=revocations.REVOKE_ATTEMPTS - 1)
+    trl = revocations.TokenRevocationList(max_age_seconds=60)
+    trl.revoke("u1")
+    assert len(client.calls) == revocations.REVOKE_ATTEMPTS
+    assert trl._versions["u1"] == 7
+
+
+def test_revoke_raises_when_rpc_keeps_failing(fake):
+    client = fake(failures=revocations.REVOKE_ATTEMPTS)
+    trl = revocations.TokenRevocationList(max_age_seconds=60)
+    with pytest.raises(RuntimeError):
+        trl.revoke("u1")
+    assert "u1" not in trl._versions
+
+
+def test_update_user_is_not_saved_when_revocation_fails(fake, monkeypatch):
+    client = fake(failures=revocations.REVOKE_ATTEMPTS)
+    monkeypatch.setattr(supabase_db, "STATELESS_AUTH", True)
+    service = supabase_db.SupabaseDBService(client=client)
+    with pytest.raises(Exception, match="Error updating user"):
+        service.update_user(uuid4(), {"contraseña": "hash"})
+    assert client.calls and client.calls[0][0] == "revoke_user_tokens"
+    # La revocación va antes de la escritura: el cambio no se aplicó
+    assert client.updated is None
+
+
+def test_update_user_revokes_before_saving(fake, monkeypatch):
+    client = fake()
+    monkeypatch.setattr(supabase_db, "STATELESS_AUTH", True)
+    service = supabase_db.SupabaseDBService(client=client)
+    assert service.update_user(uuid4(), {"rol": "admin"}) is True
+    assert client.calls[0][0] == "revoke_user_tokens"
+    assert client.updated == {"rol": "admin"}
+
+
+def test_delete_user_is_not_applied_when_revocation_fails(fake, monkeypatch):
+    client = fake(failures=revocations.REVOKE_ATTEMPTS)
+    monkeypatch.setattr(supabase_db, "STATELESS_AUTH", True)
+    service = supabase_db.SupabaseDBService(client=client)
+    with pytest.raises(Exception, match="Error deleting user"):
+        service.delete_user(uuid4())
+    assert client.deleted is False
+
+
+def test_update_user_without_claim_fields_does_not_revoke(fake, monkeypatch):
+    client = fake()
+    monkeypatch.setattr(supabase_db, "STATELESS_AUTH", True)
+    service = supabase_db.SupabaseDBService(client=client)
+    assert service.update_user(uuid4(), {"face_url": "x"}) is True
+    assert client.calls == []